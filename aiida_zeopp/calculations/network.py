@@ -1,13 +1,468 @@
 """AiiDA calculation class for network executable."""
-from aiida.common import CalcInfo, CodeInfo
+import functools
+import shlex
+from pathlib import PurePosixPath
+
+from aiida.common import CalcInfo, CodeInfo, CodeRunMode
 from aiida.engine import CalcJob
-from aiida.orm import Data
+from aiida.engine.processes.calcjobs.calcjob import validate_calc_job
+from aiida.orm import AbstractCode, Data, PortableCode, load_node
 from aiida.plugins import DataFactory
 
+from aiida_zeopp.data.parameters import OUTPUT_POLICIES, OUTPUT_REGISTRY
+from aiida_zeopp.data.points import POINT_CLOUD_OPTIONS
+from aiida_zeopp.parsers.raw import (
+    COMPRESSED_SUFFIX,
+    RAW_TEXT_POLICIES,
+    STREAMED_OPTIONS,
+)
+from aiida_zeopp.parsers.structure import (
+    CifParser,
+    CssrParser,
+    get_cell,
+    get_structure_radii,
+)
+
 NetworkParameters = DataFactory("zeopp.parameters")  # pylint: disable=invalid-name
 CifData = DataFactory("core.cif")  # pylint: disable=invalid-name
+StructureData = DataFactory("core.structure")  # pylint: disable=invalid-name
 SinglefileData = DataFactory("core.singlefile")  # pylint: disable=invalid-name
 Dict = DataFactory("core.dict")  # pylint: disable=invalid-name
+ArrayData = DataFactory("core.array")  # pylint: disable=invalid-name
+
+# files of packed runs of NetworkBatchCalculation
+TASK_SCRIPT = "_zeopp_task.sh"
+TASK_LIST = "_zeopp_tasks.txt"
+TASK_STATUS_FILE = "_task_status.txt"
+
+# runs one task in its directory, recording exit status and start/end time (seconds since epoch)
+TASK_SCRIPT_TEMPLATE = """#!/bin/bash
+# usage: {script} <directory> <executable> [arguments]
+dir="$1"
+shift
+start=$(date +%s.%N)
+"$@" > "$dir/_stdout.txt" 2> "$dir/_stderr.txt"
+status=$?
+end=$(date +%s.%N)
+echo "$status $start $end" > "$dir/{status_file}"
+"""
+
+# number of stripped CIF files kept in memory (see get_stripped_cif)
+STRIPPED_CIF_CACHE_SIZE = 64
+
+# file written by the measurement wrapper
+MEASURE_SCRIPT = "_zeopp_measure.sh"
+RESOURCES_FILE = "_resources.txt"
+
+# runs a command, recording wallclock time, user and system CPU time (seconds), peak memory (kB) and exit status
+# (run by bash, see the wrapper_code input)
+# uses GNU time, if available, python3 otherwise and the bash builtin (without peak memory) as last resort
+MEASURE_SCRIPT_TEMPLATE = """#!/bin/bash
+# usage: {script} <resources file> <executable> [arguments]
+out="$1"
+shift
+if /usr/bin/time -f "" true 2> /dev/null; then
+    /usr/bin/time -o "$out" -f "%e %U %S %M %x" "$@"
+elif command -v python3 > /dev/null; then
+    python3 - "$out" "$@" << 'EOF'
+import resource, subprocess, sys, time
+start = time.time()
+status = subprocess.call(sys.argv[2:])
+usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+with open(sys.argv[1], "w") as handle:
+    handle.write(f"{{time.time() - start:.3f}} {{usage.ru_utime:.3f}} {{usage.ru_stime:.3f}} {{usage.ru_maxrss}} {{status}}\\n")
+sys.exit(status)
+EOF
+else
+    TIMEFORMAT="%R %U %S"
+    {{ time "$@" 2>&3; }} 3>&2 2> "$out"
+    status=$?
+    read -r times < "$out"
+    echo "$times -1 $status" > "$out"
+    exit $status
+fi
+"""
+
+
+def validate_raw_text(value, _ctx):
+    """Validate the raw_text option."""
+    if value not in RAW_TEXT_POLICIES:
+        return f"raw_text must be one of {RAW_TEXT_POLICIES}, got {value!r}"
+    return None
+
+
+def get_job_resource(computer, resources):
+    """Return job resource of the scheduler of the computer, as created by AiiDA on submission.
+
+    :param computer: the computer the calculation runs on
+    :param resources: the resources option of the calculation
+    """
+    scheduler = computer.get_scheduler()
+    resources = dict(resources)
+    scheduler.preprocess_resources(resources, computer.get_default_mpiprocs_per_machine())
+    return scheduler.create_job_resource(**resources)
+
+
+def validate_inputs(inputs, ctx):
+    """Validate inputs of NetworkCalculation.
+
+    In addition to the validation of any CalcJob, options running network through wrapper scripts
+    (measure_resources and packed) require a bash wrapper code on the computer of the network code,
+    and a network code that is installed on the computer (a PortableCode is only uploaded if it runs itself).
+    """
+    message = validate_calc_job(inputs, ctx)
+    if message is not None:
+        return message
+
+    options = inputs.get("metadata", {}).get("options", {})
+    if not (options.get("measure_resources") or options.get("packed")):
+        return None
+
+    return _validate_wrapper_code(inputs.get("code", None), inputs.get("wrapper_code", None))
+
+
+def _validate_wrapper_code(code, wrapper_code):
+    """Return error message if the wrapper code cannot run the wrapper scripts of the network code (None otherwise)."""
+    if wrapper_code is None:
+        return "the measure_resources and packed options require the wrapper_code input (bash)"
+    if PurePosixPath(str(wrapper_code.get_executable())).name != "bash":
+        return f"wrapper_code needs to run bash, not {wrapper_code.get_executable()}"
+    if code is None:
+        return None
+    if isinstance(code, PortableCode):
+        return "the measure_resources and packed options do not support a PortableCode as network code"
+    if code.computer is None or wrapper_code.computer is None or code.computer.uuid != wrapper_code.computer.uuid:
+        return "wrapper_code needs to be on the computer of the network code"
+    return None
+
+
+def validate_batch_inputs(inputs, ctx):
+    """Validate inputs of NetworkBatchCalculation.
+
+    In addition to the validation of NetworkCalculation (see `validate_inputs`), packed runs are restricted
+    to a single machine, since all tasks are run by ``xargs`` on the first node of the job.
+    """
+    message = validate_inputs(inputs, ctx)
+    if message is not None:
+        return message
+
+    metadata = inputs.get("metadata", {})
+    options = metadata.get("options", {})
+    code = inputs.get("code", None)
+    computer = metadata.get("computer", None) or (code.computer if code else None)
+    if not options.get("packed") or computer is None:
+        return None
+
+    try:
+        job_resource = get_job_resource(computer, options["resources"])
+    except (KeyError, TypeError, ValueError):
+        return None  # invalid resources are reported by validate_calc_job
+    num_machines = getattr(job_resource, "num_machines", 1)
+    if num_machines > 1:
+        return f"packed runs are limited to a single machine, got {num_machines} machines in resources"
+    return None
+
+
+def _define_common(spec):
+    """Define inputs, exit codes and outputs shared by NetworkCalculation and NetworkBatchCalculation."""
+    spec.input(
+        "metadata.options.resources",
+        valid_type=dict,
+        default={
+            "num_machines": 1,
+            "num_mpiprocs_per_machine": 1,
+            "tot_num_mpiprocs": 1,
+        },
+    )
+    spec.input(
+        "metadata.options.psd_as_array",
+        valid_type=bool,
+        default=False,
+        help="Store the pore size distribution as 'psd' ArrayData output instead of lists in output_parameters.",
+    )
+    spec.input(
+        "metadata.options.parse_cssr",
+        valid_type=bool,
+        default=False,
+        help="Store the 'structure_cssr' output as StructureData instead of the raw .cssr file.",
+    )
+    spec.input(
+        "metadata.options.block_as_array",
+        valid_type=bool,
+        default=False,
+        help="Store centers and radii of blocking spheres as 'block_spheres' ArrayData (in addition to 'block').",
+    )
+    spec.input(
+        "metadata.options.raw_as_array",
+        valid_type=bool,
+        default=False,
+        help=f"Stream numeric point data of raw outputs ({', '.join(STREAMED_OPTIONS)}) "
+        "into '<link>_points' ArrayData outputs.",
+    )
+    spec.input(
+        "metadata.options.raw_text",
+        valid_type=str,
+        default="keep",
+        validator=validate_raw_text,
+        help=f"What to do with the text of raw outputs ({', '.join(STREAMED_OPTIONS)}): "
+        "'keep' as is, 'compress' with gzip or 'drop' (only if point data was extracted via raw_as_array "
+        "or point_cloud).",
+    )
+    spec.input(
+        "metadata.options.point_cloud",
+        valid_type=bool,
+        default=False,
+        help=f"Store the points of raw outputs of {', '.join(POINT_CLOUD_OPTIONS)} as memory-mappable "
+        "'<link>_points' PointCloudData outputs, including cell and probe.",
+    )
+    spec.input(
+        "metadata.options.measure_resources",
+        valid_type=bool,
+        default=False,
+        help="Record wallclock time, CPU time and peak memory of every network invocation in output_parameters "
+        f"(written to '{RESOURCES_FILE}' by a wrapper script).",
+    )
+    spec.input(
+        "metadata.options.compress_outputs",
+        valid_type=list,
+        required=False,
+        validator=validate_compress_outputs,
+        help="zeo++ options whose output files are compressed with gzip on the remote side and retrieved "
+        "compressed, e.g. ['vsa', 'psd'] (decompressed on the fly by the parser).",
+    )
+    spec.input(
+        "metadata.options.output_policy",
+        valid_type=dict,
+        required=False,
+        validator=validate_output_policy,
+        help="What to do with the output files of zeo++ options after parsing, e.g. {'vsa': 'array', 'sa': 'discard'}: "
+        "'keep' them (default), keep their content only as binary arrays (psd, block, cssr and raw outputs) or "
+        "'discard' them. Files that are not kept are retrieved temporarily and never stored in the repository.",
+    )
+    spec.input(
+        "metadata.options.strip_cif",
+        valid_type=bool,
+        default=False,
+        help="Upload CIF input structures as minimal P1 files (cell and atom sites only, duplicate atoms merged) "
+        "instead of the original files.",
+    )
+    spec.input(
+        "parameters",
+        valid_type=NetworkParameters,
+        help="command line parameters for zeo++",
+    )
+    spec.input(
+        "atomic_radii",
+        valid_type=SinglefileData,
+        help="atomic radii file",
+        required=False,
+    )
+    spec.input(
+        "wrapper_code",
+        valid_type=AbstractCode,
+        required=False,
+        help="bash on the computer of the network code, running the wrapper scripts of the measure_resources "
+        "and packed options (network is run from the scripts, with the prepend and append text of its code).",
+    )
+
+    spec.exit_code(0, "SUCCESS", message="Calculation completed successfully.")
+    spec.exit_code(
+        101,
+        "ERROR_OUTPUT_FILES_MISSING",
+        message="Not all expected output files were found.",
+    )
+    spec.exit_code(
+        102,
+        "ERROR_EMPTY_BLOCK",
+        message="Empty block file. This indicates the calculation of blocked pockets did not finish.",
+    )
+    spec.exit_code(
+        104,
+        "ERROR_OUTPUT_PARSING",
+        message="An output file could not be parsed.",
+    )
+
+    spec.outputs.dynamic = True
+    spec.outputs.valid_type = Data
+
+
+def _resolve_parameters(parameters, structure, atomic_radii=None):
+    """Return parameters with sample densities resolved for the structure (see NetworkParameters).
+
+    :param atomic_radii: atomic radii file (optional)
+    """
+    if not parameters.sample_densities:
+        return parameters
+    return parameters.resolve_sample_densities(get_cell(structure), get_structure_radii(structure, atomic_radii))
+
+
+def _measured_command(folder, resources_file, command):
+    """Write measurement wrapper script and return the arguments of bash running the command through it.
+
+    :param folder: an `aiida.common.folders.Folder` to temporarily write files on disk
+    :param resources_file: path of the file to record the resources in
+    :param command: list of the executable and its command line parameters
+    :returns: list of the wrapper script and its arguments
+    """
+    with folder.open(MEASURE_SCRIPT, "w", encoding="utf8") as handle:
+        handle.write(MEASURE_SCRIPT_TEMPLATE.format(script=MEASURE_SCRIPT))
+    return [MEASURE_SCRIPT, resources_file] + command
+
+
+def _network_command(code, cmdline_params):
+    """Return command running the network code from a wrapper script, as AiiDA runs it without MPI.
+
+    Includes the command line of the engine of containerized codes.
+
+    :param code: the network code
+    :param cmdline_params: command line parameters of network
+    :returns: list of the executable and its arguments
+    """
+    command = code.get_executable_cmdline_params(cmdline_params)
+    if getattr(code, "wrap_cmdline_params", False):
+        command = [" ".join(shlex.quote(arg) for arg in command)]
+    return code.get_prepend_cmdline_params() + command
+
+
+def _wrapper_codeinfo(calcinfo, inputs, cmdline_params, stdin_name=None):
+    """Return CodeInfo running bash (the wrapper code) with the given arguments.
+
+    Since the network code is not run by its own CodeInfo, its prepend and append text are added to the CalcInfo.
+
+    :param calcinfo: the CalcInfo of the calculation
+    :param inputs: the inputs of the calculation
+    :param cmdline_params: arguments of bash
+    :param stdin_name: file to redirect to standard input (optional)
+    """
+    calcinfo.prepend_text = inputs.code.prepend_text
+    calcinfo.append_text = inputs.code.append_text
+
+    codeinfo = CodeInfo()
+    codeinfo.cmdline_params = cmdline_params
+    codeinfo.stdin_name = stdin_name
+    codeinfo.code_uuid = inputs.wrapper_code.uuid
+    codeinfo.withmpi = False
+    return codeinfo
+
+
+@functools.lru_cache(maxsize=STRIPPED_CIF_CACHE_SIZE)
+def get_stripped_cif(uuid):
+    """Return minimal P1 .cif content of a stored CifData (see `CifParser.write_p1`).
+
+    Stored nodes are immutable, so the result is cached per UUID and repeated runs on the same structure
+    (e.g. by the same daemon worker) reuse the stripped file.
+
+    :param uuid: UUID of the CifData node
+    """
+    return CifParser.write_p1(load_node(uuid).get_content())
+
+
+def _add_structure(folder, calcinfo, structure, structure_filename, strip_cif=False):
+    """Add input structure to the submission folder.
+
+    CifData is copied (or stripped to a minimal P1 file, if requested and readable by the native reader),
+    StructureData is written in .cssr format directly (no intermediate CifData node is needed).
+    """
+    content = None
+    if isinstance(structure, StructureData):
+        content = CssrParser.write_aiida(structure)
+    elif strip_cif and structure.is_stored:
+        try:
+            content = get_stripped_cif(structure.uuid)
+        except ValueError:
+            pass
+
+    if content is None:
+        calcinfo.local_copy_list.append((structure.uuid, structure.filename, structure_filename))
+    else:
+        with folder.open(structure_filename, "w", encoding="utf8") as handle:
+            handle.write(content)
+
+
+def validate_compress_outputs(value, _ctx):
+    """Validate the compress_outputs option."""
+    if value is not None:
+        unknown = [option for option in value if option not in OUTPUT_REGISTRY]
+        if unknown:
+            return f"compress_outputs must contain zeo++ options with output files, got {unknown}"
+    return None
+
+
+def validate_output_policy(value, _ctx):
+    """Validate the output_policy option."""
+    if value is not None:
+        unknown = [option for option in value if option not in OUTPUT_REGISTRY]
+        if unknown:
+            return f"output_policy must map zeo++ options with output files to policies, got {unknown}"
+        invalid = {option: policy for option, policy in value.items() if policy not in OUTPUT_POLICIES}
+        if invalid:
+            return f"output policies must be one of {OUTPUT_POLICIES}, got {invalid}"
+    return None
+
+
+def _get_output_files(parameters, options):
+    """Return names of the output files of the given zeo++ options (if specified in the parameters).
+
+    :param parameters: NetworkParameters
+    :param options: zeo++ options (None for none)
+    :returns: set of file names
+    """
+    output_dict = parameters.output_dict
+    return {fname for option in options or () for fname in output_dict.get(option, ())}
+
+
+def _get_temporary_files(parameters, policies):
+    """Return names of the output files that are only retrieved temporarily (policies other than 'keep').
+
+    :param parameters: NetworkParameters
+    :param policies: dictionary of output policies by zeo++ option (None for none)
+    """
+    return _get_output_files(parameters, [option for option, policy in (policies or {}).items() if policy != "keep"])
+
+
+def _add_retrieved_files(calcinfo, parameters, node, directory=None):
+    """Add output files to the retrieve list, resp. to the retrieve temporary list.
+
+    Output files are retrieved compressed (see the compress_outputs option)
+    and temporarily, if they are not kept (see the output_policy option).
+
+    :param parameters: NetworkParameters
+    :param node: node of the calculation
+    :param directory: subdirectory of the output files (None for the working directory)
+    """
+    compressed = _get_output_files(parameters, node.get_option("compress_outputs"))
+    temporary = _get_temporary_files(parameters, node.get_option("output_policy"))
+    for fname in parameters.output_files:
+        name = fname + COMPRESSED_SUFFIX if fname in compressed else fname
+        item = (f"{directory}/{name}", ".", 2) if directory else name
+        if fname in temporary:
+            calcinfo.retrieve_temporary_list.append(item)
+        else:
+            calcinfo.retrieve_list.append(item)
+
+
+def _append_compression(calcinfo, paths):
+    """Compress output files with gzip on the remote side, after all runs have finished.
+
+    :param paths: paths of the output files relative to the working directory
+    """
+    if not paths:
+        return
+    command = " ".join(["gzip", "-f", "--"] + [shlex.quote(path) for path in paths])
+    calcinfo.append_text = f"{calcinfo.append_text}\n{command}" if calcinfo.append_text else command
+
+
+def _add_atomic_radii(inputs, calcinfo):
+    """Add atomic radii file (if specified) to the local copy list.
+
+    :returns: name of the atomic radii file (None, if not specified)
+    """
+    if "atomic_radii" not in inputs:
+        return None
+
+    atomic_radii = inputs.atomic_radii
+    calcinfo.local_copy_list.append((atomic_radii.uuid, atomic_radii.filename, atomic_radii.filename))
+    return atomic_radii.filename
 
 
 class NetworkCalculation(CalcJob):
@@ -18,44 +473,12 @@ class NetworkCalculation(CalcJob):
     @classmethod
     def define(cls, spec):
         super().define(spec)
+        _define_common(spec)
+        spec.inputs.validator = validate_inputs
 
-        spec.input(
-            "metadata.options.resources",
-            valid_type=dict,
-            default={
-                "num_machines": 1,
-                "num_mpiprocs_per_machine": 1,
-                "tot_num_mpiprocs": 1,
-            },
-        )
         spec.input("metadata.options.parser_name", valid_type=str, default="zeopp.network")
-        spec.input(
-            "parameters",
-            valid_type=NetworkParameters,
-            help="command line parameters for zeo++",
-        )
-        spec.input("structure", valid_type=CifData, help="input structure to be analyzed")
-        spec.input(
-            "atomic_radii",
-            valid_type=SinglefileData,
-            help="atomic radii file",
-            required=False,
-        )
-
-        spec.exit_code(0, "SUCCESS", message="Calculation completed successfully.")
-        spec.exit_code(
-            101,
-            "ERROR_OUTPUT_FILES_MISSING",
-            message="Not all expected output files were found.",
-        )
-        spec.exit_code(
-            102,
-            "ERROR_EMPTY_BLOCK",
-            message="Empty block file. This indicates the calculation of blocked pockets did not finish.",
-        )
+        spec.input("structure", valid_type=(CifData, StructureData), help="input structure to be analyzed")
 
-        spec.outputs.dynamic = True
-        spec.outputs.valid_type = Data
         spec.output(
             "output_parameters",
             valid_type=Dict,
@@ -67,6 +490,18 @@ class NetworkCalculation(CalcJob):
             help="Blocked pockets fileoutput file.",
             required=False,
         )
+        spec.output(
+            "block_spheres",
+            valid_type=ArrayData,
+            help="Centers and radii of blocking spheres (only with block_as_array option).",
+            required=False,
+        )
+        spec.output(
+            "psd",
+            valid_type=ArrayData,
+            help="Pore size distribution histogram (only with psd_as_array option).",
+            required=False,
+        )
 
         spec.default_output_node = "output_parameters"
 
@@ -86,24 +521,167 @@ class NetworkCalculation(CalcJob):
         # network infers file format from file extension
         structure = self.inputs.structure
         structure_filename = self.inputs.parameters.get_structure_file_name(structure)
-        calcinfo.local_copy_list = [(structure.uuid, structure.filename, structure_filename)]
+        calcinfo.local_copy_list = []
+        _add_structure(folder, calcinfo, structure, structure_filename, self.node.get_option("strip_cif"))
+
+        radii_file_name = _add_atomic_radii(self.inputs, calcinfo)
+
+        calcinfo.remote_copy_list = []
+        calcinfo.retrieve_list = []
+        calcinfo.retrieve_temporary_list = []
+        _add_retrieved_files(calcinfo, self.inputs.parameters, self.node)
+
+        cmdline_params = _resolve_parameters(
+            self.inputs.parameters, structure, self.inputs.get("atomic_radii")
+        ).cmdline_params(structure_file_name=structure_filename, radii_file_name=radii_file_name)
 
-        if "atomic_radii" in self.inputs:
-            atomic_radii = self.inputs.atomic_radii
-            radii_file_name = atomic_radii.filename
-            calcinfo.local_copy_list.append((atomic_radii.uuid, atomic_radii.filename, atomic_radii.filename))
+        if self.node.get_option("measure_resources"):
+            # network is run through the measurement wrapper, run by the wrapper code
+            command = _measured_command(folder, RESOURCES_FILE, _network_command(self.inputs.code, cmdline_params))
+            calcinfo.codes_info = [_wrapper_codeinfo(calcinfo, self.inputs, command)]
+            calcinfo.retrieve_list.append(RESOURCES_FILE)
         else:
-            radii_file_name = None
+            codeinfo = CodeInfo()
+            codeinfo.cmdline_params = cmdline_params
+            codeinfo.code_uuid = self.inputs.code.uuid
+            codeinfo.withmpi = False
+            calcinfo.codes_info = [codeinfo]
 
+        _append_compression(
+            calcinfo, sorted(_get_output_files(self.inputs.parameters, self.node.get_option("compress_outputs")))
+        )
+
+        return calcinfo
+
+
+class NetworkBatchCalculation(CalcJob):
+    """
+    AiiDA calculation plugin running the zeo++ network binary on many structures in a single job
+
+    All structures are analyzed with the same parameters.
+    Each structure is run in its own subdirectory, named after its key in the ``structures`` namespace,
+    and all outputs are emitted per structure, e.g. ``output_parameters.<key>``.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super().define(spec)
+        _define_common(spec)
+        spec.inputs.validator = validate_batch_inputs
+
+        spec.input("metadata.options.parser_name", valid_type=str, default="zeopp.network_batch")
+        spec.input_namespace(
+            "structures",
+            valid_type=(CifData, StructureData),
+            dynamic=True,
+            help="input structures to be analyzed (keys are used as names of the subdirectories)",
+        )
+        spec.input(
+            "metadata.options.packed",
+            valid_type=bool,
+            default=False,
+            help="Run up to tot_num_mpiprocs network processes concurrently (one per structure) from a work queue, "
+            f"on a single machine, recording exit status and timing of each task in '<key>/{TASK_STATUS_FILE}'.",
+        )
+
+        spec.exit_code(
+            103,
+            "ERROR_STRUCTURES_FAILED",
+            message="Output files of some structures are missing.",
+        )
+
+        spec.output_namespace(
+            "output_parameters",
+            valid_type=Dict,
+            dynamic=True,
+            help="key-value pairs parsed from zeo++ output file(s), one per structure.",
+        )
+
+    def prepare_for_submission(self, folder):
+        """
+        Create input files.
+
+        :param folder: an `aiida.common.folders.Folder` to temporarily write files on disk
+        :return: `aiida.common.datastructures.CalcInfo` instance
+
+        """
+        parameters = self.inputs.parameters
+
+        calcinfo = CalcInfo()
+        calcinfo.uuid = self.uuid
+        calcinfo.local_copy_list = []
         calcinfo.remote_copy_list = []
-        calcinfo.retrieve_list = self.inputs.parameters.output_files
+        calcinfo.retrieve_list = []
+        calcinfo.retrieve_temporary_list = []
+        calcinfo.codes_info = []
+        # structures are run one after the other, the job continues if the run of one structure fails
+        calcinfo.codes_run_mode = CodeRunMode.SERIAL
+
+        radii_file_name = _add_atomic_radii(self.inputs, calcinfo)
+        packed = self.node.get_option("packed")
+        measure_resources = self.node.get_option("measure_resources")
+        tasks = []
+
+        for key, structure in sorted(self.inputs.structures.items()):
+            folder.get_subfolder(key, create=True)
+
+            # network infers file format from file extension
+            structure_filename = f"{key}/{parameters.get_structure_file_name(structure)}"
+            _add_structure(folder, calcinfo, structure, structure_filename, self.node.get_option("strip_cif"))
+
+            # retrieve output files into subdirectory of the structure
+            _add_retrieved_files(calcinfo, parameters, self.node, directory=key)
+
+            cmdline_params = _resolve_parameters(parameters, structure, self.inputs.get("atomic_radii")).cmdline_params(
+                structure_file_name=structure_filename, radii_file_name=radii_file_name, output_directory=key
+            )
+            if packed:
+                calcinfo.retrieve_list.append((f"{key}/{TASK_STATUS_FILE}", ".", 2))
 
-        codeinfo = CodeInfo()
-        codeinfo.cmdline_params = self.inputs.parameters.cmdline_params(
-            structure_file_name=structure_filename, radii_file_name=radii_file_name
+            if measure_resources:
+                calcinfo.retrieve_list.append((f"{key}/{RESOURCES_FILE}", ".", 2))
+                command = _network_command(self.inputs.code, cmdline_params)
+                tasks.append(["bash"] + _measured_command(folder, f"{key}/{RESOURCES_FILE}", command))
+            elif packed:
+                tasks.append(_network_command(self.inputs.code, cmdline_params))
+            else:
+                codeinfo = CodeInfo()
+                codeinfo.cmdline_params = cmdline_params
+                codeinfo.code_uuid = self.inputs.code.uuid
+                codeinfo.withmpi = False
+                calcinfo.codes_info.append(codeinfo)
+
+        # with packed or measure_resources, network is run through wrapper scripts, run by the wrapper code
+        if packed:
+            command = self._write_task_queue(folder, sorted(self.inputs.structures), tasks)
+            calcinfo.codes_info = [_wrapper_codeinfo(calcinfo, self.inputs, ["-c", command], stdin_name=TASK_LIST)]
+        elif measure_resources:
+            calcinfo.codes_info = [_wrapper_codeinfo(calcinfo, self.inputs, task[1:]) for task in tasks]
+
+        compressed = sorted(_get_output_files(parameters, self.node.get_option("compress_outputs")))
+        _append_compression(
+            calcinfo, [f"{key}/{fname}" for key in sorted(self.inputs.structures) for fname in compressed]
         )
-        codeinfo.code_uuid = self.inputs.code.uuid
-        codeinfo.withmpi = False
-        calcinfo.codes_info = [codeinfo]
 
         return calcinfo
+
+    def _write_task_queue(self, folder, keys, tasks):
+        """Write task script and task list for packed runs.
+
+        Tasks are run by ``xargs`` with as many concurrent processes as MPI processes were requested
+        (on a single machine, see `validate_batch_inputs`).
+
+        :param folder: an `aiida.common.folders.Folder` to temporarily write files on disk
+        :param keys: directories of the tasks
+        :param tasks: list of tasks, each a list of the executable and its arguments
+        :returns: bash command running the task queue, reading the task list from standard input
+        """
+        num_workers = get_job_resource(self.node.computer, self.node.get_option("resources")).get_tot_num_mpiprocs()
+
+        with folder.open(TASK_SCRIPT, "w", encoding="utf8") as handle:
+            handle.write(TASK_SCRIPT_TEMPLATE.format(script=TASK_SCRIPT, status_file=TASK_STATUS_FILE))
+        with folder.open(TASK_LIST, "w", encoding="utf8") as handle:
+            for key, task in zip(keys, tasks):
+                handle.write(" ".join(shlex.quote(arg) for arg in [key] + task) + "\n")
+
+        return f"xargs -P {num_workers} -L 1 bash {TASK_SCRIPT}"
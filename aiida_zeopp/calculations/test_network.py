@@ -11,6 +11,7 @@ from aiida.plugins import CalculationFactory, DataFactory
 from aiida_zeopp.tests import TEST_DIR
 
 NetworkCalculation = CalculationFactory("zeopp.network")
+NetworkBatchCalculation = CalculationFactory("zeopp.network_batch")
 NetworkParameters = DataFactory("zeopp.parameters")
 CifData = DataFactory("core.cif")
 SinglefileData = DataFactory("core.singlefile")
@@ -118,3 +119,240 @@ def test_filename(network_code, basic_options):  # pylint: disable=unused-argume
     result, node = run_get_node(NetworkCalculation, **inputs)
     assert "structure_cssr" in result
     assert node.res.Input_structure_filename == input_filename
+
+
+def test_structure_data(network_code, basic_options):  # pylint: disable=unused-argument,invalid-name
+    """Test submitting a calculation from StructureData (written in .cssr format)."""
+    from aiida_zeopp.parsers.structure import CssrParser
+
+    parameters = NetworkParameters(dict={"res": True, "vol": [0.0, 0.0, "0.1/A^3"], "sa": [1.2, 1.2, "1/A^2"]})
+    with open(os.path.join(TEST_DIR, "MgO.cssr"), encoding="utf8") as handle:
+        structure = CssrParser.parse_aiida(handle.read())
+
+    inputs = {
+        "code": network_code,
+        "parameters": parameters,
+        "structure": structure,
+        "atomic_radii": SinglefileData(file=os.path.join(TEST_DIR, "MgO.rad")),
+        "metadata": {
+            "options": basic_options,
+        },
+    }
+
+    result, node = run_get_node(NetworkCalculation, **inputs)
+    assert node.is_finished_ok
+    assert node.res.Input_structure_filename == "structure.cssr"
+    assert node.res.Input_vol_samples == 12  # 0.1/A^3 * 117.5 A^3
+    # 1/A^2 * 4 pi <(r + 1.2 A)^2> with the radii of MgO.rad (4 Mg, 8 O)
+    assert node.res.Input_sa_samples == 92
+    assert "AV_A^3" in result["output_parameters"].get_dict()
+
+
+def test_psd_as_array(network_code, basic_options):  # pylint: disable=unused-argument,invalid-name
+    """Test storing the pore size distribution as ArrayData."""
+    parameters = NetworkParameters(dict={"ha": "LOW", "psd": [1.2, 1.2, 1000]})
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy")
+
+    inputs = {
+        "code": network_code,
+        "parameters": parameters,
+        "structure": structure,
+        "metadata": {
+            "options": dict(basic_options, psd_as_array=True),
+        },
+    }
+
+    result, _node = run_get_node(NetworkCalculation, **inputs)
+
+    output_parameters = result["output_parameters"].get_dict()
+    assert "psd" not in output_parameters
+    assert result["psd"].get_array("counts").sum() == output_parameters["PSD_total_counts"]
+    assert len(result["psd"].get_array("bins")) == output_parameters["PSD_number_of_bins"]
+
+
+def test_compress_outputs(network_code, basic_options):  # pylint: disable=unused-argument,invalid-name
+    """Test retrieving output files compressed."""
+    parameters = NetworkParameters(dict={"ha": "LOW", "psd": [1.2, 1.2, 1000], "vsa": [1.2, 1.2, 100]})
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy")
+
+    inputs = {
+        "code": network_code,
+        "parameters": parameters,
+        "structure": structure,
+        "metadata": {
+            "options": dict(basic_options, psd_as_array=True, compress_outputs=["psd", "vsa"]),
+        },
+    }
+
+    result, node = run_get_node(NetworkCalculation, **inputs)
+
+    assert node.is_finished_ok
+    assert set(node.outputs.retrieved.list_object_names()) >= {"out.psd.gz", "out.vsa.gz"}
+    assert result["psd"].get_array("counts").sum() == result["output_parameters"]["PSD_total_counts"]
+    assert result["surface_sample_vsa"].filename == "out.vsa"
+
+
+def test_output_policy(network_code, basic_options):  # pylint: disable=unused-argument,invalid-name
+    """Test storing only parsed results of output files."""
+    parameters = NetworkParameters(dict={"ha": "LOW", "res": True, "psd": [1.2, 1.2, 1000], "vsa": [1.2, 1.2, 100]})
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy")
+
+    inputs = {
+        "code": network_code,
+        "parameters": parameters,
+        "structure": structure,
+        "metadata": {
+            "options": dict(basic_options, output_policy={"res": "discard", "psd": "array", "vsa": "array"}),
+        },
+    }
+
+    result, node = run_get_node(NetworkCalculation, **inputs)
+
+    assert node.is_finished_ok
+    assert not {"out.res", "out.psd", "out.vsa"} & set(node.outputs.retrieved.list_object_names())
+    assert "Largest_included_sphere" in result["output_parameters"].get_dict()
+    assert "psd" in result
+    assert "surface_sample_vsa" not in result
+    assert "surface_sample_vsa_points" in result
+
+
+def test_batch(network_code, basic_options):  # pylint: disable=unused-argument,invalid-name
+    """Test running network on several structures in a single calculation."""
+    parameters = NetworkParameters(dict={"res": True, "cssr": True})
+    structures = {
+        "hkust1": CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy"),
+        "mgo": CifData(file=os.path.join(TEST_DIR, "MgO.cif"), parse_policy="lazy"),
+    }
+
+    inputs = {
+        "code": network_code,
+        "parameters": parameters,
+        "structures": structures,
+        "metadata": {
+            "options": basic_options,
+        },
+    }
+
+    result, node = run_get_node(NetworkBatchCalculation, **inputs)
+
+    assert node.is_finished_ok
+    assert set(result["output_parameters"]) == {"hkust1", "mgo"}
+    assert result["output_parameters"]["mgo"]["Input_structure_filename"] == "MgO.cif"
+
+    cssr = open(os.path.join(TEST_DIR, "HKUST-1.cssr"), encoding="utf8").read()
+    assert cssr == result["structure_cssr"]["hkust1"].get_content()
+
+
+def test_batch_packed(network_code, wrapper_code, basic_options):  # pylint: disable=invalid-name
+    """Test running network on several structures concurrently."""
+    parameters = NetworkParameters(dict={"res": True})
+    structures = {
+        key: CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy") for key in ("s1", "s2", "s3")
+    }
+
+    options = dict(basic_options, packed=True, resources={"num_machines": 1, "num_mpiprocs_per_machine": 2})
+    inputs = {
+        "code": network_code,
+        "wrapper_code": wrapper_code,
+        "parameters": parameters,
+        "structures": structures,
+        "metadata": {
+            "options": options,
+        },
+    }
+
+    result, node = run_get_node(NetworkBatchCalculation, **inputs)
+
+    assert node.is_finished_ok
+    for key in structures:
+        output_parameters = result["output_parameters"][key].get_dict()
+        assert output_parameters["Task_exit_status"] == 0
+        assert output_parameters["Task_wallclock_seconds"] >= 0
+        assert "Largest_free_sphere" in output_parameters
+
+
+def test_batch_packed_resources(
+    network_code, wrapper_code, basic_options, tmp_path, monkeypatch
+):  # pylint: disable=invalid-name
+    """Test the number of concurrent tasks of packed runs."""
+    # dry runs write the submission folder into the working directory
+    monkeypatch.chdir(tmp_path)
+    structures = {
+        key: CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy") for key in ("s1", "s2", "s3")
+    }
+    inputs = {
+        "code": network_code,
+        "wrapper_code": wrapper_code,
+        "parameters": NetworkParameters(dict={"res": True}),
+        "structures": structures,
+        "metadata": {
+            "options": dict(basic_options, packed=True, resources={"num_machines": 1}),
+            "dry_run": True,
+        },
+    }
+
+    # MPI processes per machine default to those of the computer
+    network_code.computer.set_default_mpiprocs_per_machine(3)
+    _result, node = run_get_node(NetworkBatchCalculation, **inputs)
+    with open(os.path.join(node.dry_run_info["folder"], "_aiidasubmit.sh"), encoding="utf8") as handle:
+        assert "xargs -P 3 " in handle.read()
+
+    # all tasks run on the first node, so packed runs are restricted to a single machine
+    inputs["metadata"]["options"]["resources"] = {"num_machines": 2, "num_mpiprocs_per_machine": 2}
+    with pytest.raises(ValueError, match="single machine"):
+        run_get_node(NetworkBatchCalculation, **inputs)
+
+
+def test_measure_resources(network_code, wrapper_code, basic_options):  # pylint: disable=invalid-name
+    """Test recording runtime and peak memory of network."""
+    parameters = NetworkParameters(dict={"res": True})
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy")
+
+    inputs = {
+        "code": network_code,
+        "wrapper_code": wrapper_code,
+        "parameters": parameters,
+        "structure": structure,
+        "metadata": {
+            "options": dict(basic_options, measure_resources=True),
+        },
+    }
+
+    result, node = run_get_node(NetworkCalculation, **inputs)
+
+    assert node.is_finished_ok
+    output_parameters = result["output_parameters"].get_dict()
+    assert output_parameters["Network_exit_status"] == 0
+    assert output_parameters["Network_wallclock_seconds"] >= 0
+    assert "Network_peak_memory_kB" in output_parameters
+
+
+def test_measure_resources_script(
+    network_code, wrapper_code, basic_options, tmp_path, monkeypatch
+):  # pylint: disable=invalid-name
+    """Test that the measured network run is part of the code section of the submission script."""
+    # dry runs write the submission folder into the working directory
+    monkeypatch.chdir(tmp_path)
+    options = dict(basic_options, measure_resources=True, prepend_text="echo prepend", append_text="echo append")
+    inputs = {
+        "code": network_code,
+        "parameters": NetworkParameters(dict={"res": True}),
+        "structure": CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy"),
+        "metadata": {"options": options, "dry_run": True},
+    }
+
+    with pytest.raises(ValueError, match="wrapper_code"):
+        run_get_node(NetworkCalculation, **inputs)
+    # the wrapper scripts are run by bash
+    inputs["wrapper_code"] = network_code
+    with pytest.raises(ValueError, match="bash"):
+        run_get_node(NetworkCalculation, **inputs)
+
+    inputs["wrapper_code"] = wrapper_code
+    _result, node = run_get_node(NetworkCalculation, **inputs)
+    with open(os.path.join(node.dry_run_info["folder"], "_aiidasubmit.sh"), encoding="utf8") as handle:
+        script = handle.read()
+
+    run = script.index("_zeopp_measure.sh")
+    assert script.index("echo prepend") < run < script.index("echo append")
+    assert str(network_code.get_executable()) in script[run:].splitlines()[0]
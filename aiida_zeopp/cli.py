@@ -0,0 +1,95 @@
+"""Command line interface of aiida-zeopp, available as ``verdi data zeopp``."""
+import click
+from aiida.cmdline.commands.cmd_data import verdi_data
+from aiida.cmdline.params import arguments
+from aiida.cmdline.utils import decorators, echo
+
+
+@verdi_data.group("zeopp")
+def data_cli():
+    """Tools for zeo++ calculations."""
+
+
+@data_cli.command("reparse")
+@arguments.CALCULATIONS()
+@click.option(
+    "-o",
+    "--option",
+    "options",
+    multiple=True,
+    help="zeo++ option whose output file to re-parse, e.g. 'sa'. Can be repeated. Defaults to all parsable outputs.",
+)
+@click.option(
+    "-w", "--max-workers", type=int, default=None, help="Number of worker processes (default: number of CPUs)."
+)
+@click.option("-b", "--batch-size", type=int, default=1000, show_default=True, help="Calculations per batch.")
+@click.option(
+    "-k",
+    "--extras-key",
+    default="reparsed_output_parameters",
+    show_default=True,
+    help="Extras key under which the re-parsed results are stored.",
+)
+@click.option("-n", "--dry-run", is_flag=True, help="Parse, but do not store the results.")
+@decorators.with_dbenv()
+def reparse(calculations, options, max_workers, batch_size, extras_key, dry_run):  # pylint: disable=too-many-arguments
+    """Re-parse retrieved files of finished zeo++ network calculations.
+
+    By default, all successfully finished zeopp.network calculations are re-parsed.
+    """
+    from aiida_zeopp.tools.reparse import (  # pylint: disable=import-outside-toplevel
+        get_calculations_query,
+        reparse_calculations,
+    )
+
+    query = get_calculations_query(filters={"id": {"in": [calc.pk for calc in calculations]}} if calculations else None)
+
+    stats = reparse_calculations(
+        query=query,
+        options=options or None,
+        max_workers=max_workers,
+        batch_size=batch_size,
+        extras_key=extras_key,
+        dry_run=dry_run,
+        echo=echo.echo_report,
+    )
+
+    for pk, error in stats["failures"].items():
+        echo.echo_warning(f"Calculation<{pk}>: {error}")
+
+    echo.echo_success(
+        f"Re-parsed {stats['files']} files of {stats['calculations']} calculations in {stats['time']:.1f} s "
+        f"({stats['files_per_second']:.1f} files/s, {stats['failed']} failed)."
+    )
+
+
+@data_cli.command("export")
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option(
+    "-k",
+    "--key",
+    "keys",
+    multiple=True,
+    help="Key of the output parameters to export, e.g. 'ASA_m^2/g' or 'Input_sa'. Can be repeated. "
+    "Defaults to the largest spheres, accessible surface area and volumes and the density.",
+)
+@click.option("-b", "--batch-size", type=int, default=10000, show_default=True, help="Rows per batch.")
+@decorators.with_dbenv()
+def export(output, keys, batch_size):
+    """Export results of finished zeo++ network calculations to a columnar file.
+
+    OUTPUT is written in NumPy .npz format, or as a Parquet file if it ends in '.parquet' (requires pyarrow).
+    """
+    from aiida_zeopp.tools.export import (  # pylint: disable=import-outside-toplevel
+        DEFAULT_KEYS,
+        export_results,
+    )
+
+    try:
+        stats = export_results(output, keys=keys or DEFAULT_KEYS, batch_size=batch_size, echo=echo.echo_report)
+    except (ImportError, ValueError) as exc:
+        echo.echo_critical(str(exc))
+
+    echo.echo_success(
+        f"Exported {stats['rows']} rows to {output} in {stats['time']:.1f} s ({stats['rows_per_second']:.1f} rows/s)."
+    )
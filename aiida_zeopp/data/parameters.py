@@ -1,35 +1,275 @@
 """Input parameter class for network executable."""
+import functools
+import importlib
+import math
+import re
+import warnings
+
+import numpy as np
 from aiida.orm import Dict
 from aiida.plugins import DataFactory
-from voluptuous import Any, ExactSequence, Schema
+from aiida.plugins.entry_point import get_entry_points
+from voluptuous import Any, ExactSequence, Match, Schema
+
+# Entry point group for plugging in parsers of output files.
+# The entry point name is the zeo++ option, the object is the parser class, e.g.
+# 'vsa' = 'my_package.parsers:SurfaceSampleParser'
+PARSER_ENTRY_POINT_GROUP = "aiida_zeopp.parsers"
+
+# file name of StructureData inputs, which are written in .cssr format
+STRUCTURE_CSSR_FILE_NAME = "structure.cssr"
+
+# what to do with the output files of an option after parsing (see the output_policy option of NetworkCalculation):
+# 'keep' the files, keep their content only as binary 'array' outputs (where applicable) or 'discard' them
+OUTPUT_POLICIES = ("keep", "array", "discard")
+
+
+# Sample counts of Monte Carlo options may be given as densities, resolved for each input structure:
+# 'sa': samples per A^2 of the surface of the sphere around an atom (zeo++ samples the spheres of all atoms)
+# 'vol', 'volpo': samples per A^3 of the unit cell
+# The pattern is formatted with the dimension(s) of the density (e.g. '2' or '[23]').
+SAMPLE_DENSITY_PATTERN = r"^(\d+(?:\.\d*)?|\.\d+)/A\^({dimension})$"
+SAMPLE_DENSITY_REGEX = re.compile(SAMPLE_DENSITY_PATTERN.format(dimension="[23]"))
+SAMPLE_DENSITY_OPTIONS = {"sa": 2, "vol": 3, "volpo": 3}
+
+# Default atomic radii (Angstrom) approximating the built-in radii of zeo++ (van der Waals radii of the CCDC),
+# used where no atomic_radii file is given. Radii of other elements: see default_radius of `get_atom_radii`.
+DEFAULT_ATOMIC_RADII = {
+    "H": 1.09,
+    "He": 1.4,
+    "Li": 1.82,
+    "C": 1.7,
+    "N": 1.55,
+    "O": 1.52,
+    "F": 1.47,
+    "Ne": 1.54,
+    "Na": 2.27,
+    "Mg": 1.73,
+    "Si": 2.1,
+    "P": 1.8,
+    "S": 1.8,
+    "Cl": 1.75,
+    "Ar": 1.88,
+    "K": 2.75,
+    "Ni": 1.63,
+    "Cu": 1.4,
+    "Zn": 1.39,
+    "Ga": 1.87,
+    "As": 1.85,
+    "Se": 1.9,
+    "Br": 1.85,
+    "Kr": 2.02,
+    "Pd": 1.63,
+    "Ag": 1.72,
+    "Cd": 1.58,
+    "In": 1.93,
+    "Sn": 2.17,
+    "Te": 2.06,
+    "I": 1.98,
+    "Xe": 2.16,
+    "Pt": 1.72,
+    "Au": 1.66,
+    "Hg": 1.55,
+    "Tl": 1.96,
+    "Pb": 2.02,
+    "U": 1.86,
+}
+
+
+def sample_count(dimension):
+    """Return validator for a sample count given as integer or density, e.g. '0.5/A^3'.
+
+    :param dimension: dimension of the density (2 for per A^2, 3 for per A^3)
+    """
+    return Any(
+        int,
+        Match(
+            SAMPLE_DENSITY_PATTERN.format(dimension=dimension), msg=f"expected int or density like '1/A^{dimension}'"
+        ),
+    )
+
+
+def parse_atomic_radii(string):
+    """Parse content of an atomic radii file (one element and its radius per line).
+
+    :param string: content of the atomic radii file (.rad format of zeo++)
+    :returns: dictionary with radii (Angstrom) by element
+    :raises ValueError: if a line cannot be parsed
+    """
+    radii = {}
+    for line in string.splitlines():
+        if not line.strip():
+            continue
+        try:
+            symbol, radius = line.split()
+            radii[symbol] = float(radius)
+        except ValueError as exc:
+            raise ValueError(f"Invalid line in atomic radii file: {line!r}") from exc
+    return radii
+
+
+def get_atom_radii(symbols, atomic_radii=None, default_radius=2.0):
+    """Return radii of atoms as used by zeo++.
+
+    :param symbols: elements of the atoms
+    :param atomic_radii: content of the atomic radii file (overrides `DEFAULT_ATOMIC_RADII`; optional)
+    :param default_radius: radius (Angstrom) of elements neither in the file nor in `DEFAULT_ATOMIC_RADII`
+    :returns: list of radii (Angstrom)
+    """
+    radii = dict(DEFAULT_ATOMIC_RADII)
+    if atomic_radii is not None:
+        radii.update(parse_atomic_radii(atomic_radii))
+    return [radii.get(symbol, default_radius) for symbol in symbols]
+
+
+def resolve_sample_count(value, probe_radius, cell, atom_radii=None):
+    """Resolve sample count given as density for a given unit cell.
+
+    Surface densities refer to the mean surface of the spheres around the atoms
+    (atom radius plus probe radius), volume densities to the volume of the unit cell.
+
+    :param value: sample count (int) or density (e.g. '0.5/A^3')
+    :param probe_radius: radius of the probe (Angstrom)
+    :param cell: 3x3 array with cell vectors as rows (Angstrom)
+    :param atom_radii: radii of the atoms in the unit cell (Angstrom), needed for surface densities
+    :returns: number of samples (int)
+    """
+    if isinstance(value, int):
+        return value
+
+    match = SAMPLE_DENSITY_REGEX.match(value)
+    if match is None:
+        raise ValueError(f"Invalid sample density {value!r}")
+    density, dimension = float(match.group(1)), match.group(2)
+    if dimension == "2":
+        if atom_radii is None or len(atom_radii) == 0:
+            raise ValueError(f"Radii of the atoms are needed to resolve sample density {value!r}")
+        size = 4 * math.pi * np.mean((np.asarray(atom_radii, dtype=float) + probe_radius) ** 2)
+    else:
+        size = abs(np.linalg.det(np.asarray(cell, dtype=float)))
+    # note: rounding avoids e.g. 0.5 * 1000.0000000001 -> 501
+    return max(1, math.ceil(round(density * size, 6)))
+
+
+class OutputOption:
+    """Option of the network binary that produces output file(s).
+
+    Holds everything needed to handle the output: accepted values, output link labels
+    (one per output file) and the parser for the output file(s).
+
+    :param name: name of the command line option
+    :param validator: voluptuous validator for the value of the option
+    :param labels: output link labels (one per output file)
+    :param parser: parser class or import path ``'module:class'`` of the parser (imported on first use).
+        None, if no parser is implemented.
+    """
+
+    def __init__(self, name, validator, labels, parser=None):
+        self.name = name
+        self.validator = validator
+        self.labels = tuple(labels)
+        self._parser = parser
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.name!r})"
+
+    def file_names(self, prefix):
+        """Return names of output files.
+
+        :param prefix: file name template, e.g. 'out.{}'
+        """
+        file_name = prefix.format(self.name)
+        if len(self.labels) == 1:
+            return [file_name]
+        # if multiple files, append link labels
+        return [f"{file_name}.{label}" for label in self.labels]
+
+    @property
+    def parser(self):
+        """Return parser class for the output file(s) (or None, if no parser is implemented)."""
+        if isinstance(self._parser, str):
+            module_name, _, class_name = self._parser.partition(":")
+            self._parser = getattr(importlib.import_module(module_name), class_name)
+        return self._parser
+
+    @parser.setter
+    def parser(self, parser):
+        """Set parser class or import path ``'module:class'`` of the parser."""
+        self._parser = parser
 
-import aiida_zeopp.parsers.plain as pp
 
 # These options allow specifying the name of the output file
-# key : [ accepted values, labels ]
-OUTPUT_OPTIONS = {
-    "cssr": (bool, ["structure_cssr"]),
-    "v1": (bool, ["structure_v1"]),
-    "xyz": (bool, ["structure_xyz"]),
-    "nt2": (bool, ["network_nt2"]),
-    "res": (bool, ["free_sphere_res"]),
-    "zvis": (bool, ["network_zvis"]),
-    "axs": (float, ["nodes_axs"]),
-    "visVoro": (float, ["voro", "voro_accessible", "voro_nonaccessible"]),
-    "sa": (ExactSequence([float, float, int]), ["surface_area_sa"]),
-    "vsa": (ExactSequence([float, float, int]), ["surface_sample_vsa"]),
-    "vol": (ExactSequence([float, float, int]), ["volume_vol"]),
-    "volpo": (ExactSequence([float, float, int]), ["pore_volume_volpo"]),
-    "ray_atom": (ExactSequence([float, float, int]), ["ray_atom"]),
-    "block": (ExactSequence([float, int]), ["block"]),
-    "psd": (ExactSequence([float, float, int]), ["psd"]),
-    "chan": (float, ["channels_chan"]),
-    "gridG": (bool, ["grid_gaussian"]),
-    "gridGBohr": (bool, ["grid_gaussian_bohr"]),
-    "strinfo": (bool, ["str_info"]),
-    "oms": (bool, ["open_metal_sites"]),
+OUTPUT_REGISTRY = {
+    option.name: option
+    for option in [
+        # Note: the .cssr file is converted to StructureData by the NetworkParser if the parse_cssr option is set
+        OutputOption("cssr", bool, ["structure_cssr"]),
+        OutputOption("v1", bool, ["structure_v1"]),
+        OutputOption("xyz", bool, ["structure_xyz"]),
+        OutputOption("nt2", bool, ["network_nt2"]),
+        OutputOption("res", bool, ["free_sphere_res"], "aiida_zeopp.parsers.plain:ResParser"),
+        OutputOption("zvis", bool, ["network_zvis"]),
+        OutputOption("axs", float, ["nodes_axs"]),
+        OutputOption("visVoro", float, ["voro", "voro_accessible", "voro_nonaccessible"]),
+        OutputOption(
+            "sa",
+            ExactSequence([float, float, sample_count(2)]),
+            ["surface_area_sa"],
+            "aiida_zeopp.parsers.plain:SurfaceAreaParser",
+        ),
+        OutputOption("vsa", ExactSequence([float, float, int]), ["surface_sample_vsa"]),
+        OutputOption(
+            "vol",
+            ExactSequence([float, float, sample_count(3)]),
+            ["volume_vol"],
+            "aiida_zeopp.parsers.plain:AVolumeParser",
+        ),
+        OutputOption(
+            "volpo",
+            ExactSequence([float, float, sample_count(3)]),
+            ["pore_volume_volpo"],
+            "aiida_zeopp.parsers.plain:PoreVolumeParser",
+        ),
+        OutputOption("ray_atom", ExactSequence([float, float, int]), ["ray_atom"]),
+        OutputOption("block", ExactSequence([float, int]), ["block"]),
+        OutputOption(
+            "psd", ExactSequence([float, float, int]), ["psd"], "aiida_zeopp.parsers.plain:PoresSizeDistParser"
+        ),
+        OutputOption("chan", float, ["channels_chan"], "aiida_zeopp.parsers.plain:ChannelParser"),
+        OutputOption("gridG", bool, ["grid_gaussian"]),
+        OutputOption("gridGBohr", bool, ["grid_gaussian_bohr"]),
+        OutputOption("strinfo", bool, ["str_info"]),
+        OutputOption("oms", bool, ["open_metal_sites"]),
+    ]
 }
 
+
+@functools.lru_cache(maxsize=None)
+def _load_parser_entry_points():
+    """Register parsers plugged in via the ``aiida_zeopp.parsers`` entry point group.
+
+    Entry points are only loaded when the corresponding parser is requested.
+    """
+    for entry_point in get_entry_points(PARSER_ENTRY_POINT_GROUP):
+        if entry_point.name not in OUTPUT_REGISTRY:
+            warnings.warn(f"Ignoring entry point {entry_point}: unknown output option {entry_point.name!r}")
+            continue
+        OUTPUT_REGISTRY[entry_point.name].parser = entry_point.value
+
+
+def get_output_parser(option):
+    """Return parser class for output file(s) of a given option.
+
+    :param option: name of the output option, e.g. 'sa'
+    :returns: parser class or None, if no parser is implemented
+    """
+    _load_parser_entry_points()
+    return OUTPUT_REGISTRY[option].parser
+
+
+# key : [ accepted values, labels ]
+OUTPUT_OPTIONS = {name: (option.validator, list(option.labels)) for name, option in OUTPUT_REGISTRY.items()}
+
 # Currently NOT implemented
 # These options produce an output file with a hardcoded name
 # key : [ accepted values, [ output file name(s) ], label ]
@@ -95,23 +335,65 @@ class NetworkParameters(Dict):
         dict = self.validate(dict)
         super().__init__(dict=dict, **kwargs)
 
+    def initialize(self):
+        super().initialize()
+        self._cached_views = {}  # pylint: disable=attribute-defined-outside-init
+
+    def _get_cached(self, name, compute):
+        """Return view derived from the parameters.
+
+        Views are computed once and cached for stored nodes, which are immutable.
+        For unstored nodes, which may still be edited, they are recomputed on every call.
+
+        :param name: name of the view
+        :param compute: function computing the view
+        """
+        if name in self._cached_views:
+            return self._cached_views[name]
+
+        value = compute()
+        if self.is_stored:
+            self._cached_views[name] = value
+        return value
+
+    def _get_parameters_dict(self):
+        """Return dictionary of parameters (not to be modified)."""
+        return self._get_cached("parameters_dict", self.get_dict)
+
+    def _get_output_dict(self):
+        """Return dictionary of output files (not to be modified), see `output_dict`."""
+
+        def compute():
+            parameters_dict = self._get_parameters_dict()
+            return {
+                k: OUTPUT_REGISTRY[k].file_names(self._OUTPUT_FILE_PREFIX)
+                for k in parameters_dict
+                if k in OUTPUT_REGISTRY and parameters_dict[k] is not False
+            }
+
+        return self._get_cached("output_dict", compute)
+
     @classmethod
     def validate(cls, parameters_dict):
         """validate parameters"""
         return cls._schema(parameters_dict)
 
-    def cmdline_params(self, structure_file_name=None, radii_file_name=None):
+    def cmdline_params(self, structure_file_name=None, radii_file_name=None, output_directory=None):
         """Synthesize command line parameters
 
         e.g. [ '-axs', '0.4', 'out.axs', 'structure.cif']
+
+        :param structure_file_name: name of the input structure file
+        :param radii_file_name: name of the atomic radii file
+        :param output_directory: directory to write output files to (None for the working directory)
         """
         parameters = []
 
         if radii_file_name is not None:
             parameters += ["-r", radii_file_name]
 
-        pm_dict = self.get_dict()
-        output_keys = self.output_keys
+        pm_dict = self._get_parameters_dict()
+        output_dict = self._get_output_dict()
 
         for k, val in pm_dict.items():
             parameter = [f"-{k}"]
@@ -126,8 +408,11 @@ class NetworkParameters(Dict):
 
             # add output file name(s)
             # Note: For visVoro option, only one (prefix) can be specified
-            if k in output_keys:
-                parameter += [self._OUTPUT_FILE_PREFIX.format(k)]
+            if k in output_dict:
+                output_file_name = self._OUTPUT_FILE_PREFIX.format(k)
+                if output_directory is not None:
+                    output_file_name = f"{output_directory}/{output_file_name}"
+                parameter += [output_file_name]
 
             parameters += parameter
 
@@ -136,6 +421,41 @@ class NetworkParameters(Dict):
 
         return list(map(str, parameters))
 
+    @property
+    def sample_densities(self):
+        """Return options whose sample count is given as density, e.g. ``{'volpo': '0.5/A^3'}``."""
+        parameters_dict = self._get_parameters_dict()
+        return {
+            k: parameters_dict[k][2]
+            for k in SAMPLE_DENSITY_OPTIONS
+            if parameters_dict.get(k) and isinstance(parameters_dict[k][2], str)
+        }
+
+    def resolve_sample_densities(self, cell, atom_radii=None):
+        """Return parameters with sample counts given as densities resolved for an input structure.
+
+        :param cell: 3x3 array with cell vectors of the input structure as rows (Angstrom)
+        :param atom_radii: radii of the atoms of the input structure (Angstrom, see `get_atom_radii`),
+            needed for surface densities. With the 'nor' option, atoms are points and radii are ignored.
+        :returns: NetworkParameters (unstored; self, if there is nothing to resolve)
+        :raises ValueError: if a surface density is given without atom radii
+        """
+        densities = self.sample_densities
+        if not densities:
+            return self
+
+        parameters_dict = self.get_dict()
+        if parameters_dict.get("nor") and atom_radii is not None:
+            atom_radii = np.zeros(len(atom_radii))
+        for k in densities:
+            channel_radius, probe_radius, value = parameters_dict[k]
+            parameters_dict[k] = [
+                channel_radius,
+                probe_radius,
+                resolve_sample_count(value, probe_radius, cell, atom_radii),
+            ]
+        return NetworkParameters(dict=parameters_dict)
+
     @property
     def output_dict(self):
         """Return dictionary of specified options requiring an output file name.
@@ -143,26 +463,7 @@ class NetworkParameters(Dict):
         Keys are the selected options that require an output file name,
         values are the file names.
         """
-        output_dict = {}
-
-        parameters_dict = self.get_dict()
-
-        for k in parameters_dict:
-            if k not in OUTPUT_OPTIONS:
-                continue
-
-            if parameters_dict[k] is False:
-                continue
-
-            nfiles = len(OUTPUT_OPTIONS[k][1])
-            if nfiles == 1:
-                output_dict[k] = [self._OUTPUT_FILE_PREFIX.format(k)]
-            else:
-                # if multiple files, append link labels
-                labels = OUTPUT_OPTIONS[k][1]
-                output_dict[k] = [self._OUTPUT_FILE_PREFIX.format(k) + f".{label}" for label in labels]
-
-        return output_dict
+        return {k: list(files) for k, files in self._get_output_dict().items()}
 
     @property
     def output_keys(self):
@@ -171,55 +472,42 @@ class NetworkParameters(Dict):
         Out of the selected options, return those that you need to specify an
         output file name for.
         """
-        return list(self.output_dict.keys())
+        return list(self._get_output_dict())
 
     @property
     def output_files(self):
         """Return list of output files to be retrieved"""
-        # Note: This flattens list(self.output_dict.values())
-        return [item for files in self.output_dict.values() for item in files]
+
+        def compute():
+            # Note: This flattens list(self.output_dict.values())
+            return [item for files in self._get_output_dict().values() for item in files]
+
+        return list(self._get_cached("output_files", compute))
 
     @property
     def output_parsers(self):
         """Return list of output parsers to use.
 
-        :param parameters:  the parameters object used to generate the cmdline parameters
-        :type parameters: aiida_zeopp.data.parameters.NetworkParameters
+        Parsers are looked up in the `OUTPUT_REGISTRY` and imported on first use.
 
         :returns: List of parsers to be used for each output file.
             List element is None, if parser is not implemented.
         :rtype: list
         """
-        parsers = []
-        for k in self.output_dict:
-            if k == "vol":
-                parsers += [pp.AVolumeParser]
-            elif k == "volpo":
-                parsers += [pp.PoreVolumeParser]
-            elif k == "sa":
-                parsers += [pp.SurfaceAreaParser]
-            elif k == "res":
-                parsers += [pp.ResParser]
-            elif k == "chan":
-                parsers += [pp.ChannelParser]
-            elif k == "psd":
-                parsers += [pp.PoresSizeDistParser]
-            elif k == "visVoro":
-                parsers += [None for _f in OUTPUT_OPTIONS[k][1]]
-            # elif k == 'cssr':
-            #    parsers += [sp.CssrParser]
-            else:
-                parsers += [None]
 
-        return parsers
+        def compute():
+            return [get_output_parser(k) for k, files in self._get_output_dict().items() for _f in files]
+
+        return list(self._get_cached("output_parsers", compute))
 
     @property
     def output_links(self):
         """Return list of output link names"""
-        output_links = []
-        for k in self.output_keys:
-            output_links += OUTPUT_OPTIONS[k][1]
-        return output_links
+
+        def compute():
+            return [label for k in self._get_output_dict() for label in OUTPUT_REGISTRY[k].labels]
+
+        return list(self._get_cached("output_links", compute))
 
     def get_structure_file_name(self, structure):
         """Get file name of input structure.
@@ -233,8 +521,11 @@ class NetworkParameters(Dict):
 
         """
 
-        # treating only CifData for the moment - could extend to other formats in the future
         if isinstance(structure, DataFactory("cif")):
             return structure.filename if structure.filename.endswith(".cif") else structure.filename + ".cif"
 
+        # StructureData is written in .cssr format by the calculation
+        if isinstance(structure, DataFactory("core.structure")):
+            return STRUCTURE_CSSR_FILE_NAME
+
         raise ValueError(f"Input structure has unknown type {type(structure)}")
@@ -0,0 +1,152 @@
+"""Memory-mappable point clouds, e.g. surface sample points (vsa) and ray data (ray_atom).
+
+File format (``.zpc``):
+
+ * magic bytes ``ZEOPPPC1``
+ * header length (little-endian uint32)
+ * JSON header with 'dtype', 'shape', 'cell' and 'probe' (padded with spaces, such that the data is 64-byte aligned)
+ * points as C-ordered array of fixed dtype (little-endian float32)
+
+The data can therefore be mapped into memory with a single call to ``numpy.memmap``.
+"""
+import io
+import json
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+from aiida.plugins import DataFactory
+
+SinglefileData = DataFactory("core.singlefile")  # pylint: disable=invalid-name
+
+MAGIC = b"ZEOPPPC1"
+DTYPE = "<f4"
+ALIGNMENT = 64
+CHUNK_ROWS = 65536
+POINT_CLOUD_FILENAME = "points.zpc"
+
+# zeo++ options whose raw outputs can be stored as point clouds
+POINT_CLOUD_OPTIONS = ("vsa", "ray_atom")
+
+
+def write_point_cloud(handle, points, cell=None, probe=None, chunk_rows=CHUNK_ROWS):
+    """Write points to binary file handle in point cloud format.
+
+    :param handle: binary file handle to write to
+    :param points: 2d array of points (may be a numpy.memmap; it is converted in chunks)
+    :param cell: 3x3 cell vectors (Angstrom) as rows (optional)
+    :param probe: dictionary describing the probe, e.g. {'option': 'vsa', 'probe_radius': 1.82, ...} (optional)
+    :param chunk_rows: number of rows converted at once
+    """
+    points = np.asarray(points)
+    if points.ndim != 2:
+        raise ValueError(f"Expected 2d array of points, got shape {points.shape}")
+
+    header = {
+        "dtype": DTYPE,
+        "shape": list(points.shape),
+        "cell": np.asarray(cell, dtype=float).tolist() if cell is not None else None,
+        "probe": probe,
+    }
+    encoded = json.dumps(header).encode("utf8")
+    # pad header, such that the data starts at a multiple of ALIGNMENT
+    size = len(MAGIC) + 4 + len(encoded)
+    encoded += b" " * (-size % ALIGNMENT)
+
+    handle.write(MAGIC)
+    handle.write(struct.pack("<I", len(encoded)))
+    handle.write(encoded)
+    for start in range(0, len(points), chunk_rows):
+        handle.write(np.ascontiguousarray(points[start : start + chunk_rows], dtype=DTYPE).tobytes())
+
+
+def read_point_cloud_header(handle):
+    """Read header of point cloud file.
+
+    :param handle: binary file handle, positioned at the start of the file
+    :returns: tuple (header dictionary, offset of the data in bytes)
+    """
+    if handle.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a point cloud file: invalid magic bytes")
+    try:
+        (length,) = struct.unpack("<I", handle.read(4))
+        header = json.loads(handle.read(length).decode("utf8"))
+    except (struct.error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"Invalid point cloud header: {exc}") from exc
+    return header, len(MAGIC) + 4 + length
+
+
+def read_point_cloud(handle):
+    """Map point cloud file into memory.
+
+    Files that do not support memory mapping (e.g. objects packed in the AiiDA repository)
+    are copied to an anonymous temporary file first.
+
+    :param handle: binary file handle, positioned at the start of the file
+    :returns: tuple (header dictionary, read-only numpy.memmap of the points)
+    """
+    header, offset = read_point_cloud_header(handle)
+    shape = tuple(header["shape"])
+    if 0 in shape:
+        return header, np.empty(shape, dtype=header["dtype"])
+
+    if isinstance(handle, io.BufferedReader):
+        # the mapping remains valid after the file is closed
+        return header, np.memmap(handle, dtype=header["dtype"], mode="r", offset=offset, shape=shape)
+
+    with tempfile.TemporaryFile() as buffer:
+        shutil.copyfileobj(handle, buffer)
+        buffer.flush()
+        return header, np.memmap(buffer, dtype=header["dtype"], mode="r", shape=shape)
+
+
+class PointCloudData(SinglefileData):
+    """Point cloud (e.g. surface sample points) stored in a memory-mappable binary file.
+
+    The shape, cell and probe are also stored as attributes, in order to allow querying.
+
+    Usage: ``PointCloudData(points, cell=cell, probe={'option': 'vsa', 'probe_radius': 1.82})``
+    """
+
+    def __init__(self, points, cell=None, probe=None, **kwargs):
+        """
+        Constructor for the data class
+
+        :param points: 2d array of points (converted to float32)
+        :param cell: 3x3 cell vectors (Angstrom) as rows (optional)
+        :param probe: dictionary describing the probe (optional)
+        """
+        with tempfile.TemporaryFile() as handle:
+            write_point_cloud(handle, points, cell=cell, probe=probe)
+            handle.seek(0)
+            header, _offset = read_point_cloud_header(handle)
+            handle.seek(0)
+            super().__init__(file=handle, filename=POINT_CLOUD_FILENAME, **kwargs)
+
+        self.base.attributes.set_many(header)
+
+    @property
+    def shape(self):
+        """Return shape of the array of points."""
+        return tuple(self.base.attributes.get("shape"))
+
+    @property
+    def cell(self):
+        """Return cell vectors as 3x3 numpy array (None, if not specified)."""
+        cell = self.base.attributes.get("cell")
+        return np.array(cell) if cell is not None else None
+
+    @property
+    def probe(self):
+        """Return dictionary describing the probe (None, if not specified)."""
+        return self.base.attributes.get("probe")
+
+    def get_memmap(self):
+        """Return points as read-only numpy.memmap.
+
+        Slicing the memmap reads only the requested points from disk.
+        """
+        with self.open(mode="rb") as handle:
+            _header, points = read_point_cloud(handle)
+        return points
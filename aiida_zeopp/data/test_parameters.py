@@ -11,6 +11,13 @@ def test_cmdline_cssr():
     d = {}
     assert NetworkParameters(d).cmdline_params() == []
 
+    d = {"cssr": True}
+    assert NetworkParameters(d).cmdline_params(structure_file_name="mof/mof.cif", output_directory="mof") == [
+        "-cssr",
+        "mof/out.cssr",
+        "mof/mof.cif",
+    ]
+
 
 def test_output_parsers():
     from aiida_zeopp.data.parameters import NetworkParameters
@@ -22,6 +29,22 @@ def test_output_parsers():
     assert p.output_parsers == [None, SurfaceAreaParser, PoreVolumeParser]
 
 
+def test_output_registry():
+    """Test lazy loading of parsers and output file names."""
+    from aiida_zeopp.data.parameters import OUTPUT_REGISTRY, OutputOption
+    from aiida_zeopp.parsers.plain import ResParser
+
+    option = OutputOption("res", bool, ["free_sphere_res"], "aiida_zeopp.parsers.plain:ResParser")
+    assert option.parser is ResParser
+    assert option.file_names("out.{}") == ["out.res"]
+
+    assert OUTPUT_REGISTRY["visVoro"].file_names("out.{}") == [
+        "out.visVoro.voro",
+        "out.visVoro.voro_accessible",
+        "out.visVoro.voro_nonaccessible",
+    ]
+
+
 def test_validation():
     """Test that validation raises an exception for wrong input."""
     from voluptuous import MultipleInvalid
@@ -34,3 +57,103 @@ def test_validation():
 
     with pytest.raises(MultipleInvalid):
         NetworkParameters(d)
+
+
+def test_cached_views():
+    """Test that views are cached for stored nodes only."""
+    from aiida_zeopp.data.parameters import NetworkParameters
+
+    p = NetworkParameters({"sa": [1.82, 1.82, 1000]})
+    assert p.output_files == ["out.sa"]
+
+    # unstored node can still be edited
+    p["volpo"] = [1.82, 1.82, 1000]
+    assert p.output_files == ["out.sa", "out.volpo"]
+
+    p.store()
+    files = p.output_files
+    files.append("modified")
+    assert p.output_files == ["out.sa", "out.volpo"]
+    assert p.output_links == ["surface_area_sa", "pore_volume_volpo"]
+
+
+def test_sample_densities():
+    """Test resolving sample counts given as densities."""
+    import math
+
+    import numpy as np
+    from voluptuous import MultipleInvalid
+
+    from aiida_zeopp.data.parameters import NetworkParameters
+
+    p = NetworkParameters({"sa": [1.82, 1.82, "2/A^2"], "volpo": [1.82, 1.82, "0.5/A^3"], "vol": [1.2, 1.2, 100]})
+    assert p.sample_densities == {"sa": "2/A^2", "volpo": "0.5/A^3"}
+
+    # surface densities refer to the mean sphere surface of the atoms
+    cell = np.diag([10.0, 10.0, 20.0])
+    with pytest.raises(ValueError):
+        p.resolve_sample_densities(cell)
+    resolved = p.resolve_sample_densities(cell, [1.0, 2.0])
+    assert resolved["volpo"] == [1.82, 1.82, 1000]
+    area = 4 * math.pi * ((1.0 + 1.82) ** 2 + (2.0 + 1.82) ** 2) / 2
+    assert resolved["sa"] == [1.82, 1.82, math.ceil(2 * area)]
+    assert resolved["vol"] == [1.2, 1.2, 100]
+    assert resolved.cmdline_params()[:4] == ["-sa", "1.82", "1.82", str(resolved["sa"][2])]
+
+    # atoms are points with the nor option
+    p["nor"] = True
+    resolved = p.resolve_sample_densities(cell, [1.0, 2.0])
+    assert resolved["sa"] == [1.82, 1.82, math.ceil(2 * 4 * math.pi * 1.82**2)]
+
+    # surface densities only for sa, volume densities only for vol and volpo
+    with pytest.raises(MultipleInvalid):
+        NetworkParameters({"sa": [1.82, 1.82, "2/A^3"]})
+    with pytest.raises(MultipleInvalid):
+        NetworkParameters({"volpo": [1.82, 1.82, "many"]})
+
+
+def test_atom_radii():
+    """Test radii of atoms from the default radii and from atomic radii files."""
+    import os
+
+    from aiida.orm import SinglefileData, StructureData
+
+    from aiida_zeopp.data.parameters import (
+        DEFAULT_ATOMIC_RADII,
+        get_atom_radii,
+        parse_atomic_radii,
+    )
+    from aiida_zeopp.parsers.structure import get_structure_radii
+    from aiida_zeopp.tests import TEST_DIR
+
+    path = os.path.join(TEST_DIR, "MgO.rad")
+    with open(path, encoding="utf8") as handle:
+        content = handle.read()
+    assert parse_atomic_radii(content) == {"Mg": 0.66, "O": 1.84}
+    with pytest.raises(ValueError):
+        parse_atomic_radii("Mg\n")
+
+    assert get_atom_radii(["O", "Xx"], default_radius=1.0) == [DEFAULT_ATOMIC_RADII["O"], 1.0]
+    assert get_atom_radii(["O", "C"], content) == [1.84, DEFAULT_ATOMIC_RADII["C"]]
+
+    structure = StructureData(cell=[[4.2, 0, 0], [0, 4.2, 0], [0, 0, 4.2]])
+    structure.append_atom(position=(0, 0, 0), symbols="Mg")
+    structure.append_atom(position=(2.1, 2.1, 2.1), symbols="O")
+    assert get_structure_radii(structure) == [DEFAULT_ATOMIC_RADII["Mg"], DEFAULT_ATOMIC_RADII["O"]]
+    assert get_structure_radii(structure, SinglefileData(file=path)) == [0.66, 1.84]
+
+
+def test_structure_file_name():
+    """Test file names of input structures."""
+    import io
+
+    from aiida.orm import CifData, StructureData
+
+    from aiida_zeopp.data.parameters import NetworkParameters
+
+    parameters = NetworkParameters({"res": True})
+    cif = CifData(file=io.BytesIO(b"data_mof"), filename="mof", parse_policy="lazy")
+    assert parameters.get_structure_file_name(cif) == "mof.cif"
+    assert parameters.get_structure_file_name(StructureData(cell=[[1, 0, 0], [0, 1, 0], [0, 0, 1]])) == "structure.cssr"
+    with pytest.raises(ValueError):
+        parameters.get_structure_file_name(NetworkParameters({}))
@@ -0,0 +1,39 @@
+import io
+
+import numpy as np
+import pytest
+
+from aiida_zeopp.data.points import PointCloudData, read_point_cloud, write_point_cloud
+
+
+def test_point_cloud_file():
+    """Test writing and mapping a point cloud file."""
+    points = np.arange(30, dtype=float).reshape((10, 3))
+    cell = np.eye(3) * 10.0
+
+    handle = io.BytesIO()
+    write_point_cloud(handle, points, cell=cell, probe={"probe_radius": 1.82}, chunk_rows=3)
+    handle.seek(0)
+    header, array = read_point_cloud(handle)
+
+    assert header["shape"] == [10, 3]
+    assert header["probe"] == {"probe_radius": 1.82}
+    assert array.dtype == np.float32
+    np.testing.assert_array_equal(array, points)
+    np.testing.assert_array_equal(header["cell"], cell)
+
+    with pytest.raises(ValueError):
+        read_point_cloud(io.BytesIO(b"He 1 2 3\n"))
+
+
+def test_point_cloud_data(aiida_profile):  # pylint: disable=unused-argument
+    """Test memory mapping the points of a stored PointCloudData node."""
+    points = np.random.default_rng(0).random((1000, 3))
+    node = PointCloudData(points, cell=np.eye(3), probe={"option": "vsa", "probe_radius": 1.82}).store()
+
+    memmap = node.get_memmap()
+    assert isinstance(memmap, np.memmap)
+    assert node.shape == (1000, 3)
+    assert node.probe["option"] == "vsa"
+    np.testing.assert_array_equal(node.cell, np.eye(3))
+    np.testing.assert_allclose(memmap[500:510], points[500:510], rtol=1e-6)
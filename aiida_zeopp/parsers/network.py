@@ -1,15 +1,42 @@
 """Parser classes."""
+import collections
+import io
+import os
+
 from aiida.common import exceptions
-from aiida.orm import Dict, SinglefileData
+from aiida.orm import ArrayData, Dict, SinglefileData
 from aiida.parsers.parser import Parser
 
+from aiida_zeopp.calculations.network import RESOURCES_FILE, TASK_STATUS_FILE
+from aiida_zeopp.data.points import POINT_CLOUD_OPTIONS, PointCloudData
+from aiida_zeopp.parsers.plain import BlockParser
+from aiida_zeopp.parsers.raw import (
+    COMPRESSED_SUFFIX,
+    STREAMED_OPTIONS,
+    PointDataParser,
+    get_output_file_names,
+    gzip_file,
+    open_output_file,
+)
+from aiida_zeopp.parsers.structure import CssrParser, get_cell, get_structure_radii
+
+# output file of a run of the network binary, together with the inputs of the run
+OutputFile = collections.namedtuple(
+    "OutputFile", ["path", "link", "option", "parser", "policy", "parameters", "structure"]
+)
+
 
 class NetworkParser(Parser):
     """
     Parser class for output of zeo++ network binary
     """
 
-    def parse(self, **kwargs):  # pylint: disable=too-many-branches
+    # path of the retrieved temporary folder (set by parse)
+    _temporary_folder = None
+    # cell vectors of the input structures by uuid (see _get_cell)
+    _cells = None
+
+    def parse(self, **kwargs):
         """
         Parse output data folder, store results in database.
 
@@ -22,18 +49,18 @@ class NetworkParser(Parser):
           * ``node_list``: list of new nodes to be stored in the db
             (as a list of tuples ``(link_name, node)``)
         """
-        # pylint: disable=too-many-locals
-
         # Check that the retrieved folder is there
         try:
             self.retrieved
         except exceptions.NotExistent:
             return self.exit_codes.ERROR_NO_RETRIEVED_FOLDER
 
-        # Check the folder content is as expected
-        list_of_files = self.retrieved.list_object_names()
+        # output files that are not kept are retrieved temporarily (see the output_policy option)
+        self._temporary_folder = kwargs.get("retrieved_temporary_folder")
+
+        # Check the folder content is as expected (compressed output files count under their original name)
+        list_of_files = self._list_output_files()
 
-        # pylint: disable=protected-access
         inp_params = self.node.inputs.parameters
         output_files = inp_params.output_files
         # Note: set(A) <= set(B) checks whether A is a subset of B
@@ -43,57 +70,428 @@ class NetworkParser(Parser):
             self.logger.error(f"Expected output files {output_files}; found only {list_of_files}.")
             return self.exit_codes.ERROR_OUTPUT_FILES_MISSING
 
-        # Parse output files
-        output_parsers = inp_params.output_parsers
-        output_links = inp_params.output_links
-        output_parameters = Dict({})
-
-        empty_block = False
-
-        for fname, parser, link in list(zip(output_files, output_parsers, output_links)):
-            with self.retrieved.open(fname, "rb") as handle:
-                if parser is None:
-                    # just add file, if no parser implemented
-                    parsed = SinglefileData(file=handle)
-                    self.out(link, parsed)
-
-                    # workaround: if block pocket file is empty, raise an error
-                    # (it indicates the calculation did not finish)
-                    if link == "block":
-                        if not parsed.get_content().strip():
-                            self.logger.error(
-                                "Empty block file. This indicates the calculation of blocked pockets did not finish."
-                            )
-                            empty_block = True
-                        else:
-                            output_parameters.update_dict(
-                                {"Number_of_blocking_spheres": int(parsed.get_content().split()[0])}
-                            )
+        outputs, error = self.parse_output_files(inp_params, self.node.inputs.structure)
+        for link, node in outputs.items():
+            self.out(link, node)
 
-                else:
-                    # else parse and add keys to output_parameters
-                    try:
-                        # Note: We join it to the output_params
-                        # parsed = parser.parse_aiida(f.read())
-                        parsed_dict = parser.parse(handle.read().decode("utf8"))
-                    except ValueError:
-                        self.logger.error(f"Error parsing file {fname} with parser {parser}")
+        if error is not None:
+            return getattr(self.exit_codes, error)
+
+        return self.exit_codes.SUCCESS
+
+    def parse_output_files(self, inp_params, structure, directory=None):
+        """Parse output files of one run of the network binary.
+
+        :param inp_params: NetworkParameters of the run
+        :param structure: input structure of the run
+        :param directory: subdirectory of the retrieved folder containing the output files (None for top level)
+        :returns: tuple ``(outputs, error)``, where outputs is a dictionary of output nodes
+            (including 'output_parameters') by link name and error is the name of the exit code of a failure
+            ('ERROR_OUTPUT_PARSING' or 'ERROR_EMPTY_BLOCK'), or None.
+        """
+        # Note: results are collected in a plain dictionary and the output_parameters node is created once at the end
+        results = {}
+        outputs = {}
+        error = None
+
+        for output in self._get_output_files(inp_params, structure, directory):
+            with self._open_output_file(output.path) as handle:
+                try:
+                    nodes, summary = self._parse_output_file(handle, output)
+                except ValueError as exc:
+                    # raised by handlers of files whose results are required (the results of others are optional)
+                    self.logger.error(f"Error parsing file {output.path}: {exc}")
+                    error = "ERROR_OUTPUT_PARSING"
+                    continue
+
+            outputs.update(nodes)
+            if summary is None:
+                error = error or "ERROR_EMPTY_BLOCK"
+            else:
+                results.update(summary)
+
+        # add runtime and peak memory of the network invocation
+        if self.node.get_option("measure_resources"):
+            path = f"{directory}/{RESOURCES_FILE}" if directory else RESOURCES_FILE
+            try:
+                results.update(self._parse_resources(path))
+            except (FileNotFoundError, ValueError) as exc:
+                self.logger.warning(f"Unable to read resources of network invocation: {exc}")
+
+        results.update(self._get_input_results(inp_params, structure))
+        # note: set_many validates and sets all attributes in one go, while Dict(results) would set them one by one
+        output_parameters = Dict()
+        output_parameters.base.attributes.set_many(results)
+        outputs["output_parameters"] = output_parameters
+
+        return outputs, error
+
+    def _get_output_files(self, inp_params, structure, directory=None):
+        """Return output files of a run that need to be parsed (files discarded by the output_policy are skipped).
+
+        :param inp_params: NetworkParameters of the run
+        :param structure: input structure of the run
+        :param directory: subdirectory of the retrieved folder containing the output files (None for top level)
+        :returns: list of OutputFile
+        """
+        policies = self.node.get_option("output_policy") or {}
+        output_options = [option for option, files in inp_params.output_dict.items() for _fname in files]
+
+        output_files = []
+        for fname, parser, link, option in zip(
+            inp_params.output_files, inp_params.output_parsers, inp_params.output_links, output_options
+        ):
+            policy = policies.get(option, "keep")
+            if policy == "discard" and parser is None and link != "block":
+                # nothing to parse
+                continue
+            path = f"{directory}/{fname}" if directory else fname
+            output_files.append(OutputFile(path, link, option, parser, policy, inp_params, structure))
+        return output_files
+
+    def _parse_output_file(self, handle, output):
+        """Parse one output file with the first handler that applies to it.
+
+        Handlers are selected by the option of the output file, the output_policy and the parser options.
+
+        :param handle: binary file handle of the output file
+        :param output: OutputFile to parse
+        :returns: tuple ``(nodes, summary)`` of output nodes by link name and results for output_parameters
+            (summary is None for an empty block file)
+        :raises ValueError: if the results of a required output file cannot be parsed
+        """
+        as_array = output.policy == "array"
+        handlers = [
+            # store structure instead of the raw file
+            (output.link == "structure_cssr" and (self.node.get_option("parse_cssr") or as_array), self._parse_cssr),
+            (output.option in POINT_CLOUD_OPTIONS and self.node.get_option("point_cloud"), self._parse_point_cloud),
+            (
+                output.option in STREAMED_OPTIONS
+                and (self.node.get_option("raw_as_array") or as_array or self._get_raw_text(output) != "keep"),
+                self._parse_raw,
+            ),
+            (output.link == "block", self._parse_block),
+            # just add file, if no parser implemented
+            (output.parser is None, self._parse_file),
+            (output.link == "psd" and (self.node.get_option("psd_as_array") or as_array), self._parse_psd),
+        ]
+        # else parse and add keys to output_parameters
+        handler = next((handler for applies, handler in handlers if applies), self._parse_results)
+        return handler(handle, output)
+
+    def _parse_results(self, handle, output):
+        """Parse output file into results for output_parameters.
+
+        :returns: tuple ``(nodes, summary)``
+        """
+        try:
+            return {}, output.parser.parse(handle.read().decode("utf8"))
+        except ValueError:
+            self.logger.error(f"Error parsing file {output.path} with parser {output.parser}")
+            return {}, {}
+
+    @staticmethod
+    def _parse_file(handle, output):
+        """Store output file as is (unless discarded by the output_policy).
+
+        :returns: tuple ``(nodes, summary)``
+        """
+        return ({output.link: SinglefileData(file=handle)} if output.policy == "keep" else {}), {}
+
+    def _parse_cssr(self, handle, output):
+        """Parse .cssr output file into StructureData.
+
+        :returns: tuple ``(nodes, summary)``
+        """
+        try:
+            return {output.link: CssrParser.parse_aiida(handle.read().decode("utf8"))}, {}
+        except ValueError:
+            self.logger.error(f"Error parsing file {output.path} with parser {CssrParser}")
+            return {}, {}
+
+    def _parse_block(self, handle, output):
+        """Parse .block output file (number of blocking spheres and, if requested, their centers and radii).
+
+        :returns: tuple ``(nodes, summary)`` (summary is None, if the block file is empty)
+        :raises ValueError: if the block file is invalid
+        """
+        nodes = {}
+        if output.policy == "keep":
+            nodes[output.link] = SinglefileData(file=handle)
+            handle.seek(0)
+
+        summary, arrays = BlockParser.parse_arrays(io.TextIOWrapper(handle, encoding="utf8"))
+
+        # workaround: if block pocket file is empty, raise an error
+        # (it indicates the calculation did not finish)
+        if summary is None:
+            self.logger.error("Empty block file. This indicates the calculation of blocked pockets did not finish.")
+        elif self.node.get_option("block_as_array") or output.policy == "array":
+            nodes["block_spheres"] = self._get_array_data(arrays)
+        return nodes, summary
 
-                    output_parameters.update_dict(parsed_dict)
+    def _parse_psd(self, handle, output):
+        """Parse pore size distribution into a histogram, keeping only summary values in output_parameters.
 
+        :returns: tuple ``(nodes, summary)``
+        """
+        try:
+            summary, arrays = output.parser.parse_arrays(handle.read().decode("utf8"))
+        except ValueError:
+            self.logger.error(f"Error parsing file {output.path} with parser {output.parser}")
+            return {}, {}
+        return {output.link: self._get_array_data(arrays)}, summary
+
+    def _parse_point_cloud(self, handle, output):
+        """Store points of raw output file as PointCloudData (see `_parse_raw`).
+
+        :returns: tuple ``(nodes, summary)``
+        """
+        return self._parse_raw(handle, output, point_cloud=self._get_point_cloud_header(output))
+
+    def _get_point_cloud_header(self, output):
+        """Return 'cell' and 'probe' of the points of a raw output file (see PointCloudData)."""
+        channel_radius, probe_radius, samples = output.parameters[output.option]
+        return {
+            "cell": self._get_cell(output.structure),
+            "probe": {
+                "option": output.option,
+                "channel_radius": channel_radius,
+                "probe_radius": probe_radius,
+                "number_of_samples": samples,
+            },
+        }
+
+    def _get_input_results(self, inp_params, structure):
+        """Return input parameters of the run, to be added to output_parameters for convenience."""
         # add name of input structures as parameter
-        output_parameters.set_attribute(
-            "Input_structure_filename",
-            inp_params.get_structure_file_name(self.node.inputs.structure),
-        )
-        # add input parameters for convenience
+        results = {"Input_structure_filename": inp_params.get_structure_file_name(structure)}
         # note: should be added at top-level in order to allow tab completion
         # of <calcnode>.res.Input_...
-        for k in inp_params.keys():
-            output_parameters.set_attribute(f"Input_{k}", inp_params.get_attribute(k))
-        self.out("output_parameters", output_parameters)
+        for k, val in inp_params.get_dict().items():
+            results[f"Input_{k}"] = val
+        # add sample counts resolved from densities
+        if inp_params.sample_densities:
+            cell = self._get_cell(structure)
+            if cell is not None:
+                try:
+                    atomic_radii = self.node.inputs.atomic_radii if "atomic_radii" in self.node.inputs else None
+                    radii = get_structure_radii(structure, atomic_radii)
+                    resolved = inp_params.resolve_sample_densities(cell, radii)
+                except ValueError as exc:
+                    self.logger.warning(f"Unable to resolve sample densities: {exc}")
+                    return results
+                for k in inp_params.sample_densities:
+                    results[f"Input_{k}_samples"] = resolved[k][2]
+        return results
+
+    @staticmethod
+    def _get_array_data(arrays):
+        """Return ArrayData node containing the given dictionary of arrays."""
+        array_data = ArrayData()
+        for name, array in arrays.items():
+            array_data.set_array(name, array)
+        return array_data
+
+    def _parse_resources(self, path):
+        """Parse runtime and peak memory recorded by the measurement wrapper (see NetworkCalculation).
+
+        The resources file contains ``<wallclock time> <user time> <system time> <peak memory (kB)> <exit status>``
+        in its last line (GNU time may add a line, if the process was terminated by a signal).
+        Peak memory is None, if it could not be measured.
+
+        :param path: path of the resources file in the retrieved folder
+        :returns: dictionary with 'Network_wallclock_seconds', 'Network_user_seconds', 'Network_system_seconds',
+            'Network_peak_memory_kB' and 'Network_exit_status'
+        """
+        lines = self.retrieved.get_object_content(path).splitlines()
+        try:
+            wallclock, user, system, memory, status = lines[-1].split()
+            return {
+                "Network_wallclock_seconds": float(wallclock),
+                "Network_user_seconds": float(user),
+                "Network_system_seconds": float(system),
+                "Network_peak_memory_kB": int(memory) if int(memory) >= 0 else None,
+                "Network_exit_status": int(status),
+            }
+        except (IndexError, ValueError) as exc:
+            raise ValueError(f"Invalid resources file {path}: {exc}") from exc
 
-        if empty_block:
-            return self.exit_codes.ERROR_EMPTY_BLOCK
+    def _list_output_files(self, directory=None):
+        """Return names of the output files in the retrieved (and retrieved temporary) folder.
+
+        Compressed output files are listed under their original name.
+
+        :param directory: subdirectory of the folders (None for top level)
+        """
+        names = []
+        try:
+            names += self.retrieved.base.repository.list_object_names(directory)
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        if self._temporary_folder is not None:
+            path = os.path.join(self._temporary_folder, directory) if directory else self._temporary_folder
+            if os.path.isdir(path):
+                names += os.listdir(path)
+        return get_output_file_names(names)
+
+    def _open_output_file(self, path):
+        """Open output file from the retrieved temporary folder, if it is there, or from the retrieved folder.
+
+        :param path: path of the (uncompressed) output file
+        """
+        if self._temporary_folder is not None and any(
+            os.path.isfile(os.path.join(self._temporary_folder, name)) for name in (path, path + COMPRESSED_SUFFIX)
+        ):
+            return open_output_file(self._temporary_folder, path)
+        return open_output_file(self.retrieved, path)
+
+    def _get_cell(self, structure):
+        """Return cell vectors of the input structure (None, if they cannot be determined).
+
+        Cells are cached, since they are needed for several output files of the same structure.
+        """
+        if self._cells is None:
+            self._cells = {}
+        if structure.uuid not in self._cells:
+            try:
+                self._cells[structure.uuid] = get_cell(structure)
+            except ValueError as exc:
+                self.logger.warning(f"Unable to determine cell of input structure: {exc}")
+                self._cells[structure.uuid] = None
+        return self._cells[structure.uuid]
+
+    def _get_raw_text(self, output):
+        """Return what to do with the text of a raw output file (the text is only stored if the file is kept)."""
+        return self.node.get_option("raw_text") if output.policy == "keep" else "drop"
+
+    def _parse_raw(self, handle, output, point_cloud=None):
+        """Stream raw output file into binary arrays and store its text according to the raw_text policy.
+
+        :param handle: binary file handle of the output file
+        :param output: OutputFile to parse
+        :param point_cloud: dictionary with 'cell' and 'probe' for storing the points as PointCloudData
+            (None, for storing them as ArrayData, if requested by raw_as_array or the output_policy)
+        :returns: tuple ``(nodes, summary)``
+        """
+        fname = os.path.basename(output.path)
+        raw_text = self._get_raw_text(output)
+
+        outputs = {}
+        npoints = 0
+        if point_cloud is not None or self.node.get_option("raw_as_array") or output.policy == "array":
+            try:
+                summary, arrays = PointDataParser.parse_arrays(handle)
+            except ValueError:
+                self.logger.error(f"Error parsing file {output.path} with parser {PointDataParser}")
+            else:
+                npoints = summary["number_of_points"]
+                if point_cloud is not None:
+                    points = PointCloudData(arrays["points"], **point_cloud)
+                else:
+                    points = self._get_array_data(arrays)
+                points.base.attributes.set("number_of_skipped_lines", summary["number_of_skipped_lines"])
+                outputs[f"{output.link}_points"] = points
+            handle.seek(0)
+
+        if raw_text == "drop":
+            if npoints:
+                return outputs, {}
+            self.logger.warning(f"No point data found in {fname}; keeping raw file.")
+        elif raw_text == "compress":
+            with gzip_file(handle) as compressed:
+                outputs[output.link] = SinglefileData(file=compressed, filename=f"{fname}.gz")
+            return outputs, {}
+
+        outputs[output.link] = SinglefileData(file=handle)
+        return outputs, {}
+
+
+class NetworkBatchParser(NetworkParser):
+    """
+    Parser class for output of zeo++ network binary run on many structures (see NetworkBatchCalculation)
+
+    Output files of each structure are parsed from its subdirectory of the retrieved folder
+    and emitted in the namespace of the structure, e.g. ``output_parameters.<key>``.
+    """
+
+    def parse(self, **kwargs):
+        """
+        Parse output data folder, store results in database.
+        """
+        try:
+            self.retrieved
+        except exceptions.NotExistent:
+            return self.exit_codes.ERROR_NO_RETRIEVED_FOLDER
+
+        self._temporary_folder = kwargs.get("retrieved_temporary_folder")
+
+        inp_params = self.node.inputs.parameters
+        output_files = inp_params.output_files
+        structures = self.node.inputs.structures
+
+        failed = []
+        errors = []
+        for key, structure in sorted(structures.items()):
+            list_of_files = self._list_output_files(key)
+
+            task_status = self._get_task_status(key, list_of_files)
+
+            if not set(output_files) <= set(list_of_files):
+                self.logger.error(f"Expected output files {output_files} for {key}; found only {list_of_files}.")
+                failed.append(key)
+                continue
+
+            outputs, error = self.parse_output_files(inp_params, structure, directory=key)
+            outputs["output_parameters"].base.attributes.set_many(task_status)
+            for link, node in outputs.items():
+                self.out(f"{link}.{key}", node)
+            if error is not None:
+                errors.append(error)
+
+        if len(failed) == len(structures):
+            return self.exit_codes.ERROR_OUTPUT_FILES_MISSING
+        if failed:
+            return self.exit_codes.ERROR_STRUCTURES_FAILED
+        for error in ("ERROR_OUTPUT_PARSING", "ERROR_EMPTY_BLOCK"):
+            if error in errors:
+                return getattr(self.exit_codes, error)
 
         return self.exit_codes.SUCCESS
+
+    def _get_task_status(self, key, list_of_files):
+        """Return exit status and timing of the run on a structure (only available for packed runs).
+
+        :param key: key of the structure
+        :param list_of_files: output files of the structure
+        :returns: dictionary with 'Task_exit_status' and 'Task_wallclock_seconds' (empty, if not available)
+        """
+        if TASK_STATUS_FILE not in list_of_files:
+            return {}
+
+        try:
+            task_status = self._parse_task_status(f"{key}/{TASK_STATUS_FILE}")
+        except ValueError:
+            self.logger.error(f"Error parsing task status of {key}")
+            return {}
+
+        if task_status["Task_exit_status"] != 0:
+            self.logger.error(f"network exited with status {task_status['Task_exit_status']} for {key}")
+        return task_status
+
+    def _parse_task_status(self, path):
+        """Parse exit status and timing of a task of a packed run.
+
+        The task status file contains a single line: ``<exit status> <start time> <end time>``.
+
+        :param path: path of the task status file in the retrieved folder
+        :returns: dictionary with 'Task_exit_status' and 'Task_wallclock_seconds'
+        """
+        try:
+            status, start, end = self.retrieved.get_object_content(path).split()
+            return {
+                "Task_exit_status": int(status),
+                "Task_wallclock_seconds": round(float(end) - float(start), 3),
+            }
+        except ValueError as exc:
+            raise ValueError(f"Invalid task status file {path}: {exc}") from exc
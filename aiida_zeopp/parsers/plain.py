@@ -1,8 +1,10 @@
 """AiiDA parsers for output of network executable."""
 # pylint: disable=useless-super-delegation
+import io
 import math
 import re
 
+import numpy as np
 from aiida.orm import Dict
 
 
@@ -17,10 +19,27 @@ class KeywordParser:
         "keyword2": [int, "unit2"],
     }
 
+    @classmethod
+    def _get_regex(cls):
+        """Return compiled regular expression matching any of the keywords.
+
+        The expression is compiled once per parser class and cached on the class.
+        Longer keywords are tried first, so that a keyword never shadows another one it is a prefix of.
+        """
+        regex = cls.__dict__.get("_regex")
+        if regex is None:
+            alternatives = "|".join(re.escape(keyword) for keyword in sorted(cls.keywords, key=len, reverse=True))
+            regex = re.compile(rf"({alternatives}):\s?([\d\.]*)")
+            cls._regex = regex
+        return regex
+
     @classmethod
     def parse(cls, string):
         """Parse zeo++ keyword format
 
+        All keywords are extracted in a single pass over the string.
+        If a keyword occurs multiple times, its first occurrence is used.
+
         Example string:
 
         keyword1: 12234.32312  keyword2: 1
@@ -35,17 +54,19 @@ class KeywordParser:
         results: dict
           dictionary of output values
         """
-        results = {}
+        nkeywords = len(cls.keywords)
+        values = {}
+        for match in cls._get_regex().finditer(string):
+            values.setdefault(match.group(1), match.group(2))
+            if len(values) == nkeywords:
+                break
 
-        regex = r"{}:\s?([\d\.]*)"
-        for keyword, val in cls.keywords.items():
-            ktype, kunit = val
-            regex_rep = regex.format(re.escape(keyword))
-            match = re.search(regex_rep, string)
-            if match is None:
+        results = {}
+        for keyword, (ktype, kunit) in cls.keywords.items():
+            if keyword not in values:
                 raise ValueError(f"Keyword {keyword} not specified")
 
-            value = match.group(1)
+            value = values[keyword]
             if value == "":
                 value = 0
                 # uncomment this when #1 is fixed
@@ -227,9 +248,11 @@ class ResParser(KeywordParser):
         return res
 
 
-class PoresSizeDistParser:  # pylint: disable=too-few-public-methods
+class PoresSizeDistParser:
     """Parse pore size distribution output of network executable."""
 
+    header_line = "Bin Count"
+
     @classmethod
     def parse(cls, string):  # pylint: disable=too-many-locals
         """
@@ -259,10 +282,9 @@ class PoresSizeDistParser:  # pylint: disable=too-few-public-methods
         lines = [l for l in lines if l.strip()]
 
         # find line where histogram data begins
-        header_line = "Bin Count"
         i = 0
         for i, line in enumerate(lines):
-            if header_line in line:
+            if cls.header_line in line:
                 break
         else:
             raise ValueError("Did not find header line in data")
@@ -292,6 +314,59 @@ class PoresSizeDistParser:  # pylint: disable=too-few-public-methods
 
         return psd_dict
 
+    @classmethod
+    def parse_arrays(cls, string):
+        """
+        Parse zeo++ .psd format into numpy arrays.
+
+        NaN and Inf values (printed by zeo++ when the counts are zero) are replaced by 0.
+
+        Parameters
+        ----------
+        string: str
+            string in psd format
+
+        Returns
+        -------
+        summary: dict
+            dictionary of scalar summary values
+        arrays: dict
+            dictionary with numpy arrays 'bins', 'counts', 'cumulatives' and 'derivatives'
+        """
+        start = string.find(cls.header_line)
+        if start == -1:
+            raise ValueError("Did not find header line in data")
+        newline = string.find("\n", start)
+        data = "" if newline == -1 else string[newline + 1 :]
+
+        if data.strip():
+            table = np.loadtxt(io.StringIO(data), ndmin=2)
+        else:
+            table = np.empty((0, 4))
+        if table.shape[1] != 4:
+            raise ValueError(f"Expected 4 columns in histogram data, found {table.shape[1]}")
+
+        bins, counts, cumulatives, derivatives = table.T
+        arrays = {
+            "bins": bins,
+            "counts": counts.astype(np.int64),
+            "cumulatives": np.nan_to_num(cumulatives, nan=0.0, posinf=0.0, neginf=0.0),
+            "derivatives": np.nan_to_num(derivatives, nan=0.0, posinf=0.0, neginf=0.0),
+        }
+
+        nbins = len(bins)
+        total_counts = int(arrays["counts"].sum())
+        summary = {
+            "PSD_number_of_bins": nbins,
+            "PSD_bin_size": float(bins[1] - bins[0]) if nbins > 1 else 0.0,
+            "PSD_bin_size_unit": "A",
+            "PSD_total_counts": total_counts,
+            "PSD_peak_diameter": float(bins[np.argmax(arrays["counts"])]) if total_counts else 0.0,
+            "PSD_peak_diameter_unit": "A",
+        }
+
+        return summary, arrays
+
 
 class ChannelParser:
     """Parse pore channel output of network executable."""
@@ -367,3 +442,89 @@ class ChannelParser:
     def parse_aiida(cls, string):
         """Return AiiDA dictionary."""
         return Dict(cls.parse(string))
+
+
+class BlockParser:
+    """Parse blocking spheres output of network executable."""
+
+    @classmethod
+    def parse_arrays(cls, handle):
+        """Parse zeo++ .block format line by line.
+
+        Example block string::
+
+            2
+            0.177463 0.677463 0.822537 1.96374
+            0.322537 0.822537 0.177463 1.96374
+
+        The first line contains the number of blocking spheres,
+        each following line the position (as written by zeo++, i.e. fractional coordinates
+        in the format read by RASPA) and the radius of one sphere.
+
+        parameters
+        ----------
+        handle: file-like
+          text file handle of the .block file (or any iterable over its lines)
+
+        return
+        ------
+        summary: dict
+          dictionary with the number of blocking spheres and statistics on their radii
+          (None, if the file is empty)
+        arrays: dict
+          dictionary with float32 numpy arrays 'centers' (nspheres x 3) and 'radii' (nspheres)
+          (None, if the file is empty)
+        """
+        lines = iter(handle)
+        for line in lines:
+            if line.strip():
+                break
+        else:
+            # empty file indicates the calculation of blocked pockets did not finish
+            return None, None
+
+        try:
+            nspheres = int(line.split()[0])
+        except ValueError as exc:
+            raise ValueError(f"Invalid number of blocking spheres: {line!r}") from exc
+
+        if nspheres:
+            spheres = np.loadtxt(lines, usecols=(0, 1, 2, 3), max_rows=nspheres, ndmin=2)
+        else:
+            spheres = np.empty((0, 4))
+        if len(spheres) != nspheres:
+            raise ValueError(f"Expected {nspheres} blocking spheres, found {len(spheres)}")
+
+        radii = spheres[:, 3]
+        summary = {
+            "Number_of_blocking_spheres": nspheres,
+            "Blocking_spheres_max_radius": float(radii.max()) if nspheres else 0.0,
+            "Blocking_spheres_max_radius_unit": "A",
+            "Blocking_spheres_mean_radius": float(radii.mean()) if nspheres else 0.0,
+            "Blocking_spheres_mean_radius_unit": "A",
+        }
+        arrays = {
+            "centers": spheres[:, :3].astype(np.float32),
+            "radii": radii.astype(np.float32),
+        }
+
+        return summary, arrays
+
+    @classmethod
+    def parse(cls, string):
+        """Parse zeo++ .block format
+
+        parameters
+        ----------
+        string: string
+          string in block format
+
+        return
+        ------
+        results: dict
+          dictionary with the number of blocking spheres and statistics on their radii
+        """
+        summary, _arrays = cls.parse_arrays(io.StringIO(string))
+        if summary is None:
+            raise ValueError("Empty block file")
+        return summary
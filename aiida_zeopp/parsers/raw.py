@@ -0,0 +1,229 @@
+"""Streaming readers for large raw output files of the network executable.
+
+Outputs like ``.vsa``, ``.ray_atom``, ``.axs``, visVoro ``.xyz``, ``.zvis`` and ``.nt2`` files have no dedicated parser
+and can reach hundreds of MB for high sample counts.
+The readers in this module process them in chunks, such that memory usage stays bounded independent of the file size.
+"""
+import contextlib
+import functools
+import gzip
+import io
+import os
+import shutil
+import tempfile
+from itertools import islice
+
+import numpy as np
+
+# zeo++ options with raw outputs that are ingested by the streaming reader
+STREAMED_OPTIONS = ("nt2", "zvis", "axs", "visVoro", "vsa", "ray_atom")
+
+# what to do with the raw text of streamed outputs
+RAW_TEXT_POLICIES = ("keep", "compress", "drop")
+
+# suffix of output files compressed on the remote side (see the compress_outputs option of NetworkCalculation)
+COMPRESSED_SUFFIX = ".gz"
+
+CHUNK_ROWS = 65536
+CHUNK_BYTES = 1024**2
+
+
+def _numeric_suffix_length(tokens):
+    """Return number of trailing tokens that can be converted to floats."""
+    length = 0
+    for token in reversed(tokens):
+        try:
+            float(token)
+        except ValueError:
+            break
+        length += 1
+    return length
+
+
+class PointDataParser:
+    """Extract numeric point data from raw zeo++ output files."""
+
+    dtype = np.float32
+    min_columns = 3
+
+    @classmethod
+    def _layout(cls, line):
+        """Return data row layout (label columns, numeric columns) defined by a line, or None."""
+        tokens = line.split()
+        length = _numeric_suffix_length(tokens)
+        if length < cls.min_columns:
+            return None
+        return len(tokens) - length, length
+
+    @classmethod
+    def _convert(cls, lines, layout):
+        """Convert lines of given layout to array.
+
+        Tries to convert the whole chunk at once and falls back to checking line by line,
+        if the chunk contains lines that do not match the layout.
+
+        :returns: tuple (array, number of skipped lines)
+        """
+        offset, ncols = layout
+        usecols = range(offset, offset + ncols) if offset else None
+        try:
+            return np.loadtxt(lines, dtype=cls.dtype, usecols=usecols, ndmin=2), 0
+        except ValueError:
+            pass
+
+        valid = []
+        for line in lines:
+            tokens = line.split()
+            if len(tokens) != offset + ncols:
+                continue
+            try:
+                valid.append(np.array(tokens[offset:], dtype=cls.dtype))
+            except ValueError:
+                continue
+        array = np.array(valid, dtype=cls.dtype).reshape((len(valid), ncols))
+        return array, len(lines) - len(valid)
+
+    @classmethod
+    def parse_arrays(cls, handle, chunk_rows=CHUNK_ROWS):
+        """Stream numeric point data of a raw output file into a binary array.
+
+        The first line with at least ``min_columns`` trailing numeric fields defines the layout of a data row,
+        e.g. ``He 1.0 2.0 3.0`` (a label and 3 columns) or ``1.0 2.0 3.0 1`` (4 columns).
+        All following lines with the same layout are converted to rows of the ``points`` array,
+        all other lines (headers, comments, tables with a different layout) are skipped.
+
+        Lines are converted in chunks of ``chunk_rows`` lines and written to an anonymous temporary file.
+        The resulting array is a read-only ``numpy.memmap`` of this file, i.e. it is not held in memory.
+
+        parameters
+        ----------
+        handle: file-like
+          binary or text file handle of the raw output file
+        chunk_rows: int
+          number of lines converted at once
+
+        return
+        ------
+        summary: dict
+          dictionary with 'number_of_points', 'number_of_columns' and 'number_of_skipped_lines'
+        arrays: dict
+          dictionary with 'points' array (number_of_points x number_of_columns, float32)
+        """
+        if not isinstance(handle, io.TextIOBase):
+            wrapper = io.TextIOWrapper(handle, encoding="utf8", errors="replace")
+            try:
+                return cls.parse_arrays(wrapper, chunk_rows)
+            finally:
+                # do not close the binary handle of the caller
+                wrapper.detach()
+
+        # find first data row
+        layout = None
+        skipped = 0
+        first = None
+        for first in handle:
+            layout = cls._layout(first)
+            if layout is not None:
+                break
+            skipped += 1
+
+        if layout is None:
+            return {"number_of_points": 0, "number_of_columns": 0, "number_of_skipped_lines": skipped}, {
+                "points": np.empty((0, 0), dtype=cls.dtype)
+            }
+
+        npoints = 0
+        with tempfile.TemporaryFile() as buffer:
+            chunk = [first]
+            while chunk:
+                chunk += islice(handle, chunk_rows - len(chunk))
+                array, dropped = cls._convert(chunk, layout)
+                array.tofile(buffer)
+                npoints += len(array)
+                skipped += dropped
+                chunk = list(islice(handle, chunk_rows))
+
+            if npoints:
+                buffer.flush()
+                # the mapping remains valid after the (anonymous) temporary file is closed
+                points = np.memmap(buffer, dtype=cls.dtype, mode="r", shape=(npoints, layout[1]))
+            else:
+                points = np.empty((0, layout[1]), dtype=cls.dtype)
+
+        summary = {
+            "number_of_points": npoints,
+            "number_of_columns": layout[1],
+            "number_of_skipped_lines": skipped,
+        }
+        return summary, {"points": points}
+
+    @classmethod
+    def parse(cls, string):
+        """Parse raw zeo++ output string
+
+        parameters
+        ----------
+        string: string
+          content of the raw output file
+
+        return
+        ------
+        results: dict
+          dictionary with 'number_of_points', 'number_of_columns' and 'number_of_skipped_lines'
+        """
+        summary, _arrays = cls.parse_arrays(io.StringIO(string))
+        return summary
+
+
+def gzip_file(handle, chunk_size=CHUNK_BYTES):
+    """Compress binary file handle into an anonymous temporary file in chunks.
+
+    :param handle: binary file handle to read from
+    :param chunk_size: number of bytes copied at once
+    :returns: temporary file handle with gzip-compressed content, positioned at the start
+    """
+    compressed = tempfile.TemporaryFile()
+    with gzip.GzipFile(fileobj=compressed, mode="wb", mtime=0) as zipped:
+        shutil.copyfileobj(handle, zipped, chunk_size)
+    compressed.seek(0)
+    return compressed
+
+
+def get_output_file_names(names):
+    """Return names of retrieved files, with the suffix of compressed output files removed.
+
+    :param names: names of the files in the retrieved folder
+    """
+    return [name[: -len(COMPRESSED_SUFFIX)] if name.endswith(COMPRESSED_SUFFIX) else name for name in names]
+
+
+@contextlib.contextmanager
+def open_output_file(folder, path):
+    """Open retrieved output file in binary mode, decompressing it on the fly if it was retrieved compressed.
+
+    :param folder: retrieved FolderData, or path of a directory (e.g. the retrieved temporary folder)
+    :param path: path of the (uncompressed) output file in the folder
+    :returns: binary file handle with the uncompressed content (named after the uncompressed file)
+    """
+    if isinstance(folder, (str, os.PathLike)):
+
+        def open_file(name):
+            return open(os.path.join(folder, name), "rb")  # pylint: disable=consider-using-with
+
+        compressed = not os.path.isfile(os.path.join(folder, path))
+    else:
+        open_file = functools.partial(folder.base.repository.open, mode="rb")
+        try:
+            folder.base.repository.get_object(path)
+        except FileNotFoundError:
+            compressed = True
+        else:
+            compressed = False
+
+    if not compressed:
+        with open_file(path) as handle:
+            yield handle
+    else:
+        with open_file(path + COMPRESSED_SUFFIX) as handle:
+            with gzip.GzipFile(filename=path.rsplit("/", 1)[-1], mode="rb", fileobj=handle) as unzipped:
+                yield unzipped
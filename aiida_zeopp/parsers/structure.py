@@ -1,15 +1,510 @@
 """Atomic structure parsers."""
-try:
-    from pymatgen import Structure
-except ImportError:
-    from pymatgen.core import Structure
+import re
 
+import numpy as np
 from aiida.orm import StructureData
+from aiida.orm.nodes.data.structure import Kind, Site
+
+from aiida_zeopp.data.parameters import get_atom_radii
+
+SYMBOL_REGEX = re.compile(r"[A-Z][a-z]?")
+
+# CIF tokens: text fields, quoted strings, comments and plain values
+CIF_TOKEN_REGEX = re.compile(
+    r"^;([^\n]*\n(?:[^;].*\n|\n)*?);|'(.*?)'(?=\s|$)|\"(.*?)\"(?=\s|$)|#.*|(\S+)", re.MULTILINE
+)
+# terms of a symmetry operation component, e.g. '-x+1/2'
+SYMOP_TERM_REGEX = re.compile(r"([+-]?)(\d+(?:\.\d*)?(?:/\d+)?)?\*?([xyz])?")
+
+
+def cell_from_parameters(lengths, angles):
+    """Return cell vectors from lattice parameters.
+
+    Uses the standard convention: a along x, b in the xy plane.
+
+    :param lengths: cell lengths a, b, c (Angstrom)
+    :param angles: cell angles alpha, beta, gamma (degrees)
+    :returns: 3x3 numpy array with cell vectors as rows
+    """
+    a, b, c = lengths
+    cos_alpha, cos_beta, cos_gamma = np.cos(np.radians(angles))
+    sin_gamma = np.sin(np.radians(angles[2]))
+
+    c_x = c * cos_beta
+    c_y = c * (cos_alpha - cos_beta * cos_gamma) / sin_gamma
+    c_z = np.sqrt(c**2 - c_x**2 - c_y**2)
+
+    cell = np.array(
+        [
+            [a, 0.0, 0.0],
+            [b * cos_gamma, b * sin_gamma, 0.0],
+            [c_x, c_y, c_z],
+        ]
+    )
+    # remove numerical noise, e.g. cos(90 deg)
+    cell[np.abs(cell) < 1e-10] = 0.0
+    return cell
+
+
+def pymatgen_cell_from_parameters(lengths, angles):
+    """Return cell vectors from lattice parameters in the convention of pymatgen.
+
+    Uses the convention of ``pymatgen.core.Lattice.from_parameters``: c along z, a in the xz plane.
+    Structures read with the native readers thus have the same orientation as those read with pymatgen.
+    Note: zeo++ itself uses the standard convention (see `cell_from_parameters`).
+
+    :param lengths: cell lengths a, b, c (Angstrom)
+    :param angles: cell angles alpha, beta, gamma (degrees)
+    :returns: 3x3 numpy array with cell vectors as rows
+    """
+    a, b, c = lengths
+    cos_alpha, cos_beta, cos_gamma = np.cos(np.radians(angles))
+    sin_alpha, sin_beta, _sin_gamma = np.sin(np.radians(angles))
+
+    gamma_star = np.arccos(np.clip((cos_alpha * cos_beta - cos_gamma) / (sin_alpha * sin_beta), -1.0, 1.0))
+    cell = np.array(
+        [
+            [a * sin_beta, 0.0, a * cos_beta],
+            [-b * sin_alpha * np.cos(gamma_star), b * sin_alpha * np.sin(gamma_star), b * cos_alpha],
+            [0.0, 0.0, c],
+        ]
+    )
+    # remove numerical noise, e.g. cos(90 deg)
+    cell[np.abs(cell) < 1e-10] = 0.0
+    return cell
+
+
+def get_unique_atoms(fractional_coordinates, cell, tolerance, chunk_size=256):
+    """Return indices of atoms without duplicates (atoms closer than the tolerance to a preceding atom).
+
+    Distances take periodic images into account and are computed for chunks of atoms at once.
+
+    :param fractional_coordinates: natoms x 3 array of fractional coordinates
+    :param cell: 3x3 array with cell vectors as rows
+    :param tolerance: distance (Angstrom) below which atoms are considered duplicates
+    :param chunk_size: number of atoms whose distances are computed at once (limits memory usage)
+    :returns: sorted list of indices of the atoms to keep
+    """
+    coordinates = np.asarray(fractional_coordinates, dtype=float)
+    duplicate = np.zeros(len(coordinates), dtype=bool)
+    for start in range(0, len(coordinates), chunk_size):
+        delta = coordinates[start : start + chunk_size, np.newaxis, :] - coordinates[np.newaxis, :, :]
+        delta -= np.round(delta)
+        close = np.linalg.norm(delta @ cell, axis=-1) < tolerance
+        # an atom is a duplicate of any preceding atom within the tolerance
+        close &= np.arange(len(coordinates))[np.newaxis, :] < np.arange(start, start + len(close))[:, np.newaxis]
+        duplicate[start : start + len(close)] = close.any(axis=1)
+    return np.flatnonzero(~duplicate).tolist()
+
+
+def parse_symmetry_operation(string):
+    """Parse symmetry operation in xyz notation, e.g. '-x+1/2,y,-z'.
+
+    :param string: symmetry operation
+    :returns: tuple (rotation, translation) of 3x3 and 3 numpy arrays, acting on fractional coordinates
+    """
+    components = string.replace(" ", "").lower().split(",")
+    if len(components) != 3:
+        raise ValueError(f"Invalid symmetry operation {string!r}")
+
+    rotation = np.zeros((3, 3))
+    translation = np.zeros(3)
+    for i, component in enumerate(components):
+        for match in SYMOP_TERM_REGEX.finditer(component):
+            sign, number, axis = match.groups()
+            if not (number or axis):
+                if match.group():
+                    raise ValueError(f"Invalid symmetry operation {string!r}")
+                continue
+            if number and "/" in number:
+                numerator, denominator = number.split("/")
+                value = float(numerator) / float(denominator)
+            else:
+                value = float(number) if number else 1.0
+            value = -value if sign == "-" else value
+            if axis:
+                rotation[i, "xyz".index(axis)] += value
+            else:
+                translation[i] += value
+
+    return rotation, translation
+
+
+def _cif_float(value):
+    """Convert CIF numeric value to float, dropping the standard uncertainty, e.g. '0.3166(3)'."""
+    return float(value.split("(")[0])
+
+
+class CifParser:
+    """Parser class for CIF structure format, restricted to what zeo++ needs."""
+
+    @classmethod
+    def _read_tags(cls, string):
+        """Read data items of the first data block of a CIF string.
+
+        :returns: dictionary mapping tag names (lower case) to lists of values
+        """
+        tags = {}
+        loop_tags = None
+        loop_values = None
+        tag = None
+        data_blocks = 0
+
+        def close_loop():
+            if loop_tags and loop_values:
+                for i, loop_tag in enumerate(loop_tags):
+                    tags[loop_tag] = loop_values[i :: len(loop_tags)]
+
+        for match in CIF_TOKEN_REGEX.finditer(string):
+            text, single, double, plain = match.groups()
+            if plain is None:
+                if text is None and single is None and double is None:
+                    continue  # comment
+                value = next(val for val in (text, single, double) if val is not None)
+            else:
+                value = plain
+                lower = plain.lower()
+                if lower.startswith("data_"):
+                    data_blocks += 1
+                    if data_blocks > 1:
+                        break
+                    continue
+                if lower == "loop_":
+                    close_loop()
+                    loop_tags, loop_values, tag = [], [], None
+                    continue
+                if plain.startswith("_"):
+                    if loop_tags is not None and not loop_values:
+                        loop_tags.append(lower)
+                    else:
+                        close_loop()
+                        loop_tags, loop_values = None, None
+                        tag = lower
+                    continue
+
+            if loop_tags is not None:
+                loop_values.append(value)
+            elif tag is not None:
+                tags[tag] = [value]
+                tag = None
+
+        close_loop()
+        return tags
+
+    @classmethod
+    def _cell_parameters(cls, tags):
+        """Return cell lengths and angles from CIF data items."""
+        try:
+            lengths = np.array([_cif_float(tags[f"_cell_length_{x}"][0]) for x in "abc"])
+            angles = np.array([_cif_float(tags[f"_cell_angle_{x}"][0]) for x in ("alpha", "beta", "gamma")])
+        except (KeyError, IndexError, ValueError) as exc:
+            raise ValueError(f"Unable to read cell from .cif format: {exc}") from exc
+        return lengths, angles
+
+    @classmethod
+    def parse_cell(cls, string):
+        """Parse cell vectors from .cif string, without reading the atom sites
+
+        parameters
+        ----------
+        string: string
+          string in cif file format
+
+        return
+        ------
+        cell: numpy array
+          3x3 array with cell vectors as rows
+        """
+        return cell_from_parameters(*cls._cell_parameters(cls._read_tags(string)))
+
+    @classmethod
+    def parse_arrays(cls, string, tolerance=0.01):
+        """Parse .cif string into numpy arrays of the full (P1) unit cell, without using pymatgen
+
+        Symmetry operations are applied to the atom sites and symmetry-equivalent positions closer than the
+        tolerance are merged.
+        All data beyond cell, symmetry operations and atom sites (bonds, displacements, citations, ...) is ignored.
+
+        parameters
+        ----------
+        string: string
+          string in cif file format
+        tolerance: float
+          distance (Angstrom) below which symmetry-equivalent positions are merged
+
+        return
+        ------
+        results: dict
+          dictionary with cell 'lengths' and 'angles', atom 'labels', chemical 'symbols'
+          and 'fractional_coordinates' (natoms x 3 array)
+        """
+        # pylint: disable=too-many-locals
+        tags = cls._read_tags(string)
+
+        lengths, angles = cls._cell_parameters(tags)
+        try:
+            site_coordinates = np.array(
+                [[_cif_float(v) for v in tags[f"_atom_site_fract_{x}"]] for x in "xyz"], dtype=float
+            ).T
+        except (KeyError, IndexError, ValueError) as exc:
+            raise ValueError(f"Unable to read atom sites from .cif format: {exc}") from exc
+
+        site_labels = tags.get("_atom_site_label") or tags.get("_atom_site_type_symbol")
+        site_types = tags.get("_atom_site_type_symbol", site_labels)
+        if site_labels is None or len(site_labels) != len(site_coordinates) or len(site_types) != len(site_labels):
+            raise ValueError("Inconsistent atom site loop in .cif format")
+
+        operations = tags.get("_space_group_symop_operation_xyz") or tags.get("_symmetry_equiv_pos_as_xyz") or ["x,y,z"]
+        rotations, translations = zip(*(parse_symmetry_operation(operation) for operation in operations))
+        rotations, translations = np.array(rotations), np.array(translations)
+
+        cell = cell_from_parameters(lengths, angles)
+        labels = []
+        symbols = []
+        coordinates = []
+        for label, site_type, position in zip(site_labels, site_types, site_coordinates):
+            match = SYMBOL_REGEX.match(site_type)
+            if match is None:
+                raise ValueError(f"Unable to determine chemical element of atom site {site_type!r}")
+
+            # all symmetry-equivalent positions of the site, inside the unit cell
+            images = (rotations @ position + translations) % 1.0
+            # merge positions closer than the tolerance (taking periodic images into account)
+            delta = images[:, np.newaxis, :] - images[np.newaxis, :, :]
+            delta -= np.round(delta)
+            distances = np.linalg.norm(delta @ cell, axis=-1)
+            unique = []
+            for i in range(len(images)):
+                if not np.any(distances[i, unique] < tolerance):
+                    unique.append(i)
+
+            labels += [label] * len(unique)
+            symbols += [match.group()] * len(unique)
+            coordinates.append(images[unique])
+
+        return {
+            "lengths": lengths,
+            "angles": angles,
+            "labels": labels,
+            "symbols": symbols,
+            "fractional_coordinates": np.concatenate(coordinates) if coordinates else np.empty((0, 3)),
+        }
+
+    @classmethod
+    def parse(cls, string):
+        """Parse .cif string using pymatgen
+
+        parameters
+        ----------
+        string: string
+          string in cif file format
+
+        return
+        ------
+        results: structure
+          corresponding pymatgen structure (conventional unit cell)
+        """
+        # pylint: disable=import-outside-toplevel
+        from pymatgen.io.cif import CifParser as PymatgenCifParser
+
+        return PymatgenCifParser.from_str(string).parse_structures(primitive=False)[0]
+
+    @classmethod
+    def write_p1(cls, string, tolerance=0.01):
+        """Return minimal P1 .cif string of a structure, without using pymatgen
+
+        Symmetry operations are applied (see `parse_arrays`) and duplicate atoms closer than the tolerance
+        are merged, keeping the first one. Only cell and atom sites (labels, symbols and fractional coordinates)
+        are written, in the order of the input file.
+
+        parameters
+        ----------
+        string: string
+          string in cif file format
+        tolerance: float
+          distance (Angstrom) below which atoms are merged
+
+        return
+        ------
+        string: string
+          string in cif file format
+        """
+        arrays = cls.parse_arrays(string, tolerance=tolerance)
+        cell = cell_from_parameters(arrays["lengths"], arrays["angles"])
+        unique = get_unique_atoms(arrays["fractional_coordinates"], cell, tolerance)
+
+        return cls.write_arrays(
+            dict(
+                arrays,
+                labels=[arrays["labels"][i] for i in unique],
+                symbols=[arrays["symbols"][i] for i in unique],
+                fractional_coordinates=arrays["fractional_coordinates"][unique],
+            )
+        )
+
+    @classmethod
+    def write_arrays(cls, arrays):
+        """Return minimal P1 .cif string of numpy arrays of a structure
+
+        parameters
+        ----------
+        arrays: dict
+          dictionary with cell 'lengths' and 'angles', atom 'labels', chemical 'symbols'
+          and 'fractional_coordinates' (see `parse_arrays`)
+
+        return
+        ------
+        string: string
+          string in cif file format
+        """
+        (a, b, c), (alpha, beta, gamma) = arrays["lengths"], arrays["angles"]
+        lines = [
+            "data_p1",
+            f"_cell_length_a {a}",
+            f"_cell_length_b {b}",
+            f"_cell_length_c {c}",
+            f"_cell_angle_alpha {alpha}",
+            f"_cell_angle_beta {beta}",
+            f"_cell_angle_gamma {gamma}",
+            "_symmetry_space_group_name_H-M 'P 1'",
+            "_symmetry_Int_Tables_number 1",
+            "loop_",
+            "_symmetry_equiv_pos_as_xyz",
+            "x,y,z",
+            "loop_",
+            "_atom_site_label",
+            "_atom_site_type_symbol",
+            "_atom_site_fract_x",
+            "_atom_site_fract_y",
+            "_atom_site_fract_z",
+        ]
+        lines += [
+            f"{label} {symbol} {x:.6f} {y:.6f} {z:.6f}"
+            for label, symbol, (x, y, z) in zip(
+                arrays["labels"], arrays["symbols"], np.asarray(arrays["fractional_coordinates"]).tolist()
+            )
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def parameters_from_cell(cell):
+    """Return lattice parameters of cell vectors (inverse of `cell_from_parameters`).
+
+    :param cell: 3x3 array with cell vectors as rows
+    :returns: tuple (lengths, angles) of cell lengths (Angstrom) and angles alpha, beta, gamma (degrees)
+    """
+    cell = np.asarray(cell, dtype=float)
+    lengths = np.linalg.norm(cell, axis=1)
+    angles = np.degrees(
+        np.arccos(
+            [
+                np.dot(cell[1], cell[2]) / (lengths[1] * lengths[2]),
+                np.dot(cell[0], cell[2]) / (lengths[0] * lengths[2]),
+                np.dot(cell[0], cell[1]) / (lengths[0] * lengths[1]),
+            ]
+        )
+    )
+    return lengths, angles
+
+
+def get_cell(structure):
+    """Return cell vectors of an input structure.
+
+    :param structure: input structure (CifData or StructureData)
+    :returns: 3x3 numpy array with cell vectors as rows
+    :raises ValueError: if the cell cannot be determined
+    """
+    if isinstance(structure, StructureData):
+        return np.array(structure.cell, dtype=float)
+    return CifParser.parse_cell(structure.get_content())
+
+
+def get_arrays(structure):
+    """Return numpy arrays of the full (P1) unit cell of an input structure.
+
+    :param structure: input structure (CifData or StructureData)
+    :returns: dictionary in the format of `CifParser.parse_arrays`
+    :raises ValueError: if the structure cannot be read
+    """
+    if not isinstance(structure, StructureData):
+        return CifParser.parse_arrays(structure.get_content())
+
+    cell = np.array(structure.cell, dtype=float)
+    lengths, angles = parameters_from_cell(cell)
+    positions = np.array([site.position for site in structure.sites], dtype=float).reshape(-1, 3)
+    return {
+        "lengths": lengths,
+        "angles": angles,
+        "labels": [site.kind_name for site in structure.sites],
+        "symbols": [structure.get_kind(site.kind_name).symbol for site in structure.sites],
+        "fractional_coordinates": positions @ np.linalg.inv(cell),
+    }
+
+
+def get_structure_radii(structure, atomic_radii=None):
+    """Return radii of the atoms of the full (P1) unit cell of an input structure, as used by zeo++.
+
+    :param structure: input structure (CifData or StructureData)
+    :param atomic_radii: atomic radii file (SinglefileData, optional); default radii are used otherwise
+    :returns: list of radii (Angstrom)
+    :raises ValueError: if the structure or the atomic radii file cannot be read
+    """
+    content = atomic_radii.get_content() if atomic_radii is not None else None
+    return get_atom_radii(get_arrays(structure)["symbols"], content)
 
 
 class CssrParser:
     """Parser class for CSSR structure format."""
 
+    @classmethod
+    def parse_arrays(cls, string):
+        """Parse .cssr string into numpy arrays, without using pymatgen
+
+        parameters
+        ----------
+        string: string
+          string in cssr file format
+
+        return
+        ------
+        results: dict
+          dictionary with cell 'lengths' and 'angles', atom 'labels', chemical 'symbols'
+          and 'fractional_coordinates' (natoms x 3 array)
+        """
+        lines = string.splitlines()
+        try:
+            lengths = np.array(lines[0].split()[:3], dtype=float)
+            angles = np.array(lines[1].split()[:3], dtype=float)
+            natoms = int(lines[2].split()[0])
+        except (IndexError, ValueError) as exc:
+            raise ValueError(f"Invalid header of .cssr format: {exc}") from exc
+
+        atom_lines = lines[4 : 4 + natoms]
+        if len(atom_lines) != natoms:
+            raise ValueError(f"Expected {natoms} atoms in .cssr format, found {len(atom_lines)}")
+
+        rows = [line.split(None, 5) for line in atom_lines]
+        labels = [row[1] for row in rows]
+        try:
+            fractional_coordinates = np.array([row[2:5] for row in rows], dtype=float).reshape((natoms, 3))
+        except ValueError as exc:
+            raise ValueError(f"Invalid atom coordinates in .cssr format: {exc}") from exc
+
+        symbols = []
+        for label in labels:
+            match = SYMBOL_REGEX.match(label)
+            if match is None:
+                raise ValueError(f"Unable to determine chemical element of atom label {label!r}")
+            symbols.append(match.group())
+
+        return {
+            "lengths": lengths,
+            "angles": angles,
+            "labels": labels,
+            "symbols": symbols,
+            "fractional_coordinates": fractional_coordinates,
+        }
+
     @classmethod
     def parse(cls, string):
         """Parse .cssr string using pymatgen
@@ -22,12 +517,78 @@ class CssrParser:
         return
         ------
         results: structure
-          corresponding AiiDA structure
+          corresponding pymatgen structure
         """
+        # pymatgen is slow to import, only import it when needed
+        # pylint: disable=import-outside-toplevel
+        try:
+            from pymatgen.core import Structure
+        except ImportError:
+            from pymatgen import Structure
+
         return Structure.from_str(string, fmt="cssr")
 
     @classmethod
     def parse_aiida(cls, string):
-        """Parse .cssr string to AiiDA StructureData"""
-        pym_struct = cls.parse(string)
-        return StructureData(pymatgen_structure=pym_struct)
+        """Parse .cssr string to AiiDA StructureData
+
+        Uses the native reader and falls back to pymatgen, if the native reader fails.
+        Both use the lattice convention of pymatgen (see `pymatgen_cell_from_parameters`).
+        """
+        try:
+            arrays = cls.parse_arrays(string)
+        except ValueError:
+            return StructureData(pymatgen_structure=cls.parse(string))
+
+        cell = pymatgen_cell_from_parameters(arrays["lengths"], arrays["angles"])
+        positions = arrays["fractional_coordinates"] @ cell
+
+        # Note: appending sites one by one re-validates the growing list of sites, which scales quadratically.
+        # We therefore set kinds and sites at once.
+        structure = StructureData(cell=cell.tolist())
+        kinds = [Kind(symbols=symbol, name=symbol).get_raw() for symbol in dict.fromkeys(arrays["symbols"])]
+        sites = [
+            Site(kind_name=symbol, position=position).get_raw()
+            for symbol, position in zip(arrays["symbols"], positions.tolist())
+        ]
+        structure.base.attributes.set_many({"kinds": kinds, "sites": sites})
+
+        return structure
+
+    @classmethod
+    def write_aiida(cls, structure, title="structure"):
+        """Write AiiDA StructureData to .cssr string, without using pymatgen.
+
+        Fractional coordinates are computed for all atoms at once; atoms are labelled by their chemical element.
+        zeo++ reads .cssr files faster than .cif files, since no symmetry operations need to be applied.
+
+        :param structure: StructureData (periodic in all three dimensions)
+        :param title: title of the structure (without whitespace)
+        :returns: string in cssr file format
+        """
+        if not all(structure.pbc):
+            raise ValueError(f"Structure needs to be periodic in all dimensions, got pbc={structure.pbc}")
+
+        symbols = {}
+        for kind in structure.kinds:
+            if kind.is_alloy or kind.has_vacancies:
+                raise ValueError(f"Kind {kind.name!r} with partial occupancies is not supported in .cssr format")
+            symbols[kind.name] = kind.symbol
+
+        cell = np.array(structure.cell, dtype=float)
+        sites = structure.sites
+        positions = np.array([site.position for site in sites], dtype=float).reshape((len(sites), 3))
+        fractional_coordinates = np.linalg.solve(cell.T, positions.T).T
+        lengths, angles = (" ".join(f"{value:.6f}" for value in values) for values in parameters_from_cell(cell))
+
+        header = [
+            f"\t\t\t\t{lengths}",
+            f"\t\t{angles} SPGR =  1 P 1\t\t OPT = 1",
+            f"{len(sites)} 0",
+            f"0 {title}\t: {title}",
+        ]
+        lines = [
+            f"{index} {symbols[site.kind_name]} {x:.6f} {y:.6f} {z:.6f}  0  0  0  0  0  0  0  0  0.000000"
+            for index, (site, (x, y, z)) in enumerate(zip(sites, fractional_coordinates.tolist()), start=1)
+        ]
+        return "\n".join(header + lines) + "\n"
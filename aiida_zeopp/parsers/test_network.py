@@ -1,119 +1,42 @@
-""" Tests for parsers
+"""Tests for the network parser.
 
-Currently not strictly needed due to full integration tests.
-Might reactivate this when testing parsers becomes easier.
+Most of the parsing is covered by the integration tests in ``aiida_zeopp/calculations``,
+these tests cover failures that zeo++ does not produce on demand.
 """
-# import os
+import os
 
-# import aiida_zeopp.tests as zt
+from aiida.plugins import CalculationFactory, DataFactory, ParserFactory
 
-# class TestNetwork(zt.PluginTestCase):
-#     def setUp(self):
+from aiida_zeopp.tests import TEST_DIR
 
-#         # set up test computer
-#         self.code = zt.get_code(entry_point='zeopp.network')
+CifData = DataFactory("core.cif")
+NetworkParameters = DataFactory("zeopp.parameters")
+NetworkCalculation = CalculationFactory("zeopp.network")
+NetworkParser = ParserFactory("zeopp.network")
 
-#     def get_calc(self, parameters):
-#         """Set up a simple calculation
 
-#         Uses example cif file.
+def get_block_calculation(finished_calculation, block):
+    """Return finished calculation of blocking spheres with the given content of the block file."""
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy")
+    parameters = NetworkParameters({"block": [1.8, 100]})
+    return finished_calculation(
+        inputs={"structure": structure, "parameters": parameters},
+        retrieved={"out.block": block.encode("utf8")},
+    )
 
-#         :param parameters:  A zeopp.parameters object
-#         :return calc: A zeopp.calculation object
-#         """
-#         # Prepare input parameters
-#         from aiida.plugins import DataFactory
-#         CifData = DataFactory('cif')
-#         structure = CifData(
-#             filepath=os.path.join(zt.TEST_DIR, 'HKUST-1.cif'),
-#             parse_policy='lazy')
 
-#         # set up calculation
-#         calc = self.code.new_calc()
-#         calc.label = "aiida_zeopp format conversion"
-#         calc.set_max_wallclock_seconds(30)
-#         calc.set_withmpi(False)
-#         calc.set_resources({"num_machines": 1, "num_mpiprocs_per_machine": 1})
-#         calc.use_parameters(parameters)
-#         calc.use_structure(structure)
+def test_block(finished_calculation):
+    """Test parsing a valid block file."""
+    node = get_block_calculation(finished_calculation, "2\n0.1 0.2 0.3 1.5\n0.4 0.5 0.6 2.5\n")
+    results, calcfunction = NetworkParser.parse_from_node(node, store_provenance=False)
 
-#         return calc
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+    assert results["output_parameters"]["Number_of_blocking_spheres"] == 2
 
-#     def get_retrieved(self, parameters):
-#         """Set up a fake 'retrieved' dict.
 
-#         As well as an output folder.
-#         """
-#         import tempfile
-#         import shutil
-#         from aiida.orm.nodes.data.folder import FolderData
+def test_block_invalid(finished_calculation):
+    """Test that an invalid block file results in an exit code instead of missing outputs."""
+    node = get_block_calculation(finished_calculation, "3\n0.1 0.2 0.3 1.5\n")
+    _, calcfunction = NetworkParser.parse_from_node(node, store_provenance=False)
 
-#         tmp_dir = tempfile.mkdtemp()
-
-#         test_files = {
-#             'cssr': 'HKUST-1.cssr',
-#             'sa': 'HKUST-1.sa',
-#             'volpo': 'HKUST-1.volpo',
-#             'block': 'HKUST-1.block',
-#         }
-
-#         for out_key, out_file in parameters.output_dict.items():
-#             shutil.copyfile(
-#                 os.path.join(zt.TEST_DIR, test_files[out_key]),
-#                 os.path.join(tmp_dir, out_file))
-
-#         res = FolderData()
-#         res.replace_with_folder(tmp_dir)
-#         shutil.rmtree(tmp_dir)
-
-#         retrieved = {'retrieved': res}
-
-#         return retrieved
-
-#     def test_parser(self):
-#         """Test parsing a fake output."""
-#         from aiida_zeopp.parsers.network import NetworkParser
-#         from aiida.plugins import DataFactory
-
-#         NetworkParameters = DataFactory('zeopp.parameters')
-
-#         params1 = NetworkParameters(dict={
-#             'cssr': True,
-#             'sa': [1.82, 1.82, 10000],
-#             'volpo': [1.82, 1.82, 100000]
-#         })
-#         retrieved = self.get_retrieved(params1)
-
-#         # check that it parses successfully
-#         parser1 = NetworkParser(self.get_calc(params1))
-#         success, node_list = parser1.parse(retrieved)
-
-#         self.assertTrue(success)
-
-#         # check that parsed nodes meet expectations
-#         expected_keys = set(['structure_cssr', 'output_parameters'])
-#         found_keys = {n[0] for n in node_list}
-#         self.assertEqual(expected_keys, found_keys)
-
-#     def test_parser_fail(self):
-#         """Test parsing a fake output.
-
-#         Providing empty .block file which should raise a ParsingError.
-#         """
-#         from aiida_zeopp.parsers.network import NetworkParser
-#         from aiida.common import OutputParsingError
-#         from aiida.plugins import DataFactory
-
-#         NetworkParameters = DataFactory('zeopp.parameters')
-
-#         params1 = NetworkParameters(dict={
-#             'volpo': [1.82, 1.82, 100000],
-#             'block': [1.82, 10000],
-#         })
-#         retrieved = self.get_retrieved(params1)
-
-#         # check that it parses successfully
-#         parser1 = NetworkParser(self.get_calc(params1))
-
-#         with self.assertRaises(OutputParsingError):
-#             parser1.parse_with_retrieved(retrieved)
+    assert calcfunction.exit_status == NetworkCalculation.exit_codes.ERROR_OUTPUT_PARSING.status
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 import aiida_zeopp.parsers.plain as parsers
 
 
@@ -26,7 +28,20 @@ class SaParserTestCase(unittest.TestCase):
         """
 
         parser = parsers.SurfaceAreaParser
-        parser.parse(string)
+        results = parser.parse(string)
+
+        self.assertEqual(results["ASA_A^2"], 3545.59)
+        self.assertEqual(results["NASA_A^2"], 0.0)
+        self.assertEqual(results["Number_of_channels"], 1)
+        self.assertEqual(results["Pocket_surface_area_A^2"], 0.0)
+        self.assertEqual(results["ASA_m^2/g_unit"], "m^2/g")
+
+    def test_missing_keyword(self):
+        """Test that a missing keyword raises a ValueError."""
+        string = "HKUST-1.sa Unitcell_volume: 18280.8   Density: 0.879097"
+
+        with self.assertRaises(ValueError):
+            parsers.SurfaceAreaParser.parse(string)
 
 
 class ResParserTestCase(unittest.TestCase):
@@ -144,3 +159,61 @@ Bin Count Cumulative_dist Derivative_dist
         self.assertEqual(counts, histogram["psd"]["counts"])
         self.assertEqual(cumulatives, histogram["psd"]["cumulatives"])
         self.assertEqual(derivatives, histogram["psd"]["derivatives"])
+
+    def test_parse_arrays(self):
+        """Test parsing pore size distribution into numpy arrays."""
+        string = (
+            "Pore size distribution histogram\n"
+            "Bin size (A): 0.1\n"
+            "Number of bins: 1000\n"
+            "\n"
+            "Bin Count Cumulative_dist Derivative_dist\n"
+            "0 0 -nan 0\n"
+            "0.1 3 1 nan\n"
+            "0.2 5 0.625 -inf\n"
+        )
+
+        parser = parsers.PoresSizeDistParser
+        summary, arrays = parser.parse_arrays(string)
+
+        np.testing.assert_allclose(arrays["bins"], [0.0, 0.1, 0.2])
+        np.testing.assert_array_equal(arrays["counts"], [0, 3, 5])
+        np.testing.assert_allclose(arrays["cumulatives"], [0.0, 1.0, 0.625])
+        np.testing.assert_allclose(arrays["derivatives"], [0.0, 0.0, 0.0])
+
+        self.assertEqual(summary["PSD_number_of_bins"], 3)
+        self.assertEqual(summary["PSD_total_counts"], 8)
+        self.assertAlmostEqual(summary["PSD_bin_size"], 0.1)
+        self.assertAlmostEqual(summary["PSD_peak_diameter"], 0.2)
+
+        # same histogram as the list-based parser
+        histogram = parser.parse(string)["psd"]
+        self.assertEqual(histogram["counts"], arrays["counts"].tolist())
+        self.assertEqual(histogram["cumulatives"], arrays["cumulatives"].tolist())
+
+
+class BlockParserTestCase(unittest.TestCase):
+    def test_parse_arrays(self):
+        """Test parsing blocking spheres into numpy arrays."""
+        string = "2\n0.177463 0.677463 0.822537 1.96374\n0.322537 0.822537 0.177463 1.5\n"
+
+        summary, arrays = parsers.BlockParser.parse_arrays(string.splitlines())
+
+        self.assertEqual(arrays["centers"].shape, (2, 3))
+        self.assertEqual(arrays["centers"].dtype, np.float32)
+        np.testing.assert_allclose(arrays["radii"], [1.96374, 1.5], rtol=1e-6)
+
+        self.assertEqual(summary["Number_of_blocking_spheres"], 2)
+        self.assertAlmostEqual(summary["Blocking_spheres_max_radius"], 1.96374)
+        self.assertAlmostEqual(summary["Blocking_spheres_mean_radius"], 1.73187)
+
+        self.assertEqual(parsers.BlockParser.parse(string), summary)
+
+    def test_parse_empty(self):
+        """Test that empty block files are recognized."""
+        self.assertEqual(parsers.BlockParser.parse_arrays([]), (None, None))
+        self.assertEqual(parsers.BlockParser.parse("0\n")["Number_of_blocking_spheres"], 0)
+        with self.assertRaises(ValueError):
+            parsers.BlockParser.parse("\n")
+        with self.assertRaises(ValueError):
+            parsers.BlockParser.parse("2\n0.1 0.2 0.3 1.0\n")
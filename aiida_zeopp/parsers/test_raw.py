@@ -0,0 +1,68 @@
+import gzip
+import io
+import unittest
+
+import numpy as np
+from aiida.orm import FolderData
+
+from aiida_zeopp.parsers.raw import (
+    PointDataParser,
+    get_output_file_names,
+    gzip_file,
+    open_output_file,
+)
+
+
+class PointDataParserTestCase(unittest.TestCase):
+    def test_parse_arrays(self):
+        """Test streaming point data into a binary array."""
+        string = "x y z sa\n" + "".join(f"{i * 0.1:.4f} {i * 0.2:.4f} {i * 0.3:.4f} 1\n" for i in range(10))
+        handle = io.BytesIO(string.encode("utf8"))
+
+        summary, arrays = PointDataParser.parse_arrays(handle, chunk_rows=3)
+
+        self.assertEqual(summary["number_of_points"], 10)
+        self.assertEqual(summary["number_of_columns"], 4)
+        self.assertEqual(summary["number_of_skipped_lines"], 1)
+        self.assertEqual(arrays["points"].dtype, np.float32)
+        np.testing.assert_allclose(arrays["points"][-1], [0.9, 1.8, 2.7, 1.0], rtol=1e-6)
+
+        # binary handle of the caller is not closed
+        self.assertFalse(handle.closed)
+
+    def test_parse_labels(self):
+        """Test skipping of labels and lines with a different layout."""
+        string = "3\ncomment\nHe 1 2 3\nHe 4 5 x\nO 7 8 9\nTable\n1 2\n"
+
+        summary, arrays = PointDataParser.parse_arrays(io.StringIO(string))
+
+        self.assertEqual(summary["number_of_points"], 2)
+        self.assertEqual(summary["number_of_skipped_lines"], 5)
+        np.testing.assert_array_equal(arrays["points"], [[1, 2, 3], [7, 8, 9]])
+
+    def test_parse_no_points(self):
+        summary, arrays = PointDataParser.parse_arrays(io.StringIO("draw sphere\n"))
+
+        self.assertEqual(summary["number_of_points"], 0)
+        self.assertEqual(arrays["points"].shape, (0, 0))
+
+    def test_gzip_file(self):
+        content = b"He 1 2 3\n" * 100
+        with gzip_file(io.BytesIO(content), chunk_size=16) as compressed:
+            self.assertEqual(gzip.decompress(compressed.read()), content)
+
+    def test_open_output_file(self):
+        content = b"He 1 2 3\n" * 100
+        folder = FolderData()
+        folder.base.repository.put_object_from_filelike(io.BytesIO(content), "mof/out.vsa")
+        folder.base.repository.put_object_from_filelike(io.BytesIO(gzip.compress(content)), "mof/out.psd.gz")
+
+        self.assertEqual(get_output_file_names(folder.base.repository.list_object_names("mof")), ["out.psd", "out.vsa"])
+        for path in ("mof/out.vsa", "mof/out.psd"):
+            with open_output_file(folder, path) as handle:
+                self.assertEqual(handle.read(), content)
+        with open_output_file(folder, "mof/out.psd") as handle:
+            self.assertEqual(handle.name, "out.psd")
+        with self.assertRaises(FileNotFoundError):
+            with open_output_file(folder, "mof/out.sa"):
+                pass
@@ -1,5 +1,8 @@
 import os
 
+import numpy as np
+from aiida.orm import StructureData
+
 import aiida_zeopp.parsers.structure as parsers
 import aiida_zeopp.tests as zt
 
@@ -12,3 +15,151 @@ def test_parse_hkust():
 
     parser = parsers.CssrParser
     parser.parse(string)
+
+
+def test_parse_arrays():
+    """Test native CSSR reader against pymatgen."""
+    with open(os.path.join(zt.TEST_DIR, "HKUST-1.cssr")) as f:
+        string = f.read()
+
+    parser = parsers.CssrParser
+    arrays = parser.parse_arrays(string)
+    pym_struct = parser.parse(string)
+
+    assert len(arrays["symbols"]) == len(pym_struct) == 624
+    assert arrays["symbols"] == [site.specie.symbol for site in pym_struct]
+    np.testing.assert_allclose(arrays["lengths"], pym_struct.lattice.abc)
+    np.testing.assert_allclose(arrays["angles"], pym_struct.lattice.angles)
+    np.testing.assert_allclose(arrays["fractional_coordinates"], pym_struct.frac_coords)
+
+
+def test_parse_aiida():
+    """Test creating StructureData with the native CSSR reader."""
+    with open(os.path.join(zt.TEST_DIR, "MgO.cssr")) as f:
+        string = f.read()
+
+    structure = parsers.CssrParser.parse_aiida(string)
+
+    assert structure.get_formula() == "Mg4O8"
+    assert structure.get_kind_names() == ["Mg", "O"]
+    np.testing.assert_allclose(structure.get_cell_volume(), 4.8982**3)
+    np.testing.assert_allclose(structure.sites[4].position, np.array([0.4112, 0.0888, 0.9112]) * 4.8982)
+
+
+def test_parse_aiida_pymatgen():
+    """Test that the native CSSR reader and the pymatgen fallback give the same StructureData."""
+    structure = StructureData(cell=parsers.cell_from_parameters([5.0, 6.0, 7.0], [80.0, 95.0, 110.0]).tolist())
+    structure.append_atom(symbols="Mg", position=[0.5, 1.0, 1.5])
+    structure.append_atom(symbols="O", position=[2.0, 3.0, 4.0])
+    string = parsers.CssrParser.write_aiida(structure)
+
+    native = parsers.CssrParser.parse_aiida(string)
+    fallback = StructureData(pymatgen_structure=parsers.CssrParser.parse(string))
+
+    np.testing.assert_allclose(native.cell, fallback.cell, atol=1e-6)
+    np.testing.assert_allclose(
+        [site.position for site in native.sites], [site.position for site in fallback.sites], atol=1e-5
+    )
+    np.testing.assert_allclose(native.get_cell_volume(), structure.get_cell_volume())
+
+
+def test_parse_cif_arrays():
+    """Test native CIF reader against pymatgen."""
+    from pymatgen.io.cif import CifParser
+
+    with open(os.path.join(zt.TEST_DIR, "HKUST-1.cif")) as f:
+        string = f.read()
+
+    arrays = parsers.CifParser.parse_arrays(string)
+    pym_struct = CifParser.from_str(string).parse_structures(primitive=False)[0]
+
+    assert len(arrays["symbols"]) == len(pym_struct) == 624
+    assert sorted(arrays["symbols"]) == sorted(site.specie.symbol for site in pym_struct)
+    np.testing.assert_allclose(arrays["lengths"], pym_struct.lattice.abc)
+    np.testing.assert_allclose(arrays["angles"], pym_struct.lattice.angles)
+
+
+def test_parse_cif_symmetry():
+    """Test applying symmetry operations and merging equivalent positions."""
+    string = """data_test
+_cell_length_a 5.0(1)
+_cell_length_b 6.0
+_cell_length_c 7.0
+_cell_angle_alpha 90
+_cell_angle_beta 100
+_cell_angle_gamma 90
+_publ_section_title
+;
+Title; with text
+;
+loop_
+_space_group_symop_operation_xyz
+'x, y, z'
+'-x, -y, -z'
+loop_
+_atom_site_label
+_atom_site_fract_x
+_atom_site_fract_y
+_atom_site_fract_z
+Zn1 0 0 0
+O1 0.1 0.2 0.3
+"""
+    arrays = parsers.CifParser.parse_arrays(string)
+
+    assert arrays["symbols"] == ["Zn", "O", "O"]
+    np.testing.assert_allclose(arrays["lengths"], [5.0, 6.0, 7.0])
+    np.testing.assert_allclose(arrays["fractional_coordinates"], [[0, 0, 0], [0.1, 0.2, 0.3], [0.9, 0.8, 0.7]])
+
+    rotation, translation = parsers.parse_symmetry_operation("-x+1/2, y-x, 1/4-z")
+    np.testing.assert_allclose(rotation, [[-1, 0, 0], [-1, 1, 0], [0, 0, -1]])
+    np.testing.assert_allclose(translation, [0.5, 0, 0.25])
+
+
+def test_write_aiida():
+    """Test round trip of StructureData through the native CSSR writer and reader."""
+    with open(os.path.join(zt.TEST_DIR, "HKUST-1.cssr")) as f:
+        structure = parsers.CssrParser.parse_aiida(f.read())
+
+    string = parsers.CssrParser.write_aiida(structure)
+    arrays = parsers.CssrParser.parse_arrays(string)
+    pym_struct = parsers.CssrParser.parse(string)
+
+    assert arrays["symbols"] == [site.kind_name for site in structure.sites]
+    assert len(pym_struct) == 624
+    np.testing.assert_allclose(arrays["lengths"], [26.343] * 3)
+    np.testing.assert_allclose(arrays["angles"], [90.0] * 3)
+    np.testing.assert_allclose(
+        arrays["fractional_coordinates"] @ structure.cell, [s.position for s in structure.sites], atol=1e-4
+    )
+
+    # triclinic cell in arbitrary orientation
+    cell = parsers.cell_from_parameters([5.0, 6.0, 7.0], [80.0, 95.0, 110.0])
+    rotation = np.array([[0.0, 1.0, 0.0], [-1.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+    lengths, angles = parsers.parameters_from_cell(cell @ rotation)
+    np.testing.assert_allclose(lengths, [5.0, 6.0, 7.0])
+    np.testing.assert_allclose(angles, [80.0, 95.0, 110.0])
+
+
+def test_write_p1():
+    """Test stripping CIF files to minimal P1 files."""
+    with open(os.path.join(zt.TEST_DIR, "HKUST-1.cif")) as f:
+        string = f.read()
+
+    p1 = parsers.CifParser.write_p1(string)
+    arrays = parsers.CifParser.parse_arrays(string)
+    p1_arrays = parsers.CifParser.parse_arrays(p1)
+
+    assert len(p1) < len(string)
+    assert p1_arrays["labels"] == arrays["labels"]
+    np.testing.assert_allclose(p1_arrays["lengths"], arrays["lengths"])
+    np.testing.assert_allclose(p1_arrays["fractional_coordinates"], arrays["fractional_coordinates"], atol=1e-6)
+
+    # duplicate atoms of different sites (across the cell boundary) are merged
+    duplicate = (
+        "data_test\n_cell_length_a 10\n_cell_length_b 10\n_cell_length_c 10\n"
+        "_cell_angle_alpha 90\n_cell_angle_beta 90\n_cell_angle_gamma 90\n"
+        "loop_\n_atom_site_label\n_atom_site_fract_x\n_atom_site_fract_y\n_atom_site_fract_z\n"
+        "Cu1 0.0 0.5 0.5\nO1 0.2 0.5 0.5\nCu2 0.9999 0.5 0.5\n"
+    )
+    assert parsers.CifParser.parse_arrays(parsers.CifParser.write_p1(duplicate))["labels"] == ["Cu1", "O1"]
+    assert parsers.get_unique_atoms([[0.0, 0.0, 0.0], [0.5, 0.0, 0.0], [0.99, 0.0, 0.0]], np.eye(3) * 10, 0.2) == [0, 1]
@@ -0,0 +1,4 @@
+"""
+Tools for working with zeo++ calculations in bulk
+
+"""
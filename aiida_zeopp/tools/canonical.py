@@ -0,0 +1,120 @@
+"""Canonical input structures for content-based caching.
+
+AiiDA caching identifies calculations by the hashes of their input nodes.
+The hash of a CifData depends on the exact file content and file name, so the same framework submitted
+under a different file name or with different comments misses the cache.
+
+The calculation functions in this module convert the inputs to a canonical form that depends only on
+the cell, the species and the (rounded) fractional coordinates, resp. on the atomic radii.
+Using the canonical nodes as inputs of NetworkCalculation makes duplicate submissions hit the cache::
+
+    inputs.update(get_canonical_inputs(structure, atomic_radii))
+"""
+import io
+
+import numpy as np
+from aiida.engine import calcfunction
+from aiida.orm import Int
+from aiida.plugins import DataFactory
+
+from aiida_zeopp.parsers.structure import CifParser
+
+CifData = DataFactory("core.cif")  # pylint: disable=invalid-name
+SinglefileData = DataFactory("core.singlefile")  # pylint: disable=invalid-name
+
+CANONICAL_CIF_FILENAME = "structure.cif"
+CANONICAL_RADII_FILENAME = "radii.rad"
+DEFAULT_DECIMALS = 4
+
+
+def get_canonical_cif(string, decimals=DEFAULT_DECIMALS):
+    """Return canonical P1 CIF of a structure.
+
+    Cell parameters and fractional coordinates (wrapped into the unit cell) are rounded to the given
+    number of decimals, atoms are sorted by element and coordinates and labelled by element and index.
+    All other CIF data is dropped.
+
+    :param string: string in cif file format
+    :param decimals: number of decimals of cell parameters (Angstrom, degrees) and fractional coordinates
+    :returns: string in cif file format
+    """
+    # pylint: disable=too-many-locals
+    arrays = CifParser.parse_arrays(string)
+
+    lengths = np.round(arrays["lengths"], decimals) + 0.0
+    angles = np.round(arrays["angles"], decimals) + 0.0
+    # note: rounding may map 0.99999 to 1.0, which needs wrapping again. Adding 0.0 turns -0.0 into 0.0
+    coordinates = np.round(arrays["fractional_coordinates"] % 1.0, decimals) % 1.0 + 0.0
+    symbols = np.array(arrays["symbols"])
+
+    order = np.lexsort((coordinates[:, 2], coordinates[:, 1], coordinates[:, 0], symbols))
+
+    fmt = f".{decimals}f"
+    lines = [
+        "data_canonical",
+        f"_cell_length_a {lengths[0]:{fmt}}",
+        f"_cell_length_b {lengths[1]:{fmt}}",
+        f"_cell_length_c {lengths[2]:{fmt}}",
+        f"_cell_angle_alpha {angles[0]:{fmt}}",
+        f"_cell_angle_beta {angles[1]:{fmt}}",
+        f"_cell_angle_gamma {angles[2]:{fmt}}",
+        "_symmetry_space_group_name_H-M 'P 1'",
+        "_symmetry_Int_Tables_number 1",
+        "loop_",
+        "_symmetry_equiv_pos_as_xyz",
+        "x,y,z",
+        "loop_",
+        "_atom_site_label",
+        "_atom_site_type_symbol",
+        "_atom_site_fract_x",
+        "_atom_site_fract_y",
+        "_atom_site_fract_z",
+    ]
+    counts = {}
+    for index in order:
+        symbol = symbols[index]
+        counts[symbol] = counts.get(symbol, 0) + 1
+        x, y, z = coordinates[index]
+        lines.append(f"{symbol}{counts[symbol]} {symbol} {x:{fmt}} {y:{fmt}} {z:{fmt}}")
+
+    return "\n".join(lines) + "\n"
+
+
+def get_canonical_radii(string):
+    """Return canonical content of an atomic radii file.
+
+    Whitespace is normalized, empty lines are dropped and lines are sorted.
+
+    :param string: content of the atomic radii file
+    :returns: canonical content of the atomic radii file
+    """
+    lines = sorted(" ".join(line.split()) for line in string.splitlines() if line.strip())
+    return "\n".join(lines) + "\n"
+
+
+@calcfunction
+def canonicalize_cif(structure, decimals):
+    """Return canonical CifData of the input structure (see `get_canonical_cif`)."""
+    content = get_canonical_cif(structure.get_content(), decimals.value)
+    return CifData(file=io.BytesIO(content.encode("utf8")), filename=CANONICAL_CIF_FILENAME, parse_policy="lazy")
+
+
+@calcfunction
+def canonicalize_radii(atomic_radii):
+    """Return canonical atomic radii file (see `get_canonical_radii`)."""
+    content = get_canonical_radii(atomic_radii.get_content())
+    return SinglefileData(file=io.BytesIO(content.encode("utf8")), filename=CANONICAL_RADII_FILENAME)
+
+
+def get_canonical_inputs(structure, atomic_radii=None, decimals=DEFAULT_DECIMALS):
+    """Return canonical 'structure' and 'atomic_radii' inputs for NetworkCalculation.
+
+    :param structure: input structure (CifData)
+    :param atomic_radii: atomic radii file (optional)
+    :param decimals: number of decimals of cell parameters and fractional coordinates
+    :returns: dictionary of inputs
+    """
+    inputs = {"structure": canonicalize_cif(structure, Int(decimals))}
+    if atomic_radii is not None:
+        inputs["atomic_radii"] = canonicalize_radii(atomic_radii)
+    return inputs
@@ -0,0 +1,215 @@
+"""Prediction of runtime and memory of network calculations.
+
+Fixed wallclock limits either kill large jobs (e.g. leaving an empty .block file) or waste queue priority on small ones.
+The estimator fits a log-linear model to timings recorded with the ``measure_resources`` option
+(see NetworkCalculation) and predicts limits for new submissions::
+
+    estimator = ResourceEstimator.from_database()
+    inputs['metadata']['options'].update(estimator.get_options(structure, parameters))
+"""
+import math
+
+import numpy as np
+from aiida.orm import CalcJobNode, Data, Dict, QueryBuilder
+from aiida.plugins import DataFactory
+
+from aiida_zeopp.parsers.structure import (
+    CifParser,
+    cell_from_parameters,
+    get_cell,
+    get_structure_radii,
+)
+from aiida_zeopp.tools.reuse import HA_CHAINS
+
+NetworkParameters = DataFactory("zeopp.parameters")  # pylint: disable=invalid-name
+StructureData = DataFactory("core.structure")  # pylint: disable=invalid-name
+
+PROCESS_TYPE = "aiida.calculations:zeopp.network"
+
+# options with Monte Carlo samples per atom resp. per unit cell, with the index of the sample count in their value
+PER_ATOM_SAMPLES = {"sa": 2, "vsa": 2}
+PER_CELL_SAMPLES = {"vol": 2, "volpo": 2, "psd": 2, "ray_atom": 2, "block": 1}
+
+FEATURES = ("constant", "log_atoms", "log_volume", "log_samples", "ha_level")
+
+
+def get_structure_features(structure):
+    """Return number of atoms and cell vectors of an input structure.
+
+    :param structure: input structure (CifData or StructureData)
+    :returns: tuple (number of atoms, 3x3 array with cell vectors as rows)
+    """
+    if isinstance(structure, StructureData):
+        return len(structure.sites), get_cell(structure)
+    arrays = CifParser.parse_arrays(structure.get_content())
+    return len(arrays["symbols"]), cell_from_parameters(arrays["lengths"], arrays["angles"])
+
+
+def get_ha_level(value):
+    """Return accuracy level of a ha setting (0 for no ha, position in its chain of settings otherwise)."""
+    value = "DEF" if value is True else value
+    if value is False:
+        return 0
+    for chain in HA_CHAINS:
+        if value in chain:
+            return (chain.index(value) + 1) * 4 / len(chain)
+    # other settings (e.g. OCC) are treated like DEF
+    return 3
+
+
+def get_features(natoms, volume, parameters):
+    """Return feature vector of a calculation (see ``FEATURES``).
+
+    :param natoms: number of atoms in the unit cell
+    :param volume: cell volume (A^3)
+    :param parameters: NetworkParameters or dictionary (sample counts need to be resolved)
+    """
+    if isinstance(parameters, NetworkParameters):
+        parameters = parameters.get_dict()
+
+    samples = 0
+    for option, index in PER_ATOM_SAMPLES.items():
+        if parameters.get(option):
+            samples += natoms * int(parameters[option][index])
+    for option, index in PER_CELL_SAMPLES.items():
+        if parameters.get(option):
+            samples += int(parameters[option][index])
+
+    return np.array(
+        [1.0, math.log(natoms), math.log(volume), math.log1p(samples), get_ha_level(parameters.get("ha", False))]
+    )
+
+
+def get_calculation_features(structure, parameters, atomic_radii=None):
+    """Return feature vector of a calculation from its inputs (see `get_features`).
+
+    :param structure: input structure (CifData or StructureData)
+    :param parameters: NetworkParameters (sample densities are resolved for the structure)
+    :param atomic_radii: atomic radii file (optional)
+    """
+    natoms, cell = get_structure_features(structure)
+    if parameters.sample_densities:
+        parameters = parameters.resolve_sample_densities(cell, get_structure_radii(structure, atomic_radii))
+    return get_features(natoms, abs(np.linalg.det(cell)), parameters)
+
+
+class ResourceEstimator:
+    """Log-linear model of wallclock time and peak memory of network calculations.
+
+    ``log(y) = w . features``, fitted by least squares (with a small ridge term for stability).
+    The standard deviation of the residuals is used to give upper bounds.
+
+    :param ridge: ridge regularization parameter
+    """
+
+    def __init__(self, ridge=1e-6):
+        self.ridge = ridge
+        self.weights = {}
+        self.sigma = {}
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(targets={sorted(self.weights)})"
+
+    def fit(self, features, wallclock, memory=None):
+        """Fit the model to recorded calculations.
+
+        :param features: list of feature vectors (see `get_features`)
+        :param wallclock: list of wallclock times (seconds)
+        :param memory: list of peak memory (kB), entries may be None (optional, skipped if too few are recorded)
+        :returns: self
+        """
+        features = np.asarray(features, dtype=float)
+        targets = {"wallclock": wallclock, "memory": memory}
+
+        for name, values in targets.items():
+            if values is None:
+                continue
+            mask = np.array([value is not None and value > 0 for value in values])
+            if mask.sum() < len(FEATURES):
+                if name == "memory":
+                    # peak memory is not recorded everywhere (see NetworkCalculation)
+                    continue
+                raise ValueError(f"Need at least {len(FEATURES)} recorded calculations to fit {name}, got {mask.sum()}")
+
+            x = features[mask]
+            y = np.log(np.array([value for value, valid in zip(values, mask) if valid], dtype=float))
+            weights = np.linalg.solve(x.T @ x + self.ridge * np.eye(x.shape[1]), x.T @ y)
+            residuals = y - x @ weights
+            self.weights[name] = weights
+            self.sigma[name] = float(np.sqrt(np.mean(residuals**2)))
+
+        return self
+
+    def predict(self, structure, parameters, deviations=0.0, atomic_radii=None):
+        """Predict wallclock time and peak memory of a calculation.
+
+        :param structure: input structure (CifData or StructureData)
+        :param parameters: NetworkParameters
+        :param deviations: number of standard deviations of the residuals to add (in log space)
+        :param atomic_radii: atomic radii file (optional)
+        :returns: dictionary with 'wallclock_seconds' and 'memory_kb' (if fitted)
+        """
+        if not self.weights:
+            raise ValueError("The estimator needs to be fitted first")
+
+        features = get_calculation_features(structure, parameters, atomic_radii)
+
+        keys = {"wallclock": "wallclock_seconds", "memory": "memory_kb"}
+        return {
+            keys[name]: float(np.exp(features @ weights + deviations * self.sigma[name]))
+            for name, weights in self.weights.items()
+        }
+
+    def get_options(
+        self, structure, parameters, deviations=2.0, min_wallclock_seconds=60, atomic_radii=None
+    ):  # pylint: disable=too-many-arguments
+        """Return ``metadata.options`` with limits for a calculation.
+
+        :param structure: input structure (CifData or StructureData)
+        :param parameters: NetworkParameters
+        :param deviations: number of standard deviations of the residuals to add (2 covers ~98% of the calculations)
+        :param min_wallclock_seconds: lower bound of the wallclock limit
+        :param atomic_radii: atomic radii file (optional)
+        :returns: dictionary with 'max_wallclock_seconds' and, if fitted, 'max_memory_kb'
+        """
+        prediction = self.predict(structure, parameters, deviations=deviations, atomic_radii=atomic_radii)
+        options = {"max_wallclock_seconds": max(min_wallclock_seconds, math.ceil(prediction["wallclock_seconds"]))}
+        if "memory_kb" in prediction:
+            options["max_memory_kb"] = math.ceil(prediction["memory_kb"])
+        return options
+
+    @classmethod
+    def from_database(cls, limit=None, **kwargs):
+        """Fit estimator to successfully finished calculations that recorded their resources.
+
+        :param limit: maximum number of calculations (most recent first)
+        :param kwargs: passed to the constructor
+        """
+        qb = QueryBuilder()
+        qb.append(
+            CalcJobNode,
+            filters={"process_type": PROCESS_TYPE, "attributes.exit_status": 0},
+            tag="calc",
+            project="*",
+        )
+        qb.append(
+            Dict,
+            with_incoming="calc",
+            edge_filters={"label": "output_parameters"},
+            filters={"attributes": {"has_key": "Network_wallclock_seconds"}},
+            project=["attributes.Network_wallclock_seconds", "attributes.Network_peak_memory_kB"],
+        )
+        qb.append(Data, with_outgoing="calc", edge_filters={"label": "structure"}, project="*")
+        qb.append(NetworkParameters, with_outgoing="calc", edge_filters={"label": "parameters"}, project="*")
+        qb.order_by({"calc": {"ctime": "desc"}})
+        if limit is not None:
+            qb.limit(limit)
+
+        features, wallclock, memory = [], [], []
+        for calc, seconds, memory_kb, structure, parameters in qb.iterall():
+            atomic_radii = calc.inputs.atomic_radii if "atomic_radii" in calc.inputs else None
+            features.append(get_calculation_features(structure, parameters, atomic_radii))
+            wallclock.append(seconds)
+            memory.append(memory_kb)
+
+        return cls(**kwargs).fit(features, wallclock, memory)
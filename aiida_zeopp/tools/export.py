@@ -0,0 +1,268 @@
+"""Columnar export of results of zeo++ network calculations.
+
+Loading the output_parameters node of every calculation and calling ``get_dict()`` does not scale to screening
+studies with 100k structures. The export projects the requested keys straight from the database,
+pages through the calculations in batches of fixed size and writes one column per key
+to a NumPy ``.npz`` file (or a Parquet file, if pyarrow is installed), with memory usage bounded by the batch size::
+
+    stats = export_results("descriptors.npz", keys=["Largest_free_sphere", "ASA_m^2/g", "Input_sa"])
+    data = np.load("descriptors.npz")
+"""
+import json
+import os
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+from aiida.orm import CalcJobNode, Data, Dict, QueryBuilder
+
+PROCESS_TYPE = "aiida.calculations:zeopp.network"
+
+DEFAULT_KEYS = (
+    "Largest_included_sphere",
+    "Largest_free_sphere",
+    "ASA_m^2/g",
+    "AV_cm^3/g",
+    "POAV_cm^3/g",
+    "Density",
+)
+
+# columns identifying calculation and input structure of each row
+ID_COLUMNS = ("pk", "structure_uuid", "structure_label")
+
+PARQUET_SUFFIX = ".parquet"
+CHUNK_ROWS = 65536
+
+
+def is_text_column(name):
+    """Return True for columns exported as text (structure identifiers and ``Input_*`` parameters, JSON encoded).
+
+    All other columns are exported as float64, with NaN for missing values.
+    """
+    return name in ("structure_uuid", "structure_label") or name.startswith("Input_")
+
+
+def get_export_query(keys, filters=None, after=None):
+    """Return query projecting the given keys of the output parameters of finished network calculations.
+
+    Rows are ordered by the pk of the calculation and contain the pk, uuid and label of the input structure,
+    followed by the values of the keys (None, if missing).
+
+    :param keys: keys of the output parameters, e.g. ['Largest_free_sphere', 'Input_sa']
+    :param filters: additional filters on the calculation node
+    :param after: only return calculations with larger pk (for paging)
+    """
+    calc_filters = {"process_type": PROCESS_TYPE, "attributes.exit_status": 0}
+    calc_filters.update(filters or {})
+    if after is not None:
+        calc_filters["id"] = {">": after}
+
+    qb = QueryBuilder()
+    qb.append(CalcJobNode, filters=calc_filters, project="id", tag="calc")
+    qb.append(Data, with_outgoing="calc", edge_filters={"label": "structure"}, project=["uuid", "label"])
+    qb.append(
+        Dict,
+        with_incoming="calc",
+        edge_filters={"label": "output_parameters"},
+        project=[f"attributes.{key}" for key in keys],
+    )
+    qb.order_by({"calc": {"id": "asc"}})
+    return qb
+
+
+def iter_batches(keys, filters=None, batch_size=10000):
+    """Page through the results of finished network calculations.
+
+    Uses keyset pagination on the pk, such that every page costs the same independent of its position.
+
+    :param keys: keys of the output parameters
+    :param filters: additional filters on the calculation node
+    :param batch_size: number of rows per batch
+    :returns: generator of lists of rows (see `get_export_query`)
+    """
+    after = None
+    while True:
+        qb = get_export_query(keys, filters=filters, after=after)
+        qb.limit(batch_size)
+        rows = qb.all()
+        if not rows:
+            return
+        yield rows
+        after = rows[-1][0]  # pylint: disable=unsubscriptable-object
+
+
+def _to_float(name, value):
+    """Convert value of a numeric column to float (NaN for missing values)."""
+    if value is None:
+        return np.nan
+    if isinstance(value, (bool, int, float)):
+        return float(value)
+    raise ValueError(
+        f"Key {name!r} has non-numeric value {value!r}; only numeric results and Input_* parameters can be exported"
+    )
+
+
+def _to_text(value):
+    """Convert value of a text column to string (JSON for anything but strings, empty for missing values)."""
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+class NpzColumnWriter:
+    """Write columns batch by batch to a NumPy .npz file.
+
+    Columns are buffered in temporary files and written to the archive on `close`,
+    such that only one chunk of rows is held in memory at a time.
+
+    :param path: path of the .npz file
+    :param columns: names of the columns
+    """
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = list(columns)
+        self.rows = 0
+        self._buffers = {name: tempfile.TemporaryFile() for name in self.columns}
+        self._text_lengths = {name: 1 for name in self.columns if is_text_column(name)}
+
+    def write(self, columns):
+        """Append batch of rows.
+
+        :param columns: dictionary of lists of values by column name
+        """
+        for name in self.columns:
+            values = columns[name]
+            if name in self._text_lengths:
+                # one JSON string per line, such that newlines in the values are escaped
+                self._text_lengths[name] = max([self._text_lengths[name]] + [len(value) for value in values])
+                self._buffers[name].write("".join(f"{json.dumps(value)}\n" for value in values).encode("utf8"))
+            elif name == "pk":
+                self._buffers[name].write(np.asarray(values, dtype=np.int64).tobytes())
+            else:
+                self._buffers[name].write(np.asarray(values, dtype=np.float64).tobytes())
+        self.rows += len(columns[self.columns[0]])
+
+    def close(self):
+        """Write the buffered columns as .npy members of the archive."""
+        with zipfile.ZipFile(self.path, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for name in self.columns:
+                buffer = self._buffers[name]
+                buffer.seek(0)
+                if name in self._text_lengths:
+                    dtype = np.dtype(f"<U{self._text_lengths[name]}")
+                else:
+                    dtype = np.dtype(np.int64 if name == "pk" else np.float64)
+                header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (self.rows,)}
+
+                with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+                    np.lib.format.write_array_header_2_0(member, header)
+                    if name in self._text_lengths:
+                        lines = iter(buffer)
+                        while True:
+                            chunk = [json.loads(line) for _, line in zip(range(CHUNK_ROWS), lines)]
+                            if not chunk:
+                                break
+                            member.write(np.array(chunk, dtype=dtype).tobytes())
+                    else:
+                        while True:
+                            chunk = buffer.read(CHUNK_ROWS * dtype.itemsize)
+                            if not chunk:
+                                break
+                            member.write(chunk)
+                buffer.close()
+
+
+class ParquetColumnWriter:
+    """Write columns batch by batch to a Parquet file (one row group per batch, requires pyarrow).
+
+    :param path: path of the .parquet file
+    :param columns: names of the columns
+    """
+
+    def __init__(self, path, columns):
+        # pyarrow is an optional dependency, only import it when needed
+        # pylint: disable=import-outside-toplevel
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as exc:
+            raise ImportError("Writing Parquet files requires pyarrow, use a .npz file instead") from exc
+
+        self.columns = list(columns)
+        self.rows = 0
+
+        def get_type(name):
+            if is_text_column(name):
+                return pyarrow.string()
+            return pyarrow.int64() if name == "pk" else pyarrow.float64()
+
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema([(name, get_type(name)) for name in self.columns])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, columns):
+        """Append batch of rows as a row group.
+
+        :param columns: dictionary of lists of values by column name
+        """
+        self._writer.write_table(self._pyarrow.table(columns, schema=self._schema))
+        self.rows += len(columns[self.columns[0]])
+
+    def close(self):
+        """Close the Parquet file."""
+        self._writer.close()
+
+
+def export_results(path, keys=DEFAULT_KEYS, filters=None, batch_size=10000, echo=None):
+    """Export results of finished network calculations to a columnar file.
+
+    Columns are the pk of the calculation, uuid and label of the input structure and the given keys of the output
+    parameters. Results are exported as float64 (NaN, if missing), ``Input_*`` parameters as JSON-encoded text.
+
+    :param path: path of the output file; '.parquet' files are written with pyarrow, all others in .npz format
+    :param keys: keys of the output parameters, e.g. ['Largest_free_sphere', 'ASA_m^2/g', 'Input_sa']
+    :param filters: additional filters on the calculation node
+    :param batch_size: number of rows queried and written per batch
+    :param echo: optional callable for progress reports
+    :returns: dictionary with statistics (number of rows, elapsed time, rows per second)
+    """
+    keys = list(keys)
+    columns = list(ID_COLUMNS) + keys
+    if len(set(columns)) != len(columns):
+        raise ValueError(f"Duplicate columns in {columns}")
+
+    if str(path).endswith(PARQUET_SUFFIX):
+        writer = ParquetColumnWriter(path, columns)
+    else:
+        writer = NpzColumnWriter(path, columns)
+
+    start = time.perf_counter()
+    try:
+        for rows in iter_batches(keys, filters=filters, batch_size=batch_size):
+            batch = {}
+            for name, values in zip(columns, zip(*rows)):
+                if name == "pk":
+                    batch[name] = list(values)
+                elif is_text_column(name):
+                    batch[name] = [_to_text(value) for value in values]
+                else:
+                    batch[name] = [_to_float(name, value) for value in values]
+            writer.write(batch)
+
+            if echo is not None:
+                elapsed = time.perf_counter() - start
+                echo(f"{writer.rows} rows exported ({writer.rows / elapsed:.1f} rows/s)")
+        writer.close()
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": writer.rows,
+        "time": elapsed,
+        "rows_per_second": writer.rows / elapsed if elapsed > 0 else 0.0,
+    }
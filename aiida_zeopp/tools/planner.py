@@ -0,0 +1,150 @@
+"""Planning of network invocations.
+
+Every invocation of the network binary rebuilds the Voronoi decomposition of the structure.
+Analyses requested for the same structure, atomic radii and modifier options (e.g. ``ha``) can share one
+invocation, since a single command line can contain several output options.
+"""
+from aiida.plugins import DataFactory
+
+from aiida_zeopp.data.parameters import (
+    MODIFIER_OPTIONS,
+    OUTPUT_REGISTRY,
+    get_output_parser,
+)
+from aiida_zeopp.parsers.raw import get_output_file_names, open_output_file
+
+NetworkParameters = DataFactory("zeopp.parameters")  # pylint: disable=invalid-name
+
+
+class PlannedRun:
+    """One invocation of the network binary, serving one or more requested analyses.
+
+    :param structure: input structure
+    :param atomic_radii: atomic radii file (None, if not specified)
+    :param modifiers: dictionary of modifier options shared by all analyses of the run
+    """
+
+    def __init__(self, structure, atomic_radii, modifiers):
+        self.structure = structure
+        self.atomic_radii = atomic_radii
+        self.modifiers = modifiers
+        self.outputs = {}
+        self.analyses = []
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.structure!r}, outputs={sorted(self.outputs)})"
+
+    @property
+    def parameters(self):
+        """Return merged parameters dictionary of the run."""
+        return dict(self.modifiers, **self.outputs)
+
+    def conflicts(self, outputs):
+        """Return True, if the output options conflict with the ones already planned for this run.
+
+        :param outputs: dictionary of output options
+        """
+        return any(option in self.outputs and self.outputs[option] != value for option, value in outputs.items())
+
+    def get_inputs(self):
+        """Return inputs of NetworkCalculation for this run (apart from code and metadata)."""
+        inputs = {
+            "parameters": NetworkParameters(dict=self.parameters),
+            "structure": self.structure,
+        }
+        if self.atomic_radii is not None:
+            inputs["atomic_radii"] = self.atomic_radii
+        return inputs
+
+
+def _split_parameters(parameters):
+    """Split parameters into modifier options and output options.
+
+    Modifier options that are not specified or False are dropped, since this is the default of network.
+
+    :param parameters: NetworkParameters or dictionary of parameters
+    :returns: tuple ``(modifiers, outputs)`` of dictionaries
+    """
+    if isinstance(parameters, NetworkParameters):
+        parameters = parameters.get_dict()
+    else:
+        parameters = NetworkParameters.validate(parameters)
+
+    modifiers = {k: v for k, v in parameters.items() if k in MODIFIER_OPTIONS and v is not False}
+    outputs = {k: v for k, v in parameters.items() if k in OUTPUT_REGISTRY and v is not False}
+    return modifiers, outputs
+
+
+def plan_runs(analyses):
+    """Merge requested analyses into the fewest invocations of the network binary.
+
+    Analyses can share an invocation, if they concern the same structure, atomic radii file and modifier options
+    (``ha``, ``nor``, ...).
+    Identical output options are computed only once, while the same output option with different values
+    (e.g. ``sa`` with different probe radii) requires separate invocations.
+
+    :param analyses: list of requested analyses, each a dictionary with keys 'structure', 'parameters'
+        (NetworkParameters or dictionary) and, optionally, 'atomic_radii'
+    :returns: list of PlannedRun; ``run.analyses`` holds the indices of the analyses served by the run
+    """
+    groups = {}
+    for index, analysis in enumerate(analyses):
+        structure = analysis["structure"]
+        atomic_radii = analysis.get("atomic_radii")
+        modifiers, outputs = _split_parameters(analysis["parameters"])
+
+        key = (
+            structure.uuid,
+            atomic_radii.uuid if atomic_radii is not None else None,
+            tuple(sorted((k, str(v)) for k, v in modifiers.items())),
+        )
+        runs = groups.setdefault(key, [])
+
+        for run in runs:
+            if not run.conflicts(outputs):
+                break
+        else:
+            run = PlannedRun(structure, atomic_radii, modifiers)
+            runs.append(run)
+
+        run.outputs.update(outputs)
+        run.analyses.append(index)
+
+    return [run for runs in groups.values() for run in runs]
+
+
+def split_results(calculation, parameters):
+    """Extract the results of one requested analysis from a calculation of a merged run.
+
+    Only the output files of the output options of the analysis are parsed (compressed files are decompressed
+    on the fly). As for NetworkParser, the parameters of the analysis are added as ``Input_<option>``.
+
+    :param calculation: finished NetworkCalculation node of a PlannedRun
+    :param parameters: NetworkParameters or dictionary of parameters of the requested analysis
+    :returns: dictionary of parsed results of the analysis
+    :raises ValueError: if an output file to parse was not kept in the retrieved folder (see the output_policy option)
+    """
+    modifiers, outputs = _split_parameters(parameters)
+    merged = calculation.inputs.parameters
+    output_dict = merged.output_dict
+    retrieved = calculation.outputs.retrieved
+    available = get_output_file_names(retrieved.base.repository.list_object_names())
+
+    results = {}
+    for option in outputs:
+        parser = get_output_parser(option)
+        if parser is None:
+            continue
+        for fname in output_dict[option]:
+            if fname not in available:
+                raise ValueError(
+                    f"Output file {fname} of option {option} was not kept in the retrieved folder of {calculation}"
+                )
+            with open_output_file(retrieved, fname) as handle:
+                results.update(parser.parse(handle.read().decode("utf8")))
+
+    results["Input_structure_filename"] = merged.get_structure_file_name(calculation.inputs.structure)
+    for k, val in dict(modifiers, **outputs).items():
+        results[f"Input_{k}"] = val
+
+    return results
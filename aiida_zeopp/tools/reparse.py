@@ -0,0 +1,168 @@
+"""Offline re-parsing of finished zeo++ network calculations."""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from aiida.manage import get_manager
+from aiida.orm import CalcJobNode, FolderData, QueryBuilder
+from aiida.plugins import DataFactory
+
+from aiida_zeopp.parsers.raw import open_output_file
+
+NetworkParameters = DataFactory("zeopp.parameters")  # pylint: disable=invalid-name
+
+PROCESS_TYPE = "aiida.calculations:zeopp.network"
+DEFAULT_EXTRAS_KEY = "reparsed_output_parameters"
+
+
+def get_calculations_query(filters=None):
+    """Return query for successfully finished zeo++ network calculations.
+
+    :param filters: additional filters on the calculation node
+    :returns: QueryBuilder projecting the calculation pks
+    """
+    calc_filters = {
+        "process_type": PROCESS_TYPE,
+        "attributes.process_state": "finished",
+        "attributes.exit_status": 0,
+    }
+    calc_filters.update(filters or {})
+
+    qb = QueryBuilder()
+    qb.append(CalcJobNode, filters=calc_filters, project="id")
+    return qb
+
+
+def parse_files(job):
+    """Parse the contents of the retrieved files of one calculation.
+
+    Runs in the worker processes, it must not access the database.
+
+    :param job: tuple ``(pk, [(parser, content), ...])``
+    :returns: tuple ``(pk, results, error)``, where ``results`` is the dictionary of parsed values
+        (``None`` on failure) and ``error`` is the error message (``None`` on success).
+    """
+    pk, files = job
+    results = {}
+    for parser, content in files:
+        try:
+            results.update(parser.parse(content))
+        except ValueError as exc:
+            return pk, None, f"{parser.__name__}: {exc}"
+
+    return pk, results, None
+
+
+def _read_jobs(pks, options=None):
+    """Read retrieved files of the given calculations.
+
+    :param pks: list of calculation pks
+    :param options: zeo++ options to re-parse (defaults to all options with a parser)
+    :returns: list of jobs accepted by `parse_files`
+    """
+    qb = QueryBuilder()
+    qb.append(CalcJobNode, filters={"id": {"in": pks}}, project="id", tag="calc")
+    qb.append(NetworkParameters, with_outgoing="calc", edge_filters={"label": "parameters"}, project="*")
+    qb.append(FolderData, with_incoming="calc", edge_filters={"label": "retrieved"}, project="*")
+
+    jobs = []
+    for pk, parameters, retrieved in qb.iterall():
+        files = []
+        output_options = [option for option, files in parameters.output_dict.items() for _fname in files]
+        for option, fname, parser in zip(output_options, parameters.output_files, parameters.output_parsers):
+            if parser is None or (options and option not in options):
+                continue
+            try:
+                with open_output_file(retrieved, fname) as handle:
+                    files.append((parser, handle.read().decode("utf8")))
+            except FileNotFoundError:
+                # output files that were not kept (see the output_policy option) cannot be re-parsed
+                continue
+        jobs.append((pk, files))
+
+    return jobs
+
+
+def _write_results(results, extras_key):
+    """Store parsed results as extras of the calculations, in one transaction."""
+    storage = get_manager().get_profile_storage()
+    query = QueryBuilder().append(CalcJobNode, filters={"id": {"in": list(results)}})
+    nodes = [node for (node,) in query.iterall()]
+    with storage.transaction():
+        for node in nodes:
+            node.base.extras.set(extras_key, results[node.pk])
+
+
+def reparse_calculations(
+    query=None, options=None, max_workers=None, batch_size=1000, extras_key=DEFAULT_EXTRAS_KEY, dry_run=False, echo=None
+):  # pylint: disable=too-many-arguments,too-many-locals,too-many-branches
+    """Re-parse retrieved files of finished zeo++ network calculations with a process pool.
+
+    Retrieved files are read in the main process, parsed by the `aiida_zeopp.parsers.plain` parsers in a pool of
+    worker processes and the results are written in bulk to the extras of the calculations.
+
+    :param query: QueryBuilder whose first projection are the pks of the calculations
+        (defaults to all successfully finished zeo++ network calculations, see `get_calculations_query`)
+    :param options: list of zeo++ options to re-parse, e.g. ``['sa', 'volpo']`` (defaults to all options with a parser)
+    :param max_workers: number of worker processes (defaults to the number of CPUs). Use 0 to parse in this process.
+    :param batch_size: number of calculations read, parsed and written per batch
+    :param extras_key: extras key under which the parsed dictionary is stored
+    :param dry_run: if True, parse but do not store the results
+    :param echo: optional callable for progress reports
+    :returns: dictionary with statistics (number of calculations, files and failures, elapsed time, files per second)
+    """
+    if query is None:
+        query = get_calculations_query()
+    pks = [row[0] for row in query.iterall()]
+
+    stats = {"calculations": 0, "files": 0, "failed": 0}
+    failures = {}
+    start = time.perf_counter()
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    executor = None
+    if max_workers > 0:
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    try:
+        for index in range(0, len(pks), batch_size):
+            jobs = _read_jobs(pks[index : index + batch_size], options=options)
+
+            if executor is None:
+                parsed = map(parse_files, jobs)
+            else:
+                chunksize = max(1, len(jobs) // (4 * max_workers))
+                parsed = executor.map(parse_files, jobs, chunksize=chunksize)
+
+            results = {}
+            for pk, result, error in parsed:
+                if error is None:
+                    results[pk] = result
+                else:
+                    failures[pk] = error
+
+            if results and not dry_run:
+                _write_results(results, extras_key)
+
+            stats["calculations"] += len(jobs)
+            stats["files"] += sum(len(files) for _pk, files in jobs)
+            stats["failed"] = len(failures)
+
+            if echo is not None:
+                elapsed = time.perf_counter() - start
+                echo(
+                    f"{stats['calculations']}/{len(pks)} calculations, {stats['files']} files parsed "
+                    f"({stats['files'] / elapsed:.1f} files/s)"
+                )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    stats["time"] = time.perf_counter() - start
+    stats["files_per_second"] = stats["files"] / stats["time"] if stats["time"] > 0 else 0.0
+    stats["failures"] = failures
+
+    return stats
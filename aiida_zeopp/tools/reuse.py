@@ -0,0 +1,231 @@
+"""Reuse of results of at least equally accurate calculations.
+
+A result computed with more Monte Carlo samples or a more accurate high-accuracy (``ha``) setting satisfies any
+request for the same analysis with fewer samples or a less accurate setting.
+Exact-hash caching does not know about this ordering, so these requests would run again.
+"""
+from datetime import datetime
+
+from aiida.engine import submit
+from aiida.orm import CalcJobNode, Data, QueryBuilder
+from aiida.plugins import DataFactory
+
+from aiida_zeopp.data.parameters import MODIFIER_OPTIONS, OUTPUT_REGISTRY
+
+NetworkParameters = DataFactory("zeopp.parameters")  # pylint: disable=invalid-name
+
+PROCESS_TYPE = "aiida.calculations:zeopp.network"
+REUSE_EXTRAS_KEY = "reused_for"
+
+# Options with Monte Carlo sampling: [channel radius, probe radius, number of samples]
+SAMPLED_OPTIONS = ("sa", "vol", "volpo", "psd")
+
+# Chains of ha settings in order of increasing accuracy.
+# Settings from different chains (e.g. polyhedra vs. point spheres) are not comparable.
+HA_CHAINS = (
+    ("LOW", "MED", "DEF", "HI"),
+    ("S4", "S10", "S20", "S30", "S40", "S50", "S100", "S500", "S1000", "S10000"),
+)
+
+# Metadata options of NetworkCalculation that change its outputs, with their defaults.
+# Calculations are only reused for requests with identical values of these options.
+OUTPUT_OPTION_DEFAULTS = {
+    "psd_as_array": False,
+    "parse_cssr": False,
+    "block_as_array": False,
+    "raw_as_array": False,
+    "raw_text": "keep",
+    "point_cloud": False,
+    "measure_resources": False,
+    "compress_outputs": [],
+    "output_policy": {},
+}
+
+
+def get_output_options(options):
+    """Return the metadata options that change the outputs of a calculation, with defaults filled in.
+
+    Equivalent values are normalized, e.g. the order of ``compress_outputs`` and ``'keep'`` entries of
+    ``output_policy`` do not matter.
+
+    :param options: metadata options (dictionary, options that are None or missing take their default)
+    """
+    options = options or {}
+    output_options = {}
+    for name, default in OUTPUT_OPTION_DEFAULTS.items():
+        value = options.get(name)
+        output_options[name] = default if value is None else value
+
+    output_options["compress_outputs"] = sorted(output_options["compress_outputs"])
+    output_options["output_policy"] = {k: v for k, v in output_options["output_policy"].items() if v != "keep"}
+    return output_options
+
+
+def ha_dominates(available, requested):
+    """Return True, if the ha setting ``available`` is at least as accurate as ``requested``.
+
+    Any ha setting is at least as accurate as none (False).
+    ``ha: True`` is equivalent to ``ha: DEF``.
+
+    :param available: ha setting of the existing calculation
+    :param requested: requested ha setting
+    """
+    available = "DEF" if available is True else available
+    requested = "DEF" if requested is True else requested
+
+    if requested is False or available == requested:
+        return True
+    if available is False:
+        return False
+
+    for chain in HA_CHAINS:
+        if available in chain and requested in chain:
+            return chain.index(available) >= chain.index(requested)
+    return False
+
+
+def samples_dominate(available, requested):
+    """Return True, if the value ``available`` of a sampled option is at least as accurate as ``requested``.
+
+    Radii need to be identical and the number of samples at least as large.
+    Sample densities (see NetworkParameters) are only comparable with identical densities.
+
+    :param available: value of the option of the existing calculation, e.g. [1.82, 1.82, 5000]
+    :param requested: requested value of the option
+    """
+    *available_radii, available_samples = available
+    *radii, samples = requested
+    if isinstance(samples, str) or isinstance(available_samples, str):
+        return available == requested
+    return available_radii == radii and available_samples >= samples
+
+
+def _normalize(parameters):
+    """Return parameters dictionary without options that are False (the default of network)."""
+    if isinstance(parameters, NetworkParameters):
+        parameters = parameters.get_dict()
+    return {k: v for k, v in parameters.items() if v is not False}
+
+
+def dominates(available, requested):
+    """Return True, if results of a calculation with ``available`` parameters satisfy the ``requested`` parameters.
+
+    Requirements:
+     * all requested output options are present, with identical values, except for the number of samples of
+       sampled options (``sa``, ``vol``, ``volpo``, ``psd``), which may be larger
+     * the ha setting is at least as accurate (see `ha_dominates`)
+     * all other modifier options are identical
+
+    :param available: parameters of the existing calculation (NetworkParameters or dictionary)
+    :param requested: requested parameters (NetworkParameters or dictionary)
+    """
+    available = _normalize(available)
+    requested = _normalize(requested)
+
+    if not ha_dominates(available.get("ha", False), requested.get("ha", False)):
+        return False
+
+    for option in MODIFIER_OPTIONS:
+        if option != "ha" and available.get(option) != requested.get(option):
+            return False
+
+    for option, value in requested.items():
+        if option not in OUTPUT_REGISTRY:
+            continue
+        if option not in available:
+            return False
+        if option in SAMPLED_OPTIONS:
+            if not samples_dominate(available[option], value):
+                return False
+        elif available[option] != value:
+            return False
+
+    return True
+
+
+def find_dominating_calculation(structure, parameters, atomic_radii=None, options=None):
+    """Find a successfully finished calculation whose results satisfy the request.
+
+    Structures and atomic radii files are matched by hash, i.e. by content
+    (see `aiida_zeopp.tools.canonical` for matching structures irrespective of cosmetic differences).
+    The metadata options that change the outputs (see `OUTPUT_OPTION_DEFAULTS`) need to be identical.
+
+    :param structure: input structure (stored)
+    :param parameters: requested parameters (NetworkParameters or dictionary)
+    :param atomic_radii: atomic radii file (stored, optional)
+    :param options: requested metadata options (optional)
+    :returns: CalcJobNode or None, if no calculation satisfies the request
+    """
+    for node in (structure, atomic_radii):
+        if node is not None and not node.is_stored:
+            raise ValueError(f"Input node {node} needs to be stored in order to compute its hash.")
+
+    qb = QueryBuilder()
+    qb.append(
+        CalcJobNode,
+        filters={"process_type": PROCESS_TYPE, "attributes.exit_status": 0},
+        project="*",
+        tag="calc",
+    )
+    qb.append(
+        Data,
+        with_outgoing="calc",
+        edge_filters={"label": "structure"},
+        filters={"extras._aiida_hash": structure.base.caching.get_hash()},
+    )
+    qb.append(NetworkParameters, with_outgoing="calc", edge_filters={"label": "parameters"}, project="*")
+    qb.order_by({"calc": {"ctime": "desc"}})
+
+    radii_hash = atomic_radii.base.caching.get_hash() if atomic_radii is not None else None
+    output_options = get_output_options(options)
+
+    for calculation, available in qb.iterall():
+        if not dominates(available, parameters):
+            continue
+        calc_options = {name: calculation.get_option(name) for name in OUTPUT_OPTION_DEFAULTS}
+        if get_output_options(calc_options) != output_options:
+            continue
+        calc_radii = calculation.base.links.get_incoming(link_label_filter="atomic_radii").all_nodes()
+        calc_radii_hash = calc_radii[0].base.caching.get_hash() if calc_radii else None
+        if calc_radii_hash == radii_hash:
+            return calculation
+
+    return None
+
+
+def submit_or_reuse(inputs):
+    """Submit NetworkCalculation, unless an at least equally accurate calculation exists.
+
+    If a calculation is reused, the request is recorded in its extras (key ``reused_for``).
+
+    :param inputs: inputs of NetworkCalculation
+    :returns: the reused calculation node or the node of the submitted calculation
+    """
+    parameters = inputs["parameters"]
+    # inputs are stored on submission anyway
+    for node in (inputs["structure"], inputs.get("atomic_radii")):
+        if node is not None and not node.is_stored:
+            node.store()
+    calculation = find_dominating_calculation(
+        inputs["structure"],
+        parameters,
+        inputs.get("atomic_radii"),
+        options=inputs.get("metadata", {}).get("options"),
+    )
+
+    if calculation is None:
+        # pylint: disable=import-outside-toplevel
+        from aiida_zeopp.calculations.network import NetworkCalculation
+
+        return submit(NetworkCalculation, **inputs)
+
+    requests = calculation.base.extras.get(REUSE_EXTRAS_KEY, [])
+    requests.append(
+        {
+            "parameters": _normalize(parameters),
+            "structure": inputs["structure"].uuid,
+            "time": datetime.now().isoformat(),
+        }
+    )
+    calculation.base.extras.set(REUSE_EXTRAS_KEY, requests)
+    return calculation
@@ -0,0 +1,50 @@
+"""Tests for canonical input structures."""
+import io
+import os
+
+from aiida.plugins import DataFactory
+
+from aiida_zeopp.tests import TEST_DIR
+from aiida_zeopp.tools.canonical import get_canonical_cif, get_canonical_inputs
+
+CifData = DataFactory("core.cif")
+SinglefileData = DataFactory("core.singlefile")
+
+
+def get_variant(string):
+    """Return cosmetic variant of MgO.cif: other comments, atom order and periodic images."""
+    head, atoms = string.split("_atom_site_fract_z\n")
+    lines = atoms.strip().splitlines()
+    label, symbol, x, y, z = lines[0].split()
+    lines[0] = f"{label} {symbol} {float(x) + 1.0} {y} {z}"
+    return "# another comment\n" + head + "_atom_site_fract_z\n" + "\n".join(reversed(lines)) + "\n"
+
+
+def test_canonical_cif():
+    with open(os.path.join(TEST_DIR, "MgO.cif"), encoding="utf8") as handle:
+        string = handle.read()
+
+    canonical = get_canonical_cif(string)
+    assert canonical == get_canonical_cif(get_variant(string))
+    assert "Mg1 Mg 0.0000 0.0000 0.0000" in canonical
+    assert canonical != get_canonical_cif(string.replace("4.8982", "4.8983"))
+
+
+def test_canonical_inputs(aiida_localhost):  # pylint: disable=unused-argument
+    """Test that cosmetic variants of the inputs give canonical nodes with the same hash."""
+    with open(os.path.join(TEST_DIR, "MgO.cif"), encoding="utf8") as handle:
+        string = handle.read()
+    with open(os.path.join(TEST_DIR, "MgO.rad"), encoding="utf8") as handle:
+        radii = handle.read()
+
+    inputs = get_canonical_inputs(
+        CifData(file=io.BytesIO(string.encode("utf8")), filename="MgO.cif"),
+        SinglefileData(file=io.BytesIO(radii.encode("utf8")), filename="MgO.rad"),
+    )
+    variant = get_canonical_inputs(
+        CifData(file=io.BytesIO(get_variant(string).encode("utf8")), filename="mgo_relaxed.cif"),
+        SinglefileData(file=io.BytesIO(("\n".join(reversed(radii.splitlines())) + "\n").encode("utf8")), filename="r"),
+    )
+
+    for key in ("structure", "atomic_radii"):
+        assert inputs[key].base.caching.get_hash() == variant[key].base.caching.get_hash()
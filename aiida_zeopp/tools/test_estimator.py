@@ -0,0 +1,94 @@
+"""Tests for the runtime and memory estimator."""
+import math
+import os
+
+import numpy as np
+import pytest
+from aiida.plugins import DataFactory
+
+from aiida_zeopp.tests import TEST_DIR
+from aiida_zeopp.tools.estimator import (
+    ResourceEstimator,
+    get_calculation_features,
+    get_features,
+    get_ha_level,
+)
+
+NetworkParameters = DataFactory("zeopp.parameters")
+CifData = DataFactory("core.cif")
+
+
+def test_get_features():
+    """Test features of calculations."""
+    assert get_ha_level(False) == 0
+    assert get_ha_level(True) == get_ha_level("DEF")
+    assert get_ha_level("LOW") < get_ha_level("DEF") < get_ha_level("HI")
+
+    features = get_features(100, 1000.0, {"sa": [1.82, 1.82, 10], "vol": [1.82, 1.82, 1000]})
+    assert features[3] == pytest.approx(math.log1p(100 * 10 + 1000))
+    assert features[4] == 0
+
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy")
+    density = get_calculation_features(structure, NetworkParameters(dict={"vol": [1.82, 1.82, "0.5/A^3"]}))
+    samples = math.ceil(0.5 * np.exp(density[2]))
+    assert density == pytest.approx(
+        get_calculation_features(structure, NetworkParameters(dict={"vol": [1.82, 1.82, samples]}))
+    )
+
+
+def test_fit():
+    """Test fitting the model to synthetic timings."""
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy")
+    parameters = NetworkParameters(dict={"ha": "DEF", "sa": [1.82, 1.82, 2000]})
+
+    rng = np.random.default_rng(42)
+    weights = np.array([-8.0, 0.5, 0.2, 1.0, 0.3])
+    features = [
+        get_features(n, v, {"ha": ha, "sa": [1.82, 1.82, s]})
+        for n, v, ha, s in zip(
+            rng.integers(10, 1000, 20),
+            rng.uniform(100, 10000, 20),
+            rng.choice(["LOW", "DEF", "HI"], 20),
+            rng.integers(100, 5000, 20),
+        )
+    ]
+    wallclock = [float(np.exp(f @ weights)) for f in features]
+
+    with pytest.raises(ValueError):
+        ResourceEstimator().predict(structure, parameters)
+    with pytest.raises(ValueError):
+        ResourceEstimator().fit(features[:3], wallclock[:3])
+
+    # peak memory not recorded: only wallclock is fitted
+    estimator = ResourceEstimator().fit(features, wallclock, [None] * len(wallclock))
+    prediction = estimator.predict(structure, parameters)
+    expected = np.exp(get_calculation_features(structure, parameters) @ weights)
+    assert prediction == {"wallclock_seconds": pytest.approx(expected, rel=1e-3)}
+
+    options = estimator.get_options(structure, parameters, deviations=0, min_wallclock_seconds=1)
+    assert options == {"max_wallclock_seconds": math.ceil(prediction["wallclock_seconds"])}
+    options = estimator.get_options(structure, parameters, min_wallclock_seconds=1e6)
+    assert options["max_wallclock_seconds"] == 1e6
+
+    estimator = ResourceEstimator().fit(features, wallclock, [1000.0 * w for w in wallclock])
+    options = estimator.get_options(structure, parameters, deviations=0)
+    assert options["max_memory_kb"] == pytest.approx(1000 * expected, rel=1e-3)
+
+
+def test_from_database(finished_calculation):
+    """Test fitting the model to recorded calculations."""
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy").store()
+
+    for index, samples in enumerate([100, 200, 500, 1000, 2000, 5000]):
+        finished_calculation(
+            inputs={
+                "parameters": NetworkParameters(dict={"ha": "DEF", "sa": [1.82, 1.82, samples]}),
+                "structure": structure,
+            },
+            results={"Network_wallclock_seconds": 0.001 * samples * (1 + 0.01 * index), "Network_peak_memory_kB": None},
+        )
+
+    estimator = ResourceEstimator.from_database()
+    assert list(estimator.weights) == ["wallclock"]
+    prediction = estimator.predict(structure, NetworkParameters(dict={"ha": "DEF", "sa": [1.82, 1.82, 1000]}))
+    assert prediction["wallclock_seconds"] == pytest.approx(1.0, rel=0.1)
@@ -0,0 +1,60 @@
+"""Tests for the columnar export of results."""
+import os
+
+import numpy as np
+import pytest
+from aiida.plugins import DataFactory
+
+from aiida_zeopp.tests import TEST_DIR
+from aiida_zeopp.tools.export import export_results
+
+CifData = DataFactory("core.cif")
+
+
+def test_export_results(finished_calculation, tmp_path):
+    """Test exporting results in batches to a .npz file."""
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy")
+    structure.label = "HKUST-1"
+    structure.store()
+
+    nodes = [
+        finished_calculation(
+            inputs={"structure": structure},
+            results={
+                "Largest_free_sphere": 6.0 + index,
+                "ASA_m^2/g": 1000.0 * index,
+                "Input_sa": [1.2, 1.2, 100 * index],
+            },
+        )
+        for index in range(5)
+    ]
+    nodes.append(
+        finished_calculation(
+            inputs={"structure": structure},
+            results={"Input_structure_filename": "HKUST-1.cif", "Channels": {"Dimensionalities": [3]}},
+        )
+    )
+    finished_calculation(inputs={"structure": structure}, results={"Largest_free_sphere": 1.0}, exit_status=1)
+
+    keys = ["Largest_free_sphere", "ASA_m^2/g", "Input_sa", "Input_structure_filename"]
+    reports = []
+    stats = export_results(tmp_path / "results.npz", keys=keys, batch_size=2, echo=reports.append)
+    assert stats["rows"] == 6
+    assert len(reports) == 3
+
+    data = np.load(tmp_path / "results.npz")
+    assert sorted(data.files) == sorted(["pk", "structure_uuid", "structure_label"] + keys)
+    assert list(data["pk"]) == [node.pk for node in nodes]
+    assert list(data["structure_label"]) == ["HKUST-1"] * 6
+    assert data["structure_uuid"][0] == structure.uuid
+    assert list(data["Largest_free_sphere"][:5]) == [6.0, 7.0, 8.0, 9.0, 10.0]
+    assert np.isnan(data["ASA_m^2/g"][5])
+    assert data["Input_sa"][2] == "[1.2, 1.2, 200]"
+    assert list(data["Input_structure_filename"]) == [""] * 5 + ["HKUST-1.cif"]
+
+    with pytest.raises(ValueError):
+        export_results(tmp_path / "invalid.npz", keys=["Input_sa", "Input_sa"])
+    with pytest.raises(ValueError):
+        # non-numeric results are only exported for Input_* parameters
+        export_results(tmp_path / "invalid.npz", keys=["Channels"], batch_size=2)
+    assert not os.path.exists(tmp_path / "invalid.npz")
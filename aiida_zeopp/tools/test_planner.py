@@ -0,0 +1,87 @@
+"""Tests for the planner of network invocations."""
+import gzip
+import os
+
+import pytest
+from aiida.plugins import DataFactory
+
+from aiida_zeopp.tests import TEST_DIR
+from aiida_zeopp.tools.planner import plan_runs, split_results
+
+NetworkParameters = DataFactory("zeopp.parameters")
+CifData = DataFactory("core.cif")
+
+
+def test_plan_runs():
+    """Test merging compatible analyses into the same run."""
+    hkust1 = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy")
+    mgo = CifData(file=os.path.join(TEST_DIR, "MgO.cif"), parse_policy="lazy")
+
+    analyses = [
+        {"structure": hkust1, "parameters": {"ha": "DEF", "res": True}},
+        {"structure": hkust1, "parameters": NetworkParameters(dict={"ha": "DEF", "sa": [1.82, 1.82, 1000]})},
+        {"structure": hkust1, "parameters": {"ha": "DEF", "chan": 1.2, "res": True}},
+        # conflicting value of sa
+        {"structure": hkust1, "parameters": {"ha": "DEF", "sa": [1.2, 1.2, 1000]}},
+        # different modifier
+        {"structure": hkust1, "parameters": {"res": True}},
+        # different structure
+        {"structure": mgo, "parameters": {"ha": "DEF", "res": True, "nor": False}},
+    ]
+
+    runs = plan_runs(analyses)
+
+    assert [run.analyses for run in runs] == [[0, 1, 2], [3], [4], [5]]
+    assert runs[0].parameters == {"ha": "DEF", "res": True, "sa": [1.82, 1.82, 1000], "chan": 1.2}
+    assert runs[2].parameters == {"res": True}
+    assert runs[3].get_inputs()["structure"] is mgo
+
+
+def test_split_results(finished_calculation):
+    """Test extracting the results of one analysis from a merged run."""
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy")
+    (run,) = plan_runs(
+        [
+            {"structure": structure, "parameters": {"sa": [1.82, 1.82, 1000]}},
+            {"structure": structure, "parameters": {"volpo": [1.82, 1.82, 1000]}},
+        ]
+    )
+
+    node = finished_calculation(
+        inputs=run.get_inputs(),
+        retrieved={
+            "out.sa": os.path.join(TEST_DIR, "HKUST-1.sa"),
+            "out.volpo": os.path.join(TEST_DIR, "HKUST-1.volpo"),
+        },
+    )
+
+    results = split_results(node, {"sa": [1.82, 1.82, 1000]})
+    assert results["ASA_A^2"] == 3545.59
+    assert results["Input_sa"] == [1.82, 1.82, 1000]
+    assert "POAV_A^3" not in results
+    assert "Input_volpo" not in results
+
+
+def test_split_results_compressed(finished_calculation):
+    """Test extracting results from compressed output files and output files that were not kept."""
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy")
+    (run,) = plan_runs(
+        [
+            {"structure": structure, "parameters": {"sa": [1.82, 1.82, 1000]}},
+            {"structure": structure, "parameters": {"volpo": [1.82, 1.82, 1000]}},
+        ]
+    )
+
+    with open(os.path.join(TEST_DIR, "HKUST-1.sa"), "rb") as handle:
+        content = gzip.compress(handle.read())
+    node = finished_calculation(
+        inputs=run.get_inputs(),
+        retrieved={"out.sa.gz": content},
+        options={"compress_outputs": ["sa"], "output_policy": {"volpo": "discard"}},
+    )
+
+    results = split_results(node, {"sa": [1.82, 1.82, 1000]})
+    assert results["ASA_A^2"] == 3545.59
+
+    with pytest.raises(ValueError, match="out.volpo"):
+        split_results(node, {"volpo": [1.82, 1.82, 1000]})
@@ -0,0 +1,37 @@
+"""Tests for offline re-parsing."""
+import os
+
+from aiida.plugins import DataFactory
+
+from aiida_zeopp.tests import TEST_DIR
+from aiida_zeopp.tools.reparse import reparse_calculations
+
+NetworkParameters = DataFactory("zeopp.parameters")
+CifData = DataFactory("core.cif")
+
+
+def test_reparse(finished_calculation):
+    """Test re-parsing in the current process and in a process pool."""
+    node = finished_calculation(
+        inputs={
+            "parameters": NetworkParameters(dict={"cssr": True, "sa": [1.82, 1.82, 1000], "volpo": [1.82, 1.82, 1000]}),
+            "structure": CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy"),
+        },
+        retrieved={
+            "out.cssr": b"cssr",
+            "out.sa": os.path.join(TEST_DIR, "HKUST-1.sa"),
+            "out.volpo": os.path.join(TEST_DIR, "HKUST-1.volpo"),
+        },
+    )
+
+    stats = reparse_calculations(max_workers=0)
+    assert stats["calculations"] == 1
+    assert stats["files"] == 2
+    assert stats["failed"] == 0
+    results = node.base.extras.get("reparsed_output_parameters")
+    assert results["ASA_A^2"] == 3545.59
+    assert results["POAV_A^3"] == 12207.2
+
+    stats = reparse_calculations(options=["sa"], max_workers=1, extras_key="reparsed_sa")
+    assert stats["files"] == 1
+    assert "POAV_A^3" not in node.base.extras.get("reparsed_sa")
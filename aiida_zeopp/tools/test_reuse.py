@@ -0,0 +1,81 @@
+"""Tests for reuse of at least equally accurate results."""
+import os
+
+import pytest
+from aiida.plugins import DataFactory
+
+from aiida_zeopp.tests import TEST_DIR
+from aiida_zeopp.tools.reuse import (
+    dominates,
+    find_dominating_calculation,
+    ha_dominates,
+    submit_or_reuse,
+)
+
+NetworkParameters = DataFactory("zeopp.parameters")
+CifData = DataFactory("core.cif")
+
+
+def test_dominates():
+    """Test ordering of parameters by accuracy."""
+    assert ha_dominates("DEF", "LOW")
+    assert ha_dominates("S100", "S30")
+    assert ha_dominates("OCC", False)
+    assert ha_dominates(True, "MED")
+    assert not ha_dominates("LOW", "DEF")
+    assert not ha_dominates(False, "LOW")
+    assert not ha_dominates("S100", "DEF")
+
+    available = {"ha": "DEF", "sa": [1.82, 1.82, 5000], "res": True}
+    assert dominates(available, {"ha": "LOW", "sa": [1.82, 1.82, 2000]})
+    assert dominates(available, {"res": True, "nor": False})
+    assert not dominates(available, {"sa": [1.82, 1.82, 10000]})
+    assert not dominates(available, {"sa": [1.2, 1.2, 2000]})
+    assert not dominates(available, {"chan": 1.2})
+    assert not dominates(available, {"res": True, "nor": True})
+
+
+def test_submit_or_reuse(finished_calculation):
+    """Test finding and reusing an existing calculation."""
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy").store()
+    parameters = NetworkParameters(dict={"ha": "DEF", "sa": [1.82, 1.82, 5000]}).store()
+
+    node = finished_calculation(inputs={"parameters": parameters, "structure": structure})
+
+    # same content, different node
+    duplicate = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy")
+    with pytest.raises(ValueError):
+        find_dominating_calculation(duplicate, {"res": True})
+    duplicate.store()
+    requested = NetworkParameters(dict={"ha": "LOW", "sa": [1.82, 1.82, 2000]})
+
+    assert find_dominating_calculation(duplicate, {"sa": [1.82, 1.82, 10000]}) is None
+    assert find_dominating_calculation(duplicate, requested, atomic_radii=parameters) is None
+
+    reused = submit_or_reuse({"structure": duplicate, "parameters": requested})
+    assert reused.uuid == node.uuid
+    (request,) = node.base.extras.get("reused_for")
+    assert request["parameters"] == {"ha": "LOW", "sa": [1.82, 1.82, 2000]}
+
+
+def test_reuse_output_options(finished_calculation):
+    """Test that calculations are only reused for requests with identical output options."""
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy").store()
+    parameters = NetworkParameters(dict={"sa": [1.82, 1.82, 5000], "psd": [1.2, 1.2, 5000]}).store()
+    options = {
+        "psd_as_array": True,
+        "compress_outputs": ["sa", "psd"],
+        "output_policy": {"sa": "discard", "psd": "keep"},
+    }
+
+    node = finished_calculation(inputs={"parameters": parameters, "structure": structure}, options=options)
+
+    requested = {"sa": [1.82, 1.82, 2000]}
+    assert find_dominating_calculation(structure, requested) is None
+    assert find_dominating_calculation(structure, requested, options=dict(options, raw_text="compress")) is None
+    assert find_dominating_calculation(structure, requested, options=dict(options, psd_as_array=False)) is None
+
+    # equivalent options
+    options = {"psd_as_array": True, "compress_outputs": ["psd", "sa"], "output_policy": {"sa": "discard"}}
+    assert find_dominating_calculation(structure, requested, options=options).uuid == node.uuid
+    assert find_dominating_calculation(structure, requested, options=dict(options, raw_text="keep")).uuid == node.uuid
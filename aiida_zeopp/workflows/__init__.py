@@ -0,0 +1,5 @@
+"""
+Workflows provided by plugin
+
+Register workflows via the "aiida.workflows" entry point in pyproject.toml.
+"""
@@ -0,0 +1,311 @@
+"""Adaptive Monte Carlo sampling.
+
+The ``sa``, ``vol`` and ``volpo`` options take a fixed number of Monte Carlo samples.
+The statistical error of the results depends strongly on the structure, so a fixed sample count
+over-samples some structures and under-samples others.
+
+zeo++ seeds its random number generator with a fixed value, so repeated runs on the same structure reuse
+the same sample points (and runs with a few more samples share all but the last ones).
+Independent repetitions are therefore run on randomized replicas of the structure (see `get_replica_arrays`).
+"""
+import io
+import math
+
+import numpy as np
+from aiida.common import AttributeDict
+from aiida.engine import WorkChain, append_, calcfunction, while_
+from aiida.plugins import CalculationFactory, DataFactory
+
+from aiida_zeopp.data.parameters import MODIFIER_OPTIONS
+from aiida_zeopp.parsers.structure import (
+    CifParser,
+    get_arrays,
+    get_cell,
+    get_structure_radii,
+)
+
+NetworkCalculation = CalculationFactory("zeopp.network")  # pylint: disable=invalid-name
+NetworkParameters = DataFactory("zeopp.parameters")  # pylint: disable=invalid-name
+CifData = DataFactory("core.cif")  # pylint: disable=invalid-name
+Dict = DataFactory("core.dict")  # pylint: disable=invalid-name
+Float = DataFactory("core.float")  # pylint: disable=invalid-name
+Int = DataFactory("core.int")  # pylint: disable=invalid-name
+
+# results whose standard error is monitored, by sampled option
+SAMPLED_RESULTS = {
+    "sa": ("ASA_m^2/g",),
+    "vol": ("AV_cm^3/g",),
+    "volpo": ("POAV_cm^3/g",),
+}
+
+# bounds for the factor by which the number of samples is increased in one iteration
+MIN_GROWTH = 2
+MAX_GROWTH = 100
+
+
+def get_statistics(values):
+    """Return mean and standard error of the mean of repeated results.
+
+    :param values: list of results of independent repetitions
+    :returns: tuple (mean, standard error)
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2:
+        raise ValueError("At least two repetitions are needed to estimate the standard error")
+    return float(values.mean()), float(values.std(ddof=1) / math.sqrt(len(values)))
+
+
+def get_relative_error(values):
+    """Return standard error of the mean relative to the mean (0, if the mean vanishes)."""
+    mean, error = get_statistics(values)
+    return error / abs(mean) if mean else 0.0
+
+
+def estimate_samples(samples, relative_error, tolerance):
+    """Estimate number of samples needed to reach the tolerance.
+
+    The standard error decreases as ``1/sqrt(samples)``.
+    The increase is bounded by ``MIN_GROWTH`` and ``MAX_GROWTH``.
+
+    :param samples: current number of samples
+    :param relative_error: relative standard error reached with the current number of samples
+    :param tolerance: target relative standard error
+    :returns: estimated number of samples
+    """
+    growth = (relative_error / tolerance) ** 2
+    return math.ceil(samples * min(max(growth, MIN_GROWTH), MAX_GROWTH))
+
+
+def get_replica_arrays(arrays, seed):
+    """Return randomized replica of a structure, for independent Monte Carlo estimates of zeo++.
+
+    All atoms are translated by a random fractional vector, which is equivalent to translating the sample points
+    of ``vol`` and ``volpo`` (uniform in the unit cell), and the atoms are randomly permuted,
+    which reassigns the sample points of ``sa`` (drawn on the sphere of one atom after the other).
+
+    :param arrays: numpy arrays of the P1 unit cell (see `CifParser.parse_arrays`)
+    :param seed: seed of the random translation and permutation
+    :returns: arrays of the replica
+    """
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(arrays["labels"]))
+    shift = rng.random(3)
+    return dict(
+        arrays,
+        labels=[arrays["labels"][i] for i in order],
+        symbols=[arrays["symbols"][i] for i in order],
+        fractional_coordinates=(np.asarray(arrays["fractional_coordinates"])[order] + shift) % 1.0,
+    )
+
+
+@calcfunction
+def get_replica(structure, seed):
+    """Return randomized replica of the input structure as P1 CifData (see `get_replica_arrays`).
+
+    :param structure: input structure (CifData or StructureData)
+    :param seed: Int with the seed of the replica
+    """
+    content = CifParser.write_arrays(get_replica_arrays(get_arrays(structure), seed.value))
+    return CifData(file=io.BytesIO(content.encode("utf8")), filename=f"replica_{seed.value}.cif", parse_policy="lazy")
+
+
+def validate_parameters(value, _ctx):
+    """Validate that the parameters contain at least one sampled option."""
+    if value is not None and not any(value.get(option) for option in SAMPLED_RESULTS):
+        return f"parameters need to contain at least one of the sampled options {list(SAMPLED_RESULTS)}"
+    return None
+
+
+@calcfunction
+def collect_sampling_results(summary, base, **repetitions):
+    """Merge the results of the first run with mean and standard error of the sampled results.
+
+    :param summary: Dict with 'samples', 'repetitions' and 'converged' by sampled option
+    :param base: output_parameters of the first run
+    :param repetitions: output_parameters of the final repetitions of each option, with link labels ``<option>_<index>``
+    """
+    results = base.get_dict()
+    for option, info in summary.get_dict().items():
+        runs = [repetitions[f"{option}_{index}"] for index in range(info["repetitions"])]
+        for key in SAMPLED_RESULTS[option]:
+            mean, error = get_statistics([run[key] for run in runs])
+            results[key] = mean
+            results[f"{key}_standard_error"] = error
+        results[f"Input_{option}"] = results[f"Input_{option}"][:2] + [info["samples"]]
+        results[f"Sampling_{option}_repetitions"] = info["repetitions"]
+        results[f"Sampling_{option}_converged"] = info["converged"]
+    return Dict(results)
+
+
+class AdaptiveSamplingWorkChain(WorkChain):
+    """Run NetworkCalculations with increasing numbers of Monte Carlo samples until the results are precise enough.
+
+    Each iteration runs independent repetitions of the sampled options (``sa``, ``vol``, ``volpo``) and estimates
+    the standard error of the mean of the monitored results (see ``SAMPLED_RESULTS``).
+    Every repetition runs on a randomized replica of the structure with its own seed (see `get_replica`).
+    Options whose relative standard error exceeds the tolerance are run again in the next iteration,
+    with the number of samples estimated to meet the tolerance.
+
+    The sample count in the parameters is the initial one (sample densities are resolved for the input structure).
+    All other options are computed in the first iteration only.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super().define(spec)
+        spec.expose_inputs(NetworkCalculation, namespace="network", exclude=("parameters",))
+        spec.input(
+            "parameters",
+            valid_type=NetworkParameters,
+            validator=validate_parameters,
+            help="command line parameters for zeo++, with initial number of samples of the sampled options",
+        )
+        spec.input(
+            "tolerance",
+            valid_type=Float,
+            default=lambda: Float(0.01),
+            help="target standard error of the monitored results, relative to their mean",
+        )
+        spec.input(
+            "repetitions",
+            valid_type=Int,
+            default=lambda: Int(4),
+            help="number of independent repetitions per iteration (at least 2)",
+        )
+        spec.input("max_samples", valid_type=Int, default=lambda: Int(1000000), help="maximum number of samples")
+        spec.input("max_iterations", valid_type=Int, default=lambda: Int(5), help="maximum number of iterations")
+
+        spec.outline(
+            cls.setup,
+            while_(cls.should_run)(
+                cls.run_repetitions,
+                cls.inspect_repetitions,
+            ),
+            cls.results,
+        )
+
+        spec.output(
+            "output_parameters",
+            valid_type=Dict,
+            help="results of the first run, with mean and standard error of the sampled results",
+        )
+
+        spec.exit_code(401, "ERROR_INVALID_REPETITIONS", message="At least two repetitions are required.")
+        spec.exit_code(402, "ERROR_CALCULATION_FAILED", message="A NetworkCalculation did not finish successfully.")
+        spec.exit_code(
+            403,
+            "ERROR_NOT_CONVERGED",
+            message="The tolerance was not met within the maximum number of samples or iterations.",
+        )
+
+    def setup(self):
+        """Initialize the sample counts of the sampled options."""
+        if self.inputs.repetitions.value < 2:
+            return self.exit_codes.ERROR_INVALID_REPETITIONS
+
+        parameters = self.inputs.parameters
+        if parameters.sample_densities:
+            structure = self.inputs.network.structure
+            radii = get_structure_radii(structure, self.inputs.network.get("atomic_radii"))
+            parameters = parameters.resolve_sample_densities(get_cell(structure), radii)
+        parameters = parameters.get_dict()
+        self.ctx.parameters = parameters
+        self.ctx.samples = {option: parameters[option][2] for option in SAMPLED_RESULTS if parameters.get(option)}
+        self.ctx.pending = list(self.ctx.samples)
+        self.ctx.converged = {}
+        self.ctx.runs = {}
+        self.ctx.iteration = 0
+        self.ctx.calculations = []
+        return None
+
+    def should_run(self):
+        """Return True, if some options still need more samples."""
+        return bool(self.ctx.pending) and self.ctx.iteration < self.inputs.max_iterations.value
+
+    def run_repetitions(self):
+        """Submit independent repetitions for the options that have not converged yet."""
+        self.ctx.iteration += 1
+
+        if self.ctx.iteration == 1:
+            parameters = dict(self.ctx.parameters)
+        else:
+            parameters = {k: v for k, v in self.ctx.parameters.items() if k in MODIFIER_OPTIONS}
+
+        for option in self.ctx.pending:
+            parameters[option] = self.ctx.parameters[option][:2] + [self.ctx.samples[option]]
+
+        repetitions = self.inputs.repetitions.value
+        for index in range(repetitions):
+            label = f"iteration_{self.ctx.iteration:02d}_{index}"
+            inputs = AttributeDict(self.exposed_inputs(NetworkCalculation, namespace="network"))
+            inputs.parameters = NetworkParameters(dict=parameters)
+            inputs.structure = get_replica(
+                inputs.structure,
+                Int((self.ctx.iteration - 1) * repetitions + index),
+                metadata={"call_link_label": f"replica_{label}"},
+            )
+            inputs.metadata.call_link_label = label
+            self.to_context(calculations=append_(self.submit(NetworkCalculation, **inputs)))
+
+        self.report(f"iteration {self.ctx.iteration}: submitted {self.inputs.repetitions.value} repetitions")
+
+    def inspect_repetitions(self):
+        """Estimate standard errors and the number of samples needed to meet the tolerance."""
+        calculations = self.ctx.calculations
+        self.ctx.calculations = []
+
+        for calculation in calculations:
+            if not calculation.is_finished_ok:
+                self.report(f"NetworkCalculation<{calculation.pk}> failed with exit status {calculation.exit_status}")
+                return self.exit_codes.ERROR_CALCULATION_FAILED
+
+        runs = [calculation.outputs.output_parameters for calculation in calculations]
+        if self.ctx.iteration == 1:
+            self.ctx.base = runs[0]
+
+        tolerance = self.inputs.tolerance.value
+        max_samples = self.inputs.max_samples.value
+        pending = []
+        for option in self.ctx.pending:
+            try:
+                error = max(get_relative_error([run[key] for run in runs]) for key in SAMPLED_RESULTS[option])
+            except KeyError as exc:
+                self.report(f"Result {exc} of option {option} missing in output parameters")
+                return self.exit_codes.ERROR_CALCULATION_FAILED
+
+            self.ctx.runs[option] = runs
+            samples = self.ctx.samples[option]
+            self.report(f"{option}: relative standard error {error:.2e} with {samples} samples")
+
+            if error <= tolerance:
+                self.ctx.converged[option] = True
+            elif samples >= max_samples:
+                self.ctx.converged[option] = False
+            else:
+                self.ctx.converged[option] = False
+                self.ctx.samples[option] = min(estimate_samples(samples, error, tolerance), max_samples)
+                pending.append(option)
+
+        self.ctx.pending = pending
+        return None
+
+    def results(self):
+        """Collect mean and standard error of the final repetitions."""
+        summary = {
+            option: {
+                "samples": self.ctx.runs[option][0]["Input_" + option][2],
+                "repetitions": len(self.ctx.runs[option]),
+                "converged": self.ctx.converged[option],
+            }
+            for option in self.ctx.runs
+        }
+        repetitions = {
+            f"{option}_{index}": run for option, runs in self.ctx.runs.items() for index, run in enumerate(runs)
+        }
+        output_parameters = collect_sampling_results(Dict(summary), self.ctx.base, **repetitions)
+        self.out("output_parameters", output_parameters)
+
+        if not all(self.ctx.converged.values()):
+            self.report(f"tolerance not met for {[k for k, v in self.ctx.converged.items() if not v]}")
+            return self.exit_codes.ERROR_NOT_CONVERGED
+        return None
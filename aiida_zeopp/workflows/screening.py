@@ -0,0 +1,179 @@
+"""Staged screening of porous structures.
+
+Surface areas, pore volumes and blocking spheres are expensive to compute, but vanish (resp. are meaningless)
+for structures that the probe cannot enter.
+A cheap first run (``res``, ``chan``) decides, which of the expensive analyses are worth running.
+"""
+from aiida.common import AttributeDict
+from aiida.engine import ToContext, WorkChain, calcfunction, if_
+from aiida.plugins import CalculationFactory, DataFactory
+
+from aiida_zeopp.data.parameters import MODIFIER_OPTIONS
+
+NetworkCalculation = CalculationFactory("zeopp.network")  # pylint: disable=invalid-name
+NetworkParameters = DataFactory("zeopp.parameters")  # pylint: disable=invalid-name
+Dict = DataFactory("core.dict")  # pylint: disable=invalid-name
+List = DataFactory("core.list")  # pylint: disable=invalid-name
+
+# expensive options that depend on a probe, with the index of the probe radius in the value of the option
+PROBE_OPTIONS = {
+    "sa": 1,
+    "vol": 1,
+    "volpo": 1,
+    "psd": 1,
+    "vsa": 1,
+    "ray_atom": 1,
+    "block": 0,
+}
+
+# results recorded as zero for skipped options (the probe-accessible parts vanish)
+ZERO_RESULTS = {
+    "sa": ("ASA_A^2", "ASA_m^2/cm^3", "ASA_m^2/g"),
+    "vol": ("AV_A^3", "AV_Volume_fraction", "AV_cm^3/g"),
+    "volpo": ("POAV_A^3", "POAV_Volume_fraction", "POAV_cm^3/g"),
+}
+
+
+def get_probe_radius(option, value):
+    """Return probe radius of a probe-dependent option.
+
+    :param option: name of the option, e.g. 'sa'
+    :param value: value of the option, e.g. [1.2, 1.82, 2000]
+    """
+    return float(value[PROBE_OPTIONS[option]])
+
+
+def is_accessible(results, probe_radius):
+    """Return True, if a probe of the given radius can pass through the structure.
+
+    Requires the largest free sphere (``res``) and the free sphere of at least one channel (``chan``)
+    to be at least as large as the probe diameter.
+
+    :param results: output parameters of a run with 'res' and 'chan'
+    :param probe_radius: radius of the probe (Angstrom)
+    """
+    diameter = 2 * probe_radius
+    free_spheres = results.get("Channels", {}).get("Largest_free_spheres", [])
+    return results.get("Largest_free_sphere", 0.0) >= diameter and any(d >= diameter for d in free_spheres)
+
+
+@calcfunction
+def merge_screening_results(screening, skipped, **results):
+    """Merge results of the screening run and the (optional) run of the expensive analyses.
+
+    Skipped options are recorded in 'Skipped_options', with zero-valued results where applicable
+    (see ``ZERO_RESULTS``).
+
+    :param screening: output_parameters of the screening run
+    :param skipped: List of skipped options
+    :param results: output_parameters of the run of the expensive analyses (optional, link label 'analysis')
+    """
+    merged = screening.get_dict()
+    if "analysis" in results:
+        merged.update(results["analysis"].get_dict())
+
+    for option in skipped.get_list():
+        for key in ZERO_RESULTS.get(option, ()):
+            merged[key] = 0.0
+    merged["Skipped_options"] = skipped.get_list()
+    return Dict(merged)
+
+
+class ScreeningWorkChain(WorkChain):
+    """Run expensive, probe-dependent analyses only for structures that the probe can enter.
+
+    The screening run computes ``res`` and ``chan`` (with the smallest probe radius, unless specified),
+    together with all options that do not depend on a probe.
+    The probe-dependent options (see ``PROBE_OPTIONS``) are run in a second calculation,
+    restricted to the options whose probe passes through the structure.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super().define(spec)
+        spec.expose_inputs(NetworkCalculation, namespace="network", exclude=("parameters",))
+        spec.input("parameters", valid_type=NetworkParameters, help="command line parameters for zeo++")
+
+        spec.outline(
+            cls.run_screening,
+            cls.inspect_screening,
+            if_(cls.should_run_analysis)(
+                cls.run_analysis,
+                cls.inspect_analysis,
+            ),
+            cls.results,
+        )
+
+        spec.output(
+            "output_parameters",
+            valid_type=Dict,
+            help="results of both runs, with zero-valued results of skipped options",
+        )
+
+        spec.exit_code(401, "ERROR_SCREENING_FAILED", message="The screening NetworkCalculation failed.")
+        spec.exit_code(402, "ERROR_ANALYSIS_FAILED", message="The NetworkCalculation of the analyses failed.")
+
+    def _submit(self, parameters, label):
+        """Submit NetworkCalculation with the given parameters dictionary."""
+        inputs = AttributeDict(self.exposed_inputs(NetworkCalculation, namespace="network"))
+        inputs.parameters = NetworkParameters(dict=parameters)
+        inputs.metadata.call_link_label = label
+        return self.submit(NetworkCalculation, **inputs)
+
+    def run_screening(self):
+        """Run res and chan, together with all options that do not depend on a probe."""
+        parameters = {k: v for k, v in self.inputs.parameters.get_dict().items() if v is not False}
+        self.ctx.analysis = {k: v for k, v in parameters.items() if k in PROBE_OPTIONS}
+
+        screening = {k: v for k, v in parameters.items() if k not in PROBE_OPTIONS}
+        screening["res"] = True
+        if "chan" not in screening and self.ctx.analysis:
+            screening["chan"] = min(get_probe_radius(k, v) for k, v in self.ctx.analysis.items())
+
+        return ToContext(screening=self._submit(screening, "screening"))
+
+    def inspect_screening(self):
+        """Decide which probe-dependent options to run."""
+        calculation = self.ctx.screening
+        if not calculation.is_finished_ok:
+            self.report(f"NetworkCalculation<{calculation.pk}> failed with exit status {calculation.exit_status}")
+            return self.exit_codes.ERROR_SCREENING_FAILED
+
+        results = calculation.outputs.output_parameters.get_dict()
+        self.ctx.skipped = [
+            k for k, v in self.ctx.analysis.items() if not is_accessible(results, get_probe_radius(k, v))
+        ]
+        if self.ctx.skipped:
+            self.report(
+                f"probe not accessible (largest free sphere {results.get('Largest_free_sphere')} A), "
+                f"skipping {self.ctx.skipped}"
+            )
+        return None
+
+    def should_run_analysis(self):
+        """Return True, if some probe-dependent options are accessible."""
+        return len(self.ctx.skipped) < len(self.ctx.analysis)
+
+    def run_analysis(self):
+        """Run the accessible probe-dependent options."""
+        parameters = {k: v for k, v in self.inputs.parameters.get_dict().items() if k in MODIFIER_OPTIONS}
+        parameters.update({k: v for k, v in self.ctx.analysis.items() if k not in self.ctx.skipped})
+        return ToContext(analysis_calculation=self._submit(parameters, "analysis"))
+
+    def inspect_analysis(self):
+        """Check that the analyses finished successfully."""
+        calculation = self.ctx.analysis_calculation
+        if not calculation.is_finished_ok:
+            self.report(f"NetworkCalculation<{calculation.pk}> failed with exit status {calculation.exit_status}")
+            return self.exit_codes.ERROR_ANALYSIS_FAILED
+        return None
+
+    def results(self):
+        """Merge results of both runs."""
+        results = {}
+        if "analysis_calculation" in self.ctx:
+            results["analysis"] = self.ctx.analysis_calculation.outputs.output_parameters
+        output_parameters = merge_screening_results(
+            self.ctx.screening.outputs.output_parameters, List(list=self.ctx.skipped), **results
+        )
+        self.out("output_parameters", output_parameters)
@@ -0,0 +1,143 @@
+""" Tests for adaptive sampling
+
+"""
+import os
+
+import numpy as np
+import pytest
+from aiida.engine import run_get_node
+from aiida.orm import Int
+from aiida.plugins import DataFactory, WorkflowFactory
+
+from aiida_zeopp.parsers.structure import CifParser, cell_from_parameters
+from aiida_zeopp.tests import TEST_DIR
+from aiida_zeopp.workflows.sampling import (
+    estimate_samples,
+    get_relative_error,
+    get_replica,
+    get_replica_arrays,
+    get_statistics,
+)
+
+AdaptiveSamplingWorkChain = WorkflowFactory("zeopp.adaptive_sampling")
+NetworkParameters = DataFactory("zeopp.parameters")
+CifData = DataFactory("core.cif")
+Float = DataFactory("core.float")
+
+
+def test_statistics():
+    """Test estimating standard errors and required numbers of samples."""
+    mean, error = get_statistics([1.0, 2.0, 3.0, 4.0])
+    assert mean == 2.5
+    assert error == pytest.approx(0.6455, abs=1e-4)
+    assert get_relative_error([0.0, 0.0]) == 0.0
+    with pytest.raises(ValueError):
+        get_statistics([1.0])
+
+    # error 4x too large -> 16x samples
+    assert estimate_samples(1000, 0.04, 0.01) == 16000
+    # increase at least by factor of 2, at most by factor of 100
+    assert estimate_samples(1000, 0.011, 0.01) == 2000
+    assert estimate_samples(1000, 1.0, 0.01) == 100000
+
+
+def sample_volume(arrays, samples, radius=1.8, seed=0):
+    """Fraction of the unit cell outside of all atoms, sampled like zeo++ (fixed seed, uniform in the cell)."""
+    points = np.random.default_rng(seed).random((samples, 3))
+    return 1.0 - np.mean(_inside(arrays, points, radius, exclude=None))
+
+
+def sample_surface(arrays, samples, radius=1.8, seed=0):
+    """Fraction of the atom surfaces outside of all other atoms, sampled like zeo++ (fixed seed, atom by atom)."""
+    rng = np.random.default_rng(seed)
+    cell = cell_from_parameters(arrays["lengths"], arrays["angles"])
+    accessible = []
+    for index, position in enumerate(arrays["fractional_coordinates"]):
+        directions = rng.normal(size=(samples, 3))
+        directions *= radius / np.linalg.norm(directions, axis=1)[:, np.newaxis]
+        points = position + directions @ np.linalg.inv(cell)
+        accessible.append(~_inside(arrays, points, radius, exclude=index))
+    return np.mean(accessible)
+
+
+def _inside(arrays, points, radius, exclude):
+    """Return for each point (fractional coordinates) whether it is inside an atom (minimum image convention)."""
+    cell = cell_from_parameters(arrays["lengths"], arrays["angles"])
+    delta = points[:, np.newaxis, :] - np.asarray(arrays["fractional_coordinates"])[np.newaxis, :, :]
+    distances = np.linalg.norm((delta - np.round(delta)) @ cell, axis=-1)
+    if exclude is not None:
+        distances[:, exclude] = np.inf
+    return np.any(distances < radius, axis=1)
+
+
+@pytest.mark.parametrize("sample", [sample_volume, sample_surface])
+def test_replicas_independent(sample):
+    """Test that repetitions on replicas scatter like independent Monte Carlo estimates.
+
+    The sampler reuses the same random sequence for every run, like zeo++, so repetitions on the same
+    structure are fully correlated and their standard deviation vanishes.
+    """
+    rng = np.random.default_rng(42)
+    arrays = {
+        "lengths": np.array([10.0, 10.0, 10.0]),
+        "angles": np.array([90.0, 90.0, 90.0]),
+        "labels": [f"C{i}" for i in range(16)],
+        "symbols": ["C"] * 16,
+        "fractional_coordinates": rng.random((16, 3)),
+    }
+
+    independent = [sample(arrays, 200, seed=seed) for seed in range(1, 33)]
+    replicas = [sample(get_replica_arrays(arrays, seed), 200) for seed in range(32)]
+
+    assert np.std(independent) > 0
+    assert 0.5 < np.std(replicas) / np.std(independent) < 2.0
+    assert abs(np.mean(replicas) - np.mean(independent)) < 4 * np.std(independent) / np.sqrt(32)
+
+
+def test_get_replica():
+    """Test that replicas contain the same atoms, permuted and translated by the same random vector."""
+    structure = CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy")
+    arrays = CifParser.parse_arrays(structure.get_content())
+    arrays["labels"] = [str(index) for index in range(len(arrays["labels"]))]
+
+    shifts = []
+    for seed in range(2):
+        replica = get_replica_arrays(arrays, seed)
+        order = [int(label) for label in replica["labels"]]
+        assert sorted(order) == list(range(len(order))) and order != sorted(order)
+        assert replica["symbols"] == [arrays["symbols"][index] for index in order]
+
+        shift = (replica["fractional_coordinates"] - arrays["fractional_coordinates"][order]) % 1.0
+        np.testing.assert_allclose(shift, np.broadcast_to(shift[0], shift.shape), atol=1e-9)
+        shifts.append(shift[0])
+    assert not np.allclose(shifts[0], shifts[1])
+
+    node = get_replica(structure, Int(1))
+    replica = CifParser.parse_arrays(node.get_content())
+    np.testing.assert_allclose(replica["lengths"], arrays["lengths"])
+    np.testing.assert_allclose(
+        replica["fractional_coordinates"],
+        get_replica_arrays(CifParser.parse_arrays(structure.get_content()), 1)["fractional_coordinates"],
+        atol=1e-6,
+    )
+
+
+def test_adaptive_sampling(network_code, basic_options):
+    """Test converging the surface area of HKUST-1."""
+    inputs = {
+        "network": {
+            "code": network_code,
+            "structure": CifData(file=os.path.join(TEST_DIR, "HKUST-1.cif"), parse_policy="lazy"),
+            "metadata": {"options": basic_options},
+        },
+        "parameters": NetworkParameters(dict={"res": True, "sa": [1.82, 1.82, 100]}),
+        "tolerance": Float(0.005),
+    }
+
+    _result, node = run_get_node(AdaptiveSamplingWorkChain, **inputs)
+
+    assert node.is_finished_ok, node.exit_message
+    output_parameters = node.outputs.output_parameters.get_dict()
+    assert output_parameters["Sampling_sa_converged"]
+    assert output_parameters["ASA_m^2/g_standard_error"] <= 0.005 * output_parameters["ASA_m^2/g"]
+    assert "Largest_free_sphere" in output_parameters
@@ -0,0 +1,58 @@
+""" Tests for staged screening
+
+"""
+import os
+
+from aiida.engine import run_get_node
+from aiida.plugins import DataFactory, WorkflowFactory
+
+from aiida_zeopp.tests import TEST_DIR
+from aiida_zeopp.workflows.screening import is_accessible
+
+ScreeningWorkChain = WorkflowFactory("zeopp.screening")
+NetworkParameters = DataFactory("zeopp.parameters")
+CifData = DataFactory("core.cif")
+
+
+def test_is_accessible():
+    """Test deciding accessibility of a probe from res and chan results."""
+    results = {"Largest_free_sphere": 3.85, "Channels": {"Largest_free_spheres": [3.85, 3.0]}}
+    assert is_accessible(results, 1.8)
+    assert not is_accessible(results, 2.0)
+    assert not is_accessible({"Largest_free_sphere": 3.85, "Channels": {"Largest_free_spheres": []}}, 1.8)
+
+
+def run_screening(network_code, basic_options, structure_file):
+    """Run screening work chain for a structure."""
+    inputs = {
+        "network": {
+            "code": network_code,
+            "structure": CifData(file=os.path.join(TEST_DIR, structure_file), parse_policy="lazy"),
+            "metadata": {"options": basic_options},
+        },
+        "parameters": NetworkParameters(dict={"sa": [1.82, 1.82, 1000], "volpo": [1.82, 1.82, 1000]}),
+    }
+    _result, node = run_get_node(ScreeningWorkChain, **inputs)
+    assert node.is_finished_ok, node.exit_message
+    return node
+
+
+def test_screening_porous(network_code, basic_options):
+    """Test running all analyses for a porous structure."""
+    node = run_screening(network_code, basic_options, "HKUST-1.cif")
+
+    output_parameters = node.outputs.output_parameters.get_dict()
+    assert output_parameters["Skipped_options"] == []
+    assert output_parameters["ASA_m^2/g"] > 0
+    assert len(node.called) == 3  # screening, analysis, merge
+
+
+def test_screening_nonporous(network_code, basic_options):
+    """Test skipping analyses for a non-porous structure."""
+    node = run_screening(network_code, basic_options, "MgO.cif")
+
+    output_parameters = node.outputs.output_parameters.get_dict()
+    assert sorted(output_parameters["Skipped_options"]) == ["sa", "volpo"]
+    assert output_parameters["ASA_m^2/g"] == 0.0
+    assert output_parameters["POAV_cm^3/g"] == 0.0
+    assert len(node.called) == 2  # screening, merge
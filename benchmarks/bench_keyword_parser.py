@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Benchmark the single-pass keyword engine of ``KeywordParser`` against the previous implementation.
+
+The previous implementation formatted and ran one ``re.search`` per keyword over the whole string.
+
+Usage: ``python benchmarks/bench_keyword_parser.py [--number N]``
+"""
+import argparse
+import os
+import re
+import timeit
+
+import aiida_zeopp.parsers.plain as pp
+from aiida_zeopp.tests import TEST_DIR
+
+CASES = [
+    (pp.SurfaceAreaParser, "HKUST-1.sa"),
+    (pp.PoreVolumeParser, "HKUST-1.volpo"),
+]
+
+
+def parse_per_keyword(parser, string):
+    """Reference implementation: one regular expression search per keyword."""
+    results = {}
+
+    regex = r"{}:\s?([\d\.]*)"
+    for keyword, val in parser.keywords.items():
+        ktype, kunit = val
+        regex_rep = regex.format(re.escape(keyword))
+        match = re.search(regex_rep, string)
+        if match is None:
+            raise ValueError(f"Keyword {keyword} not specified")
+
+        value = match.group(1)
+        if value == "":
+            value = 0
+
+        results[keyword] = ktype(value)
+        results[keyword + "_unit"] = kunit
+
+    return results
+
+
+def best_time(func, args, number):
+    """Return best total time of ``number`` calls of ``func(*args)`` out of five repetitions."""
+    return min(timeit.repeat(lambda: func(*args), number=number, repeat=5))
+
+
+def main(number):
+    """Run benchmark and print timings."""
+    for parser, filename in CASES:
+        with open(os.path.join(TEST_DIR, filename), encoding="utf8") as handle:
+            string = handle.read()
+
+        assert parser.parse(string) == parse_per_keyword(parser, string)
+
+        t_old = best_time(parse_per_keyword, (parser, string), number)
+        t_new = best_time(parser.parse, (string,), number)
+
+        print(
+            f"{parser.__name__:20s} per-keyword: {t_old / number * 1e6:8.2f} us/file  "
+            f"single-pass: {t_new / number * 1e6:8.2f} us/file  speedup: {t_old / t_new:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cli.add_argument("--number", type=int, default=10000, help="number of parses per timing run")
+    main(cli.parse_args().number)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""Micro-benchmark for creating the output_parameters node of NetworkParser.
+
+Compares updating a ``Dict`` node once per parsed file (plus one ``set`` per ``Input_*`` key)
+with collecting all results in a plain dictionary and setting them on the node in one ``set_many`` call,
+for a calculation with all parsable outputs enabled.
+
+Requires an AiiDA profile. Usage: ``python benchmarks/bench_output_parameters.py [--number N]``
+"""
+import argparse
+import os
+import timeit
+
+from aiida import load_profile
+from aiida.orm import Dict
+
+import aiida_zeopp.parsers.plain as pp
+from aiida_zeopp.tests import TEST_DIR
+
+PARAMETERS = {
+    "ha": "DEF",
+    "res": True,
+    "chan": 1.8,
+    "sa": [1.82, 1.82, 2000],
+    "vol": [1.82, 1.82, 50000],
+    "volpo": [1.82, 1.82, 50000],
+    "psd": [1.82, 1.82, 50000],
+}
+
+VOL = """@ HKUST-1.vol Unitcell_volume: 18280.8   Density: 0.879097
+AV_A^3: 11803.2 AV_Volume_fraction: 0.64566 AV_cm^3/g: 0.734459
+NAV_A^3: 0 NAV_Volume_fraction: 0 NAV_cm^3/g: 0
+"""
+RES = "HKUST-1.res    13.19937 6.74621  13.19937\n"
+CHAN = """HKUST-1.chan   1 channels identified of dimensionality 3
+Channel  0  13.19937  6.74621  13.19937
+HKUST-1.chan summary(Max_of_columns_above)   13.19937 6.74621  13.19937  probe_rad: 1.8  probe_diam: 3.6
+"""
+PSD = "Pore size distribution histogram\nBin Count Cumulative_dist Derivative_dist\n" + "".join(
+    f"{0.1 * i:.1f} {i % 7} 0.5 -nan\n" for i in range(1000)
+)
+
+
+def get_parsed_files(psd_as_array):
+    """Return list of dictionaries, as parsed from the individual output files."""
+    with open(os.path.join(TEST_DIR, "HKUST-1.sa"), encoding="utf8") as handle:
+        sa = handle.read()
+    with open(os.path.join(TEST_DIR, "HKUST-1.volpo"), encoding="utf8") as handle:
+        volpo = handle.read()
+
+    return [
+        pp.ResParser.parse(RES),
+        pp.ChannelParser.parse(CHAN),
+        pp.SurfaceAreaParser.parse(sa),
+        pp.AVolumeParser.parse(VOL),
+        pp.PoreVolumeParser.parse(volpo),
+        pp.PoresSizeDistParser.parse_arrays(PSD)[0] if psd_as_array else pp.PoresSizeDistParser.parse(PSD),
+    ]
+
+
+def build_incremental(parsed_files):
+    """Previous approach: update the node once per file and once per input parameter."""
+    output_parameters = Dict({})
+    for parsed_dict in parsed_files:
+        output_parameters.update_dict(parsed_dict)
+    output_parameters.base.attributes.set("Input_structure_filename", "HKUST-1.cif")
+    for k, val in PARAMETERS.items():
+        output_parameters.base.attributes.set(f"Input_{k}", val)
+    return output_parameters
+
+
+def build_once(parsed_files):
+    """Current approach: collect results in a dictionary and create the node once."""
+    results = {}
+    for parsed_dict in parsed_files:
+        results.update(parsed_dict)
+    results["Input_structure_filename"] = "HKUST-1.cif"
+    for k, val in PARAMETERS.items():
+        results[f"Input_{k}"] = val
+    output_parameters = Dict()
+    output_parameters.base.attributes.set_many(results)
+    return output_parameters
+
+
+def best_time(func, parsed_files, number):
+    """Return best total time of ``number`` calls of ``func(parsed_files)`` out of five repetitions."""
+    return min(timeit.repeat(lambda: func(parsed_files), number=number, repeat=5))
+
+
+def main(number):
+    """Run benchmark and print timings."""
+    load_profile()
+
+    for psd_as_array in (False, True):
+        parsed_files = get_parsed_files(psd_as_array)
+
+        assert build_once(parsed_files).get_dict() == build_incremental(parsed_files).get_dict()
+
+        t_old = best_time(build_incremental, parsed_files, number)
+        t_new = best_time(build_once, parsed_files, number)
+
+        print(
+            f"psd_as_array={psd_as_array!s:5}  incremental: {t_old / number * 1e6:8.1f} us/calculation  "
+            f"single Dict: {t_new / number * 1e6:8.1f} us/calculation  speedup: {t_old / t_new:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cli.add_argument("--number", type=int, default=200, help="number of nodes created per timing run")
+    main(cli.parse_args().number)
@@ -2,7 +2,13 @@
 For pytest
 initialise a test database and profile
 """
+import io
+import shutil
+
 import pytest
+from aiida.common.links import LinkType
+from aiida.engine import ProcessState
+from aiida.orm import CalcJobNode, Dict, FolderData, InstalledCode
 
 pytest_plugins = ["aiida.manage.tests.pytest_fixtures"]  # pylint: disable=invalid-name
 
@@ -19,6 +25,16 @@ def network_code(aiida_local_code_factory):
     return code
 
 
+@pytest.fixture(scope="function")
+def wrapper_code(aiida_localhost):
+    """Get a bash code (runs the wrapper scripts of the measure_resources and packed options).
+
+    The code is only passed as wrapper_code input, hence it has no default calculation plugin.
+    """
+    code = InstalledCode(label="bash", computer=aiida_localhost, filepath_executable=shutil.which("bash"))
+    return code.store()
+
+
 @pytest.fixture(scope="function")
 def basic_options():
     """Return basic calculation options."""
@@ -26,3 +42,42 @@ def basic_options():
         "max_wallclock_seconds": 120,
     }
     return options
+
+
+@pytest.fixture(scope="function")
+def finished_calculation(aiida_localhost):
+    """Return factory of stored, finished zeopp.network calculation nodes (without running zeo++).
+
+    The factory takes the input nodes by link label, retrieved files (file name -> path of a file or bytes),
+    the output_parameters dictionary, the exit status and calculation options, and returns the CalcJobNode.
+    """
+
+    def _finished_calculation(inputs=None, retrieved=None, results=None, exit_status=0, options=None):
+        node = CalcJobNode(computer=aiida_localhost, process_type="aiida.calculations:zeopp.network")
+        node.set_option("resources", {"num_machines": 1, "num_mpiprocs_per_machine": 1})
+        for name, value in (options or {}).items():
+            node.set_option(name, value)
+        for label, inp in (inputs or {}).items():
+            node.base.links.add_incoming(inp.store(), link_type=LinkType.INPUT_CALC, link_label=label)
+        node.set_process_state(ProcessState.FINISHED)
+        node.set_exit_status(exit_status)
+        node.store()
+
+        if retrieved is not None:
+            folder = FolderData()
+            for fname, content in retrieved.items():
+                if isinstance(content, bytes):
+                    folder.base.repository.put_object_from_filelike(io.BytesIO(content), fname)
+                else:
+                    folder.base.repository.put_object_from_file(content, fname)
+            folder.base.links.add_incoming(node, link_type=LinkType.CREATE, link_label="retrieved")
+            folder.store()
+
+        if results is not None:
+            output_parameters = Dict(results)
+            output_parameters.base.links.add_incoming(node, link_type=LinkType.CREATE, link_label="output_parameters")
+            output_parameters.store()
+
+        return node
+
+    return _finished_calculation
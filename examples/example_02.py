@@ -10,6 +10,7 @@ from importlib_resources import files
 
 import aiida_zeopp
 from aiida_zeopp import tests
+from aiida_zeopp.tools.estimator import ResourceEstimator
 
 
 def test_submit(network_code):
@@ -32,15 +33,20 @@ def test_submit(network_code):
     )
     structure = orm.CifData(file=(files(aiida_zeopp).parent / "examples" / "HKUST-1.cif").as_posix())
 
+    # set limits from calculations run with the measure_resources option, if enough have been recorded
+    options = {"max_wallclock_seconds": 1 * 60}
+    try:
+        options.update(ResourceEstimator.from_database().get_options(structure, parameters))
+    except ValueError as exc:
+        print(f"Using default limits: {exc}")
+
     # set up calculation
     inputs = {
         "code": network_code,
         "parameters": parameters,
         "structure": structure,
         "metadata": {
-            "options": {
-                "max_wallclock_seconds": 1 * 60,
-            },
+            "options": options,
             "label": "aiida_zeopp example calculation",
             "description": "Compute PSD",
         },